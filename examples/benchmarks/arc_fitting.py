@@ -0,0 +1,69 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark arc fitting of milled paths.
+
+The isolation paths of a synthetic board with many pads are milled with
+MillingPCB, first with lines only and then with G2/G3 arcs fitted within
+a tolerance. The G-code is counted, not written.
+"""
+
+import time
+import argparse
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath import IsolationToolpath
+from fabtotum.gcode import MillingPCB
+
+from synthetic import gerber_board
+
+
+class CountingOutput(object):
+
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+        self.arcs = 0
+
+    def write(self, v):
+        self.lines += 1
+        self.bytes += len(v) + 2
+        if v.startswith('G2 ') or v.startswith('G3 '):
+            self.arcs += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arc fitting benchmark')
+    parser.add_argument('-n', '--pads', type=int, default=2000,
+                        help='Number of pads of the synthetic board')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.005,
+                        help='Arc fitting tolerance')
+    args = parser.parse_args()
+
+    # Pads 3mm apart, isolated one by one
+    gerber = rs274x.loads(gerber_board(tracks=0, pads=args.pads, pour_vertices=0,
+                                       width=600.0, height=600.0))
+    ctx = ShapelyContext()
+    gerber.render(ctx)
+    toolpath = IsolationToolpath()
+    toolpath.settings['optimize'] = False
+    toolpath.add_tool(0.4)
+    paths = toolpath.generate(ctx.figs)
+    print('{} paths, {} points'.format(len(paths), sum(len(p.coords) for p in paths)))
+
+    print('{:<10} {:>8} {:>8} {:>10} {:>7}'.format('', 'time', 'lines', 'bytes', 'arcs'))
+    for name, tolerance in (('lines', None), ('arcs', args.tolerance)):
+        out = CountingOutput()
+        cnc = MillingPCB(out)
+        cnc.setArcTolerance(tolerance)
+        t0 = time.time()
+        for path in paths:
+            cnc.millPath(path)
+        elapsed = time.time() - t0
+        print('{:<10} {:>7.2f}s {:>8} {:>10} {:>7}'.format(
+            name, elapsed, out.lines, out.bytes, out.arcs))
+
+
+if __name__ == '__main__':
+    main()
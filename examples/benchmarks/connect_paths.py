@@ -0,0 +1,78 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark the nearest unvisited path search of ToolpathContext.connect_paths.
+
+Random pad contours are walked from the first one to the nearest unvisited
+one with ToolpathContext.PathIndex, then by measuring every pair of contours
+first as connect_paths used to. Both walks must visit the contours in the
+same order.
+"""
+
+import time
+import random
+import argparse
+
+import shapely.geometry as sg
+
+from fabtotum.toolpath.toolpath import ToolpathContext
+
+
+def walk(get_closest, clear, count):
+    order = []
+    idx0 = 0
+    for _ in xrange(count - 1):
+        idx1, d = get_closest(idx0)
+        clear(idx0)
+        order.append(idx1)
+        idx0 = idx1
+    return order
+
+
+def pairs_walk(paths):
+    count = len(paths)
+    distances = [[0.0] * count for _ in xrange(count)]
+    for i in xrange(count):
+        for j in xrange(i + 1, count):
+            distances[i][j] = distances[j][i] = paths[i].distance(paths[j])
+    unvisited = set(xrange(count))
+
+    def get_closest(a):
+        return min((distances[a][i], i) for i in unvisited if i != a)[::-1]
+
+    return walk(get_closest, unvisited.remove, count)
+
+
+def index_walk(paths, tool_d):
+    dm = ToolpathContext.PathIndex(paths, radius=tool_d)
+    return walk(dm.get_closest, dm.clear, len(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Path connection benchmark')
+    parser.add_argument('-n', '--count', type=int, default=1000,
+                        help='Number of contours')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    side = 5.0 * args.count ** 0.5
+    paths = [sg.Point(rnd.uniform(0, side), rnd.uniform(0, side))
+             .buffer(rnd.uniform(0.3, 1.0), 8).exterior
+             for _ in xrange(args.count)]
+
+    t0 = time.time()
+    after = index_walk(paths, 0.2)
+    index = time.time() - t0
+    t0 = time.time()
+    before = pairs_walk(paths)
+    pairs = time.time() - t0
+
+    print('{} contours'.format(args.count))
+    print('{:<8} {:>8.3f}s'.format('pairs', pairs))
+    print('{:<8} {:>8.3f}s {:>6.1f}x'.format('index', index, pairs / max(index, 1e-9)))
+    if before != after:
+        print('MISMATCH: the contours are visited in another order')
+
+
+if __name__ == '__main__':
+    main()
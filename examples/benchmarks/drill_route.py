@@ -0,0 +1,51 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark drill hit ordering.
+
+A synthetic drill file is ordered with fabtotum.toolpath.drilling.order_hits
+for several numbers of improving passes. The route length is ExcellonFile.path_length
+summed over the tools, each tool starting at the origin, before and after
+setting the ordered hits back to the file.
+"""
+
+import time
+import argparse
+
+from fabtotum.loaders.gerber import excellon
+from fabtotum.toolpath.drilling import order_hits, route_length
+
+from synthetic import excellon_board
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drill route benchmark')
+    parser.add_argument('-n', '--hits', type=int, default=5000,
+                        help='Number of drill hits')
+    parser.add_argument('-t', '--tools', type=int, default=4,
+                        help='Number of tools')
+    args = parser.parse_args()
+
+    ef = excellon.loads(excellon_board(hits=args.hits, tools=args.tools,
+                                       units='metric', zeros='leading',
+                                       format=(3, 3), width=100.0,
+                                       height=80.0))
+    hits = ef.hits
+    before = sum(ef.path_length().values())
+    print('{} hits, {} tools, file order {:.1f}mm'.format(len(hits), len(ef.tools), before))
+    print('{:<8} {:>8} {:>10} {:>8} {:>10}'.format(
+        'passes', 'time', 'route', 'saved', 'chained'))
+    for passes in (0, 1, 4):
+        t0 = time.time()
+        ef.hits = order_hits(hits, passes=passes)
+        elapsed = time.time() - t0
+        after = sum(ef.path_length().values())
+        chained = sum(route_length(order_hits(hits, chain_tools=True, passes=passes),
+                                   chain_tools=True).values())
+        print('{:<8} {:>7.2f}s {:>9.1f}mm {:>7.1f}% {:>8.1f}mm'.format(
+            passes, elapsed, after, 100.0 * (1 - after / before), chained))
+        ef.hits = hits
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark Excellon format detection.
+
+Synthetic drill files are written in every supported format, with and
+without the INCH/METRIC header naming the zeros. Each one is loaded with
+gerber.excellon.loads, which has to detect the format, and parsed with the
+right settings given. The ratio is the cost of detection, 1.0x meaning that
+the file was parsed once.
+"""
+
+import time
+import argparse
+import itertools
+
+from fabtotum.loaders.gerber import excellon
+from fabtotum.loaders.gerber.cam import FileSettings
+
+from synthetic import excellon_board
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Excellon detection benchmark')
+    parser.add_argument('-n', '--hits', type=int, default=20000,
+                        help='Number of drill hits of each file')
+    args = parser.parse_args()
+
+    print('{:<7} {:<9} {:<7} {:<7} {:>8} {:>8} {:>6}  {}'.format(
+        'units', 'zeros', 'format', 'header', 'loads', 'parse', 'ratio',
+        'detected'))
+    for units, zeros, fmt, header in itertools.product(
+            ('inch', 'metric'), ('leading', 'trailing'),
+            ((2, 4), (2, 5), (3, 3)), (True, False)):
+        width, height = (4.0, 3.0) if units == 'inch' else (90.0, 80.0)
+        data = excellon_board(hits=args.hits, units=units, zeros=zeros,
+                              format=fmt, unit_header=header, width=width,
+                              height=height)
+
+        t0 = time.time()
+        ef = excellon.loads(data)
+        loads = time.time() - t0
+
+        t0 = time.time()
+        settings = FileSettings(units=units, zeros=zeros, format=fmt)
+        excellon.ExcellonParser(settings).parse_raw(data)
+        parse = time.time() - t0
+
+        detected = (ef.format, ef.zeros)
+        print('{:<7} {:<9} {:<7} {:<7} {:>7.3f}s {:>7.3f}s {:>5.1f}x  {}{}'.format(
+            units, zeros, '%d:%d' % fmt, 'yes' if header else 'no', loads,
+            parse, loads / parse,
+            '%d:%d %s' % (detected[0] + (detected[1],)),
+            '' if detected == (fmt, zeros) else ' (wrong)'))
+
+
+if __name__ == '__main__':
+    main()
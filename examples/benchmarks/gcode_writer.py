@@ -0,0 +1,100 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark the throughput of G-code output in lines per second.
+
+The same random paths are milled with MillingPCB into a file, first with
+an output writing every line on its own as pcb2gcode used to, then with
+fabtotum.gcode.GCodeWriter. The raw G1 rate of RAW is measured as well.
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+from shapely.geometry import LineString
+
+from fabtotum.gcode import RAW, MillingPCB, GCodeWriter
+
+
+class LineOutput(object):
+    """ Output writing each line with its own call """
+
+    def __init__(self, filename):
+        self.fd = open(filename, 'w')
+
+    def write(self, v):
+        self.fd.write(v + '\r\n')
+
+    def close(self):
+        self.fd.close()
+
+
+def random_paths(count, vertices, seed):
+    rnd = random.Random(seed)
+    paths = []
+    for i in xrange(count):
+        x, y = rnd.uniform(0, 100), rnd.uniform(0, 100)
+        coords = []
+        for j in xrange(vertices):
+            x += rnd.uniform(-1, 1)
+            y += rnd.uniform(-1, 1)
+            coords.append((x, y))
+        paths.append(LineString(coords))
+    return paths
+
+
+def count_lines(filename):
+    with open(filename) as fd:
+        return sum(1 for line in fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='G-code output benchmark')
+    parser.add_argument('-n', '--count', type=int, default=2000,
+                        help='Number of paths')
+    parser.add_argument('-v', '--vertices', type=int, default=100,
+                        help='Vertices of each path')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    paths = random_paths(args.count, args.vertices, args.seed)
+    points = [coords for path in paths for coords in path.coords]
+    handle, filename = tempfile.mkstemp(suffix='.gcode')
+    os.close(handle)
+
+    outputs = (('per line', LineOutput), ('writer', GCodeWriter))
+    print('{:<16} {:>8} {:>10} {:>12}'.format('', 'time', 'lines', 'lines/s'))
+    try:
+        for name, output in outputs:
+            out = output(filename)
+            cnc = MillingPCB(out)
+            cnc.setMinimalXYStep(None)
+            t0 = time.time()
+            for path in paths:
+                cnc.millPath(path)
+            out.close()
+            elapsed = time.time() - t0
+            lines = count_lines(filename)
+            print('{:<16} {:>7.2f}s {:>10} {:>12.0f}'.format('millPath ' + name, elapsed,
+                                                             lines, lines / elapsed))
+
+        for name, output in outputs:
+            out = output(filename)
+            raw = RAW(out)
+            t0 = time.time()
+            for x, y in points:
+                raw.G1(X=x, Y=y, F=800)
+            out.close()
+            elapsed = time.time() - t0
+            lines = count_lines(filename)
+            print('{:<16} {:>7.2f}s {:>10} {:>12.0f}'.format('G1 ' + name, elapsed,
+                                                             lines, lines / elapsed))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark GerberFile operations with object and columnar primitive storage.
+
+Times bounding_box, offset, to_metric/to_inch and rendering of the
+primitives with the shapely backend, then checks that both storages agree on the bounding box.
+"""
+
+import time
+import argparse
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+
+from synthetic import gerber_board
+
+
+def timed(results, name, function):
+    t0 = time.time()
+    function()
+    results[name] = time.time() - t0
+
+
+def render(gerber):
+    # Only the primitives, merging the shapes takes the same time either way
+    ctx = ShapelyContext()
+    if gerber.columns is not None:
+        ctx.render_columns(gerber.columns)
+    else:
+        for primitive in gerber.primitives:
+            ctx.render(primitive)
+
+
+def run(data, columnar):
+    gerber = rs274x.loads(data)
+    results = {}
+    if columnar:
+        timed(results, 'to_columnar', gerber.to_columnar)
+    timed(results, 'bounding_box', lambda: gerber.bounding_box)
+    timed(results, 'offset', lambda: gerber.offset(1.0, -1.0))
+    timed(results, 'to_inch', gerber.to_inch)
+    timed(results, 'to_metric', gerber.to_metric)
+    timed(results, 'render', lambda: render(gerber))
+    return results, gerber.bounding_box
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar storage benchmark')
+    parser.add_argument('-n', '--count', type=int, default=50000,
+                        help='Number of tracks and pads of the synthetic board')
+    args = parser.parse_args()
+
+    data = gerber_board(tracks=args.count, pads=args.count, pour_vertices=1000)
+    objects, objects_box = run(data, False)
+    columns, columns_box = run(data, True)
+
+    print('{:<14} {:>10} {:>10} {:>8}'.format('', 'objects', 'columnar', 'speedup'))
+    for name in ('to_columnar', 'bounding_box', 'offset', 'to_inch',
+                 'to_metric', 'render'):
+        before = objects.get(name)
+        after = columns[name]
+        print('{:<14} {:>10} {:>9.3f}s {:>8}'.format(
+            name, '-' if before is None else '{:.3f}s'.format(before), after,
+            '-' if before is None else '{:.1f}x'.format(before / max(after, 1e-9))))
+
+    error = max(abs(a - b) for a, b in zip(sum(objects_box, ()), sum(columns_box, ())))
+    print('bounding box difference: {:.3g}'.format(error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark parsing of a pad-dense Gerber board.
+
+Pads are D03 flashes, kept as lightweight Flash records that share their
+aperture. The board is loaded in a fresh process per mode so that the
+reported peak RSS only accounts for that mode:
+
+read
+    parse the file, flashes stay records
+materialize
+    parse the file, then build the full primitive of every flash, which is
+    what parsing used to keep in memory
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from fabtotum.loaders.gerber import rs274x
+
+from synthetic import gerber_board
+
+
+def load(mode, filename):
+    t0 = time.time()
+    primitives = rs274x.read(filename).primitives
+    if mode == 'materialize':
+        primitives = [p.to_primitive() if hasattr(p, 'to_primitive') else p
+                      for p in primitives]
+    elapsed = time.time() - t0
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print('{} {} {} {}'.format(mode, len(primitives), elapsed, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerber flash benchmark')
+    parser.add_argument('-n', '--pads', type=int, default=200000,
+                        help='Number of pads of the synthetic board')
+    parser.add_argument('--load', nargs=2, metavar=('MODE', 'FILE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load(*args.load)
+        return
+
+    fd, filename = tempfile.mkstemp(suffix='.gbr')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(gerber_board(tracks=0, pads=args.pads, pour_vertices=0))
+
+        for mode in ('read', 'materialize'):
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--load', mode, filename])
+            name, count, elapsed, peak = output.split()
+            print('{:<12} {:>9} primitives {:>8.2f}s {:>10.1f} MB peak RSS'.format(
+                name, count, float(elapsed), float(peak)))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
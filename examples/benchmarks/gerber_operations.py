@@ -0,0 +1,74 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark the CAM file operations on both storages of a Gerber file.
+
+Each operation works on a deep copy of a synthetic board, the copy is not
+timed. The objects column runs gerber.operations on the board stored as
+objects, the columnar column on the board stored with
+GerberFile.to_columnar. Rotating or mirroring a board stored as objects
+includes storing it in columnar form.
+"""
+
+import copy
+import gc
+import time
+import argparse
+
+from fabtotum.loaders.gerber import rs274x, operations
+
+from synthetic import gerber_board
+
+
+def untimed_copy(function, *args):
+    def run(gerber):
+        # Skip the deep copy done by gerber.operations, it is not timed
+        copy_ = copy.deepcopy
+        operations.copy.deepcopy = lambda value: value
+        try:
+            return function(gerber, *args)
+        finally:
+            operations.copy.deepcopy = copy_
+    return run
+
+
+def timed(gerber, function):
+    gerber = copy.deepcopy(gerber)
+    gc.collect()
+    t0 = time.time()
+    gerber = function(gerber)
+    return time.time() - t0, gerber.bounding_box
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CAM file operations benchmark')
+    parser.add_argument('-n', '--count', type=int, default=20000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-p', '--pour', type=int, default=20000,
+                        help='Number of vertices of the copper pour')
+    args = parser.parse_args()
+
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=args.pour))
+    columnar = copy.deepcopy(gerber)
+    columnar.to_columnar()
+    cases = (
+        ('to_inch', untimed_copy(operations.to_inch)),
+        ('offset', untimed_copy(operations.offset, 1.0, -1.0)),
+        ('rotate', untimed_copy(operations.rotate, 30.0)),
+        ('mirror', untimed_copy(operations.scale, -1.0, 1.0)),
+    )
+
+    print('{:<10} {:>10} {:>10}  {}'.format(
+        '', 'objects', 'columnar', 'bounding box difference'))
+    for name, function in cases:
+        objects, objects_box = timed(gerber, function)
+        columns, columns_box = timed(columnar, function)
+        error = max(abs(a - b) for a, b in zip(sum(objects_box, ()),
+                                                sum(columns_box, ())))
+        print('{:<10} {:>9.3f}s {:>9.3f}s  {:.3g}'.format(
+            name, objects, columns, error))
+
+
+if __name__ == '__main__':
+    main()
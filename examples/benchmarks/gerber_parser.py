@@ -0,0 +1,58 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark GerberParser._parse, the statement recognizer.
+
+Reports statements per second on the example boards and on a synthetic
+coordinate heavy board. Commands are split beforehand so that only the
+recognizer is measured.
+"""
+
+import os
+import glob
+import time
+import argparse
+
+from fabtotum.loaders.gerber.rs274x import GerberParser
+
+from synthetic import gerber_board
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'common', 'pcb_1')
+
+
+def run(name, data, repeat):
+    best = None
+    count = 0
+    commands = list(GerberParser()._split_commands(data))
+    for i in xrange(repeat):
+        parser = GerberParser()
+        t0 = time.time()
+        count = sum(1 for stmt in parser._parse(commands))
+        elapsed = time.time() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    print('{:<40} {:>9} stmts {:>8.4f}s {:>12.0f} stmts/s'.format(
+        name, count, best, count / max(best, 1e-9)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerber parser benchmark')
+    parser.add_argument('-n', '--count', type=int, default=100000,
+                        help='Number of tracks, pads and pour vertices of '
+                             'the synthetic board')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    for filename in sorted(glob.glob(os.path.join(EXAMPLES, '*.g*'))):
+        with open(filename, 'rU') as f:
+            data = f.read()
+        run(os.path.basename(filename), data, args.repeat)
+
+    run('synthetic (tracks)', gerber_board(args.count, 0, 0), args.repeat)
+    run('synthetic (pads)', gerber_board(0, args.count, 0), args.repeat)
+    run('synthetic (pour)', gerber_board(0, 0, args.count), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark gerber.rs274x.stream_primitives against gerber.rs274x.read.
+
+A synthetic board is written to a temporary file and loaded in a fresh
+process for each mode, so that the reported peak RSS only accounts for
+that mode. Both modes must produce the same number of primitives.
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+from fabtotum.loaders.gerber import rs274x
+
+from synthetic import gerber_board_of_size
+
+
+def load(mode, filename):
+    t0 = time.time()
+    if mode == 'read':
+        count = len(rs274x.read(filename).primitives)
+    else:
+        count = sum(1 for primitive in rs274x.stream_primitives(filename))
+    elapsed = time.time() - t0
+    # ru_maxrss is in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print('{} {} {} {}'.format(mode, count, elapsed, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerber streaming benchmark')
+    parser.add_argument('-s', '--size', type=float, default=20,
+                        help='Size of the synthetic board in MB')
+    parser.add_argument('--load', nargs=2, metavar=('MODE', 'FILE'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load(*args.load)
+        return
+
+    fd, filename = tempfile.mkstemp(suffix='.gbr')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(gerber_board_of_size(args.size))
+
+        results = {}
+        for mode in ('read', 'stream'):
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--load', mode, filename])
+            name, count, elapsed, peak = output.split()
+            results[mode] = int(count)
+            print('{:<8} {:>9} primitives {:>8.2f}s {:>10.1f} MB peak RSS'.format(
+                name, count, float(elapsed), float(peak)))
+
+        if results['read'] != results['stream']:
+            print('MISMATCH: read and stream yield different primitive counts')
+            sys.exit(1)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark GerberParser._split_commands.
+
+Compares the block tokenizer against the former character by character
+implementation on the example boards and on a synthetic large board, and
+checks that both produce the same command stream.
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+from fabtotum.loaders.gerber.rs274x import GerberParser
+
+from synthetic import gerber_board_of_size
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'common', 'pcb_1')
+
+
+def reference_split_commands(data):
+    """ Character by character splitter, kept as a baseline. """
+    length = len(data)
+    start = 0
+    in_header = True
+
+    for cur in range(0, length):
+        val = data[cur]
+
+        if val == '%' and start == cur:
+            in_header = True
+            continue
+
+        if val == '\r' or val == '\n':
+            if start != cur:
+                yield data[start:cur]
+            start = cur + 1
+
+        elif not in_header and val == '*':
+            yield data[start:cur + 1]
+            start = cur + 1
+
+        elif in_header and val == '%':
+            yield data[start:cur + 1]
+            start = cur + 1
+            in_header = False
+
+
+def measure(func, data, repeat):
+    best = None
+    commands = None
+    for i in xrange(repeat):
+        t0 = time.time()
+        commands = list(func(data))
+        elapsed = time.time() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, commands
+
+
+def run(name, data, repeat):
+    parser = GerberParser()
+    t_ref, ref = measure(reference_split_commands, data, repeat)
+    t_new, new = measure(parser._split_commands, data, repeat)
+    if ref != new:
+        raise AssertionError('Command stream differs for {}'.format(name))
+    print('{:<40} {:>9.2f} MB {:>9} cmds  reference {:>8.4f}s  '
+          'tokenizer {:>8.4f}s  x{:.1f}'.format(
+              name, len(data) / 1e6, len(new), t_ref, t_new,
+              t_ref / max(t_new, 1e-9)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerber tokenizer benchmark')
+    parser.add_argument('-s', '--size', type=float, default=20.0,
+                        help='Size of the synthetic board in MB')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Number of runs, the best one is reported')
+    args = parser.parse_args()
+
+    for filename in sorted(glob.glob(os.path.join(EXAMPLES, '*.g*'))):
+        with open(filename, 'rU') as f:
+            data = f.read()
+        run(os.path.basename(filename), data, args.repeat)
+
+    run('synthetic ({} MB)'.format(args.size),
+        gerber_board_of_size(args.size), 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark holding tab placement.
+
+The outline is a board edge with notches and many vertices, as arcs of a
+Gerber outline are rendered. Holders are added
+as HoldersToolpath used to, splitting every segment longer than the
+minimal length into a LineString and merging the pieces back, and placed
+with fabtotum.toolpath.tabs.place_tabs over the whole ring.
+"""
+
+import time
+import argparse
+
+from shapely.geometry import LineString, Polygon, box
+from shapely.ops import linemerge
+
+from fabtotum.toolpath.tabs import place_tabs
+
+
+def split_holders(ring, holder_size, min_len):
+    """ Holders at the middle of each long segment, as HoldersToolpath did """
+    coords = list(ring.coords)
+    lines = []
+    for p1, p2 in zip(coords[:-1], coords[1:]):
+        l = LineString([p1, p2])
+        if l.length >= min_len:
+            lp1 = (l.length / 2.0) - (holder_size / 2.0)
+            lp2 = (l.length / 2.0) + (holder_size / 2.0)
+            lines.append(LineString([p1, l.interpolate(lp1).coords[0]]))
+            lines.append(LineString([l.interpolate(lp2).coords[0], p2]))
+        else:
+            lines.append(l)
+    ml = linemerge(lines)
+    return list(ml) if ml.geom_type == 'MultiLineString' else [ml]
+
+
+def board_edge(vertices, width=200.0, height=150.0):
+    """ Board edge with connector notches, round corners and dense vertices """
+    polygon = box(0, 0, width, height)
+    for k in range(1, 8):
+        polygon = polygon.difference(box(k * width / 8 - 3, -1, k * width / 8 + 3, 4))
+    ring = polygon.buffer(2.0, resolution=16).exterior
+    points = [ring.interpolate(ring.length * k / vertices).coords[0]
+              for k in range(vertices)]
+    points.append(points[0])
+    return Polygon(points).exterior
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Holding tabs benchmark')
+    parser.add_argument('-n', '--vertices', type=int, default=50000,
+                        help='Number of vertices of the outline')
+    parser.add_argument('-s', '--spacing', type=float, default=50.0,
+                        help='Distance between tabs')
+    args = parser.parse_args()
+
+    ring = board_edge(args.vertices)
+    tab = 4.1
+    print('outline of {} vertices, {:.1f}mm'.format(len(ring.coords), ring.length))
+
+    t0 = time.time()
+    pieces = split_holders(ring, tab, 5.0)
+    elapsed = time.time() - t0
+    print('{:<12} {:>8.3f}s {:>4} pieces'.format('per segment', elapsed, len(pieces)))
+
+    t0 = time.time()
+    tabs = place_tabs(ring.coords, tab, spacing=args.spacing, stretch=10.0)
+    elapsed = time.time() - t0
+    print('{:<12} {:>8.3f}s {:>4} tabs'.format('place_tabs', elapsed, len(tabs)))
+    for start, end in tabs:
+        p = ring.interpolate((start + end) / 2.0)
+        print('  tab at {:7.2f} {:7.2f}'.format(p.x, p.y))
+
+
+if __name__ == '__main__':
+    main()
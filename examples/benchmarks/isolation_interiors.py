@@ -0,0 +1,81 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark and check the isolation rings of pads inside pours.
+
+Every pad of the synthetic board sits in a hole of a copper pour, so the
+buffered copper is a MultiPolygon of pours with many interiors. The rings
+are extracted as IsolationToolpath used to, only the interiors of the last
+polygon, then wrapping the interiors of every polygon in a new Polygon, and
+as it does now. The ring count must match the rings of the buffered copper.
+"""
+
+import time
+import argparse
+
+from shapely.geometry import Polygon
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath import IsolationToolpath
+from fabtotum.toolpath.union import buffer_union
+
+from synthetic import gerber_pour_board
+
+
+def last_rings(result):
+    """ Ring extraction of IsolationToolpath before the fix """
+    tmp = []
+    for f in result:
+        tmp.append(f.exterior)
+    for i in f.interiors:
+        tmp.append(Polygon(i).exterior)
+    return tmp
+
+
+def copied_rings(result):
+    """ The same with the interiors of every polygon """
+    tmp = []
+    for f in result:
+        tmp.append(f.exterior)
+    for f in result:
+        for i in f.interiors:
+            tmp.append(Polygon(i).exterior)
+    return tmp
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Isolation interiors benchmark')
+    parser.add_argument('-p', '--pours', type=int, default=100,
+                        help='Number of copper pours')
+    parser.add_argument('-n', '--pads', type=int, default=64,
+                        help='Number of pads inside each pour')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    args = parser.parse_args()
+
+    gerber = rs274x.loads(gerber_pour_board(pours=args.pours, pads=args.pads,
+                                            width=500.0, height=500.0))
+    ctx = ShapelyContext()
+    for primitive in gerber.primitives:
+        ctx.render(primitive)
+    result = buffer_union(ctx.figs, args.tool / 2.0)
+    expected = sum(1 + len(polygon.interiors) for polygon in result)
+    print('{} copper shapes, {} polygons, {} rings'.format(
+        len(ctx.figs), len(result), expected))
+
+    toolpath = IsolationToolpath()
+    print('{:<8} {:>8} {:>8} {:>12}'.format('', 'time', 'rings', 'length'))
+    cases = (('last', last_rings), ('copied', copied_rings), ('rings', toolpath._rings))
+    for name, function in cases:
+        t0 = time.time()
+        rings = function(result)
+        elapsed = time.time() - t0
+        print('{:<8} {:>7.3f}s {:>8} {:>12.1f}'.format(
+            name, elapsed, len(rings), sum(ring.length for ring in rings)))
+    if len(rings) != expected or abs(sum(r.length for r in rings) - result.length) > 1e-6:
+        print('MISMATCH: rings differ from the buffered copper')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark the offsets of multi-pass isolation.
+
+IsolationToolpath grows each pass from the previous one. This is timed
+against buffering the copper again by the full offset of each pass. The
+error is the largest difference of area between the passes of both divided
+by their length, the mean distance between their outlines.
+"""
+
+import time
+import argparse
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath.union import buffer_union
+
+from synthetic import gerber_board
+
+
+def rebuffered(shapes, tool_r, stepover, passes):
+    return [buffer_union(shapes, tool_r + i * stepover) for i in range(passes)]
+
+
+def incremental(shapes, tool_r, stepover, passes):
+    offsets = [buffer_union(shapes, tool_r)]
+    for i in range(1, passes):
+        offsets.append(offsets[-1].buffer(stepover))
+    return offsets
+
+
+def timed(function, *args):
+    t0 = time.time()
+    result = function(*args)
+    return time.time() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-pass isolation benchmark')
+    parser.add_argument('-n', '--count', type=int, default=3000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    args = parser.parse_args()
+
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    # Unmerged shapes, as rendered before ShapelyContext merges them
+    ctx = ShapelyContext()
+    for primitive in gerber.primitives:
+        ctx.render(primitive)
+    print('{} copper shapes'.format(len(ctx.figs)))
+
+    tool_r = args.tool / 2.0
+    print('{:<7} {:>12} {:>12} {:>8} {:>10}'.format(
+        'passes', 'rebuffered', 'incremental', 'speedup', 'error'))
+    for passes in (1, 2, 3, 5):
+        before, expected = timed(rebuffered, ctx.figs, tool_r, tool_r, passes)
+        after, offsets = timed(incremental, ctx.figs, tool_r, tool_r, passes)
+        error = max(abs(a.area - b.area) / a.length for a, b in zip(expected, offsets))
+        print('{:<7} {:>11.2f}s {:>11.2f}s {:>7.1f}x {:>10.2g}'.format(
+            passes, before, after, before / max(after, 1e-9), error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python2
+
+"""
+Compare path ordering settings by the estimated time of the job.
+
+The isolation paths of a synthetic board are generated unordered and
+ordered with a few numbers of improving passes, milled with MillingPCB into an
+fabtotum.gcode.Estimator, and the travel and total time of each job are
+reported.
+"""
+
+import time
+import argparse
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath import IsolationToolpath
+from fabtotum.gcode import MillingPCB, Estimator
+
+from synthetic import gerber_board
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Job time estimate benchmark')
+    parser.add_argument('-n', '--count', type=int, default=1000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    parser.add_argument('-a', '--acceleration', type=float, default=300.0,
+                        help='Machine acceleration in mm/s^2')
+    args = parser.parse_args()
+
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    ctx = ShapelyContext()
+    gerber.render(ctx)
+
+    print('{:<12} {:>10} {:>10} {:>10} {:>10}'.format('ordering', 'travel', 'travel+z', 'total',
+                                                      'counted in'))
+    for passes in (None, 0, 1, 4):
+        toolpath = IsolationToolpath()
+        toolpath.settings['optimize'] = passes is not None
+        toolpath.settings['optimize-passes'] = passes or 0
+        toolpath.add_tool(args.tool)
+        paths = toolpath.generate(ctx.figs)
+
+        estimator = Estimator(acceleration=args.acceleration)
+        cnc = MillingPCB(estimator)
+        cnc.setTravelSpeed(XY=5000, Z=1000)
+        cnc.setMillingSpeed(300)
+        cnc.zeroAll()
+        cnc.setAbsolute()
+        cnc.spindleON()
+        t0 = time.time()
+        for path in paths:
+            cnc.millPath(path)
+        cnc.spindleOFF()
+        elapsed = time.time() - t0
+        print('{:<12} {:>8.0f}mm {:>9.0f}s {:>9.0f}s {:>9.2f}s'.format(
+            'none' if passes is None else '{0} passes'.format(passes),
+            estimator.lengths['travel'], estimator.times['travel'] + estimator.times['z'],
+            estimator.total_time, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark milling paths point by point and from coordinate arrays.
+
+The same random paths are milled with MillingPCB into a GCodeWriter,
+first with travelTo and millTo on every point as millPath used to, then
+with millPath, which rounds and formats all the moves of a path at once.
+"""
+
+import time
+import random
+import argparse
+import StringIO
+
+from shapely.geometry import LineString
+
+from fabtotum.gcode import MillingPCB, GCodeWriter
+
+
+def random_paths(count, vertices, seed):
+    rnd = random.Random(seed)
+    paths = []
+    for i in xrange(count):
+        x, y = rnd.uniform(0, 100), rnd.uniform(0, 100)
+        coords = []
+        for j in xrange(vertices):
+            x += rnd.uniform(-1, 1)
+            y += rnd.uniform(-1, 1)
+            coords.append((x, y))
+        paths.append(LineString(coords))
+    return paths
+
+
+def per_point(cnc, path):
+    x, y = path.xy
+    cnc.travelTo(x[0], y[0])
+    for i in xrange(1, len(x)):
+        cnc.millTo(x[i], y[i])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Path milling benchmark')
+    parser.add_argument('-n', '--count', type=int, default=2000,
+                        help='Number of paths')
+    parser.add_argument('-v', '--vertices', type=int, default=100,
+                        help='Vertices of each path')
+    parser.add_argument('-p', '--passes', type=int, default=2,
+                        help='Number of milling passes of each path')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    paths = random_paths(args.count, args.vertices, args.seed)
+
+    print('{:<10} {:>8} {:>10} {:>12}'.format('', 'time', 'lines', 'lines/s'))
+    states = []
+    for name in ('per point', 'millPath'):
+        fd = StringIO.StringIO()
+        out = GCodeWriter(fd)
+        cnc = MillingPCB(out)
+        cnc.setMinimalXYStep(None)
+        t0 = time.time()
+        for path in paths:
+            for p in xrange(args.passes):
+                if name == 'millPath':
+                    cnc.millPath(path)
+                else:
+                    per_point(cnc, path)
+        cnc.stopMilling()
+        out.close()
+        elapsed = time.time() - t0
+        print('{:<10} {:>7.2f}s {:>10} {:>12.0f}'.format(name, elapsed, out.lines,
+                                                         out.lines / elapsed))
+        states.append((cnc.curX, cnc.curY, cnc.curZ, cnc.curF))
+    print('same end state: {}'.format(states[0] == states[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark modal compression of the G-code of a job.
+
+The isolation paths of a synthetic board are milled with MillingPCB as
+they are, with modal compression and with modal compression leaving out
+repeated motion words, and the size of each output is reported.
+"""
+
+import time
+import argparse
+import StringIO
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath import IsolationToolpath
+from fabtotum.gcode import MillingPCB, GCodeWriter
+
+from synthetic import gerber_board
+
+
+def mill(paths, compression, motion_words=True):
+    fd = StringIO.StringIO()
+    out = GCodeWriter(fd)
+    cnc = MillingPCB(out)
+    if compression:
+        cnc.setModalCompression(motion_words=motion_words)
+    cnc.setMinimalXYStep(None)
+    cnc.zeroAll()
+    cnc.setAbsolute()
+    for path in paths:
+        cnc.millPath(path)
+    cnc.stopMilling()
+    cnc.flush()
+    out.close()
+    return fd.getvalue(), cnc.getBytesSaved()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Modal compression benchmark')
+    parser.add_argument('-n', '--count', type=int, default=1000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    args = parser.parse_args()
+
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    ctx = ShapelyContext()
+    gerber.render(ctx)
+    toolpath = IsolationToolpath()
+    toolpath.settings['optimize'] = False
+    toolpath.add_tool(args.tool)
+    paths = toolpath.generate(ctx.figs)
+    print('{} paths, {} vertices'.format(len(paths), sum(len(path.coords) for path in paths)))
+
+    print('{:<16} {:>8} {:>10} {:>10} {:>10}'.format('', 'time', 'lines', 'bytes', 'saved'))
+    for name, compression, motion_words in (('plain', False, True),
+                                            ('modal', True, True),
+                                            ('modal, no G0/G1', True, False)):
+        t0 = time.time()
+        text, saved = mill(paths, compression, motion_words)
+        elapsed = time.time() - t0
+        print('{:<16} {:>7.2f}s {:>10} {:>10} {:>10}'.format(name, elapsed, text.count('\n'),
+                                                             len(text), saved))
+
+
+if __name__ == '__main__':
+    main()
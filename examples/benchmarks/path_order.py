@@ -0,0 +1,59 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark the travel saved by ToolpathContext.optimize.
+
+Random pad contours and short open paths are ordered with
+fabtotum.toolpath.ordering.order_paths for several numbers of improving
+passes, 0 passes keeping the nearest neighbour order. The travel is the distance
+covered at travel height from the origin to the first path and between
+paths, the first one for the order the paths were generated in.
+"""
+
+import time
+import random
+import argparse
+
+import shapely.geometry as sg
+
+from fabtotum.toolpath.ordering import order_paths, path_travel
+
+
+def random_paths(count, seed=0):
+    rnd = random.Random(seed)
+    side = 5.0 * count ** 0.5
+    paths = []
+    for i in xrange(count):
+        x = rnd.uniform(0, side)
+        y = rnd.uniform(0, side)
+        if i % 4 == 0:
+            paths.append(sg.LineString([(x, y), (x + rnd.uniform(-3, 3), y + rnd.uniform(-3, 3)),
+                                        (x + rnd.uniform(-3, 3), y + rnd.uniform(-3, 3))]))
+        else:
+            paths.append(sg.Point(x, y).buffer(rnd.uniform(0.3, 1.5), 4).exterior)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Path ordering benchmark')
+    parser.add_argument('-n', '--count', type=int, default=2000,
+                        help='Number of paths')
+    args = parser.parse_args()
+
+    paths = random_paths(args.count)
+    before = path_travel(paths)
+    print('{} paths, travel {:.1f}'.format(args.count, before))
+    print('{:<8} {:>8} {:>10} {:>8}'.format('passes', 'time', 'travel', 'saved'))
+    for passes in (0, 1, 4, 16):
+        t0 = time.time()
+        ordered = order_paths(paths, passes=passes)
+        elapsed = time.time() - t0
+        after = path_travel(ordered)
+        print('{:<8} {:>7.2f}s {:>10.1f} {:>7.1f}%'.format(
+            passes, elapsed, after, 100.0 * (1 - after / before)))
+        if len(ordered) != len(paths):
+            print('MISMATCH: {} paths instead of {}'.format(len(ordered), len(paths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark PCB.from_directory with and without a process pool.
+
+A stack of synthetic Gerber layers is written to a temporary directory and
+loaded one file after another, then on a process pool. Both loads must give
+the same layers in the same order.
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+from fabtotum.loaders.gerber.pcb import PCB
+
+from synthetic import gerber_board
+
+LAYERS = ('F.Cu.gtl', 'B.Cu.gbl', 'F.SilkS.gto', 'B.SilkS.gbo', 'F.Mask.gts',
+          'B.Mask.gbs', 'F.Paste.gtp', 'Edge.Cuts.gm1')
+
+
+def load(directory, processes):
+    t0 = time.time()
+    pcb = PCB.from_directory(directory, processes=processes)
+    elapsed = time.time() - t0
+    layers = [(os.path.basename(layer.filename), layer.layer_class,
+               layer.mirrored, layer.bounds) for layer in pcb.layers]
+    return elapsed, layers
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PCB loading benchmark')
+    parser.add_argument('-n', '--count', type=int, default=5000,
+                        help='Number of tracks and pads of each layer')
+    parser.add_argument('-p', '--processes', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='Number of worker processes')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        for seed, layer in enumerate(LAYERS):
+            with open(os.path.join(directory, 'board-' + layer), 'w') as f:
+                f.write(gerber_board(tracks=args.count, pads=args.count,
+                                     pour_vertices=args.count, seed=seed))
+
+        sequential, sequential_layers = load(directory, 1)
+        pool, pool_layers = load(directory, args.processes)
+        print('{} layers, {} CPUs'.format(len(LAYERS), multiprocessing.cpu_count()))
+        print('{:<14} {:>8.2f}s'.format('sequential', sequential))
+        print('{:<14} {:>8.2f}s {:>6.2f}x'.format(
+            '{} processes'.format(args.processes), pool, sequential / pool))
+        if sequential_layers != pool_layers:
+            print('MISMATCH: layers differ')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark copper rubout with PocketToolpath.
+
+All the copper of a synthetic board outside of the tracks and pads is
+cleared. The zigzag strategy is timed against clipping each scanline with
+shapely, one segment per lift, as a plain implementation would. Lifts are
+the number of paths left after linking.
+"""
+
+import math
+import time
+import argparse
+
+from shapely.geometry import LineString, box
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath.pocket import PocketToolpath
+
+from synthetic import gerber_board
+
+
+def clipped_scanlines(region, stepover):
+    """ One segment per scanline crossing of the region """
+    minx, miny, maxx, maxy = region.bounds
+    count = max(int(math.ceil((maxy - miny) / stepover)), 1)
+    spacing = (maxy - miny) / count
+    segments = []
+    for k in range(count):
+        y = miny + (k + 0.5) * spacing
+        clipped = region.intersection(LineString([(minx - 1, y), (maxx + 1, y)]))
+        if clipped.geom_type == 'LineString':
+            segments.append(clipped)
+        else:
+            segments.extend(g for g in getattr(clipped, 'geoms', []) if g.length > 0)
+    return segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copper rubout benchmark')
+    parser.add_argument('-n', '--count', type=int, default=1000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    args = parser.parse_args()
+
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    ctx = ShapelyContext()
+    for primitive in gerber.primitives:
+        ctx.render(primitive)
+    boundary = box(-1.0, -1.0, side + 1.0, side * 0.75 + 1.0)
+    print('{} copper shapes, {:.0f}x{:.0f}mm'.format(len(ctx.figs), side, side * 0.75))
+
+    toolpath = PocketToolpath(boundary=boundary)
+    toolpath.settings['optimize'] = False
+    toolpath.add_tool(args.tool)
+    t0 = time.time()
+    region = toolpath.pocket_region(ctx.figs, args.tool)
+    print('region {:.2f}s, {:.1f}mm2 to clear'.format(time.time() - t0, region.area))
+
+    t0 = time.time()
+    segments = clipped_scanlines(region, args.tool / 2.0)
+    elapsed = time.time() - t0
+    print('{:<16} {:>8} {:>8} {:>12}'.format('', 'time', 'lifts', 'milled'))
+    print('{:<16} {:>7.2f}s {:>8} {:>10.1f}mm'.format(
+        'shapely clip', elapsed, len(segments), sum(s.length for s in segments)))
+
+    for strategy in ('zigzag', 'contour'):
+        toolpath.set_pocket_params(strategy=strategy)
+        t0 = time.time()
+        paths = toolpath.generate(ctx.figs)
+        elapsed = time.time() - t0
+        print('{:<16} {:>7.2f}s {:>8} {:>10.1f}mm'.format(
+            strategy, elapsed, len(paths), sum(p.length for p in paths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark simplifying the paths of a job at once.
+
+The isolation paths of a synthetic board are simplified path by path with
+shapely, once for every milling pass as MillingPCB used to, and then all
+at once with fabtotum.toolpath.simplify.simplify_paths.
+"""
+
+import time
+import argparse
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath import IsolationToolpath
+from fabtotum.toolpath.simplify import simplify_paths, CHORD_ERROR
+
+from synthetic import gerber_board
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Path simplification benchmark')
+    parser.add_argument('-n', '--count', type=int, default=5000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    parser.add_argument('-p', '--passes', type=int, default=2,
+                        help='Number of milling passes of each path')
+    args = parser.parse_args()
+
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    ctx = ShapelyContext()
+    gerber.render(ctx)
+    toolpath = IsolationToolpath()
+    toolpath.settings['optimize'] = False
+    toolpath.add_tool(args.tool)
+    paths = toolpath.generate(ctx.figs)
+    vertices = sum(len(path.coords) for path in paths)
+    tolerance = CHORD_ERROR * args.tool
+    print('{} paths, {} vertices, tolerance {}mm'.format(len(paths), vertices, tolerance))
+
+    print('{:<10} {:>8} {:>10}'.format('', 'time', 'removed'))
+    t0 = time.time()
+    for i in range(args.passes):
+        simplified = [path.simplify(tolerance, preserve_topology=True) for path in paths]
+    elapsed = time.time() - t0
+    removed = vertices - sum(len(path.coords) for path in simplified)
+    print('{:<10} {:>7.2f}s {:>10}'.format('per path', elapsed, removed))
+
+    t0 = time.time()
+    simplified, removed = simplify_paths(paths, tolerance)
+    elapsed = time.time() - t0
+    print('{:<10} {:>7.2f}s {:>10}'.format('job', elapsed, removed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark the spatial index of ShapelyContext.
+
+The tracks and pads of a synthetic board are rendered one by one, without
+merging them, and checked for clearance violations and clipped to a window
+with the index, then by comparing every pair of figs and intersecting every
+fig. Both ways must find the same pairs and keep the same area.
+"""
+
+import time
+import argparse
+
+import shapely.geometry as sg
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+
+from synthetic import gerber_board
+
+
+def brute_clearance(figs, clearance):
+    violations = []
+    for i, fig in enumerate(figs):
+        for j in xrange(i + 1, len(figs)):
+            distance = fig.distance(figs[j])
+            if distance < clearance:
+                violations.append((i, j, distance))
+    return violations
+
+
+def brute_clip(figs, outline):
+    return [fig.intersection(outline) for fig in figs]
+
+
+def timed(function, *args):
+    t0 = time.time()
+    result = function(*args)
+    return time.time() - t0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spatial index benchmark')
+    parser.add_argument('-n', '--count', type=int, default=1000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-c', '--clearance', type=float, default=0.2,
+                        help='Clearance to check in board units')
+    args = parser.parse_args()
+
+    # Keep the density of the default board when the count grows
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    ctx = ShapelyContext()
+    for primitive in gerber.primitives:
+        ctx.render(primitive)
+    figs = ctx.figs
+    outline = sg.box(side * 0.25, side * 0.2, side * 0.5, side * 0.4)
+    print('{} figs'.format(len(figs)))
+
+    index, _ = timed(lambda: ctx.spatial_index)
+    after, violations = timed(ctx.clearance_violations, args.clearance)
+    before, expected = timed(brute_clearance, figs, args.clearance)
+    print('{:<12} {:>10} {:>10} {:>8}'.format('', 'pairs', 'index', 'speedup'))
+    print('{:<12} {:>9.3f}s {:>9.3f}s {:>7.1f}x  (build {:.3f}s)'.format(
+        'clearance', before, after, before / max(after, 1e-9), index))
+    if sorted(violations) != sorted(expected):
+        print('MISMATCH: {} violations instead of {}'.format(
+            len(violations), len(expected)))
+
+    before, expected = timed(brute_clip, figs, outline)
+    after, _ = timed(ctx.clip, outline)
+    print('{:<12} {:>9.3f}s {:>9.3f}s {:>7.1f}x'.format(
+        'clip', before, after, before / max(after, 1e-9)))
+    error = abs(sum(fig.area for fig in expected) - sum(fig.area for fig in ctx.figs))
+    if error > 1e-6:
+        print('MISMATCH: clipped area differs by {:.3g}'.format(error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python2
+
+"""
+Synthetic board generators used by the benchmarks in this directory.
+
+The generated Gerber data mimics KiCad output (FSLAX46Y46, millimeters) so
+that the parser follows the same code paths as for real boards.
+"""
+
+import math
+import random
+
+GERBER_HEADER = """G04 Synthetic benchmark board*
+%FSLAX46Y46*%
+%MOMM*%
+G01*
+%ADD10C,0.250000*%
+%ADD11R,1.500000X1.000000*%
+%ADD12O,1.700000X1.200000*%
+%ADD13C,1.600000*%
+"""
+
+
+def _coord(value):
+    return str(int(round(value * 1000000)))
+
+
+def gerber_board(tracks=10000, pads=10000, pour_vertices=10000,
+                 width=100.0, height=80.0, seed=0, track_length=None):
+    """
+    Return the contents of a synthetic copper layer.
+
+    tracks:
+        number of D01 track segments drawn with a round aperture
+    pads:
+        number of D03 flashes, cycling through rectangle/obround/circle pads
+    pour_vertices:
+        number of vertices of a G36/G37 copper pour region
+    track_length:
+        longest track segment, segments go anywhere on the board when None
+    """
+    rnd = random.Random(seed)
+    out = [GERBER_HEADER]
+
+    out.append('D10*\n')
+    for i in xrange(tracks):
+        if track_length is None or i % 20 == 0:
+            x = rnd.uniform(0, width)
+            y = rnd.uniform(0, height)
+        else:
+            x = min(max(x + rnd.uniform(-track_length, track_length), 0), width)
+            y = min(max(y + rnd.uniform(-track_length, track_length), 0), height)
+        if i % 20 == 0:
+            out.append('X%sY%sD02*\n' % (_coord(x), _coord(y)))
+        out.append('X%sY%sD01*\n' % (_coord(x), _coord(y)))
+
+    for i in xrange(pads):
+        if i % 1000 == 0:
+            out.append('D%d*\n' % (11 + (i / 1000) % 3))
+        x = (i % 200) * (width / 200.0)
+        y = (i / 200) % 200 * (height / 200.0)
+        out.append('X%sY%sD03*\n' % (_coord(x), _coord(y)))
+
+    if pour_vertices:
+        out.append('G36*\n')
+        cx = width / 2.0
+        cy = height / 2.0
+        for i in xrange(pour_vertices + 1):
+            a = 2 * math.pi * i / pour_vertices
+            r = min(width, height) * (0.4 + 0.05 * math.sin(a * 37))
+            op = 'D02' if i == 0 else 'D01'
+            out.append('X%sY%s%s*\n' % (_coord(cx + r * math.cos(a)),
+                                        _coord(cy + r * math.sin(a)), op))
+        out.append('G37*\n')
+
+    out.append('M02*\n')
+    return ''.join(out)
+
+
+def gerber_pour_board(pours=16, pads=100, width=100.0, height=80.0, seed=0):
+    """
+    Return the contents of a synthetic copper layer of pads inside pours.
+
+    pours:
+        number of square G36/G37 pours on a grid over the board
+    pads:
+        number of circle pads of each pour, each flashed in a square hole
+        of its pour. The holes are written as KiCad does, joined to the
+        pour outline by a zero width cut.
+    """
+    rnd = random.Random(seed)
+    out = [GERBER_HEADER]
+    columns = int(math.ceil(math.sqrt(pours)))
+    rows = int(math.ceil(float(pours) / columns))
+    size = min(width / columns, height / rows) * 0.9
+    holes = int(math.ceil(math.sqrt(pads)))
+    pitch = size / (holes + 1)
+    hole = min(pitch * 0.8, 3.0)
+    centers = []
+
+    for p in xrange(pours):
+        x0 = (p % columns) * width / columns
+        y0 = (p / columns) * height / rows
+        out.append('G36*\n')
+        out.append('X%sY%sD02*\n' % (_coord(x0), _coord(y0)))
+        for i in xrange(pads):
+            cx = x0 + pitch * (i % holes + 1) + rnd.uniform(-0.1, 0.1) * pitch
+            cy = y0 + pitch * (i / holes + 1) + rnd.uniform(-0.1, 0.1) * pitch
+            centers.append((cx, cy))
+            # Down the left edge of the hole, around it and back the same way
+            hx = cx - hole / 2
+            hy = cy - hole / 2
+            cut = [(x0, hy), (hx, hy), (hx, hy + hole), (hx + hole, hy + hole),
+                   (hx + hole, hy), (hx, hy), (x0, hy)]
+            for x, y in cut:
+                out.append('X%sY%sD01*\n' % (_coord(x), _coord(y)))
+        for x, y in ((x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size), (x0, y0)):
+            out.append('X%sY%sD01*\n' % (_coord(x), _coord(y)))
+        out.append('G37*\n')
+
+    out.append('D13*\n')
+    for x, y in centers:
+        out.append('X%sY%sD03*\n' % (_coord(x), _coord(y)))
+
+    out.append('M02*\n')
+    return ''.join(out)
+
+
+def gerber_board_of_size(megabytes, seed=0):
+    """ Return a synthetic copper layer of roughly `megabytes` MB. """
+    # One of each item is roughly 25 bytes
+    count = int(megabytes * 1e6 / 75)
+    return gerber_board(tracks=count, pads=count, pour_vertices=count, seed=seed)
+
+
+def _excellon_coord(value, format, zeros):
+    integer_digits, decimal_digits = format
+    digits = '%0*d' % (integer_digits + decimal_digits,
+                       int(round(abs(value) * 10 ** decimal_digits)))
+    # Excellon names the zeros that are kept
+    digits = (digits.rstrip('0') if zeros == 'leading' else digits.lstrip('0')) or '0'
+    return ('-' if value < 0 else '') + digits
+
+
+def excellon_board(hits=10000, tools=5, units='inch', zeros='leading',
+                   format=(2, 4), unit_header=True, width=4.0, height=3.0,
+                   seed=0):
+    """
+    Return the contents of a synthetic Excellon drill file.
+
+    hits:
+        number of drill hits, spread over `tools` tools
+    zeros:
+        zeros kept in the coordinates, 'leading' (LZ) or 'trailing' (TZ)
+    unit_header:
+        write the INCH/METRIC statement that names the zeros, without it the
+        reader has to guess them from the coordinates
+    """
+    rnd = random.Random(seed)
+    out = ['M48\n']
+    if unit_header:
+        out.append('%s,%s\n' % ('INCH' if units == 'inch' else 'METRIC',
+                                'LZ' if zeros == 'leading' else 'TZ'))
+    diameter = 0.03 if units == 'inch' else 0.8
+    for tool in xrange(1, tools + 1):
+        out.append('T%dC%.3f\n' % (tool, diameter * (1 + 0.2 * tool)))
+    out.append('%\nG90\nG05\n')
+    for tool in xrange(1, tools + 1):
+        out.append('T%d\n' % tool)
+        for i in xrange(hits / tools):
+            out.append('X%sY%s\n' % (
+                _excellon_coord(rnd.uniform(0, width), format, zeros),
+                _excellon_coord(rnd.uniform(0, height), format, zeros)))
+    out.append('T0\nM30\n')
+    return ''.join(out)
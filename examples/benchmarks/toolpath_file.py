@@ -0,0 +1,84 @@
+#!/usr/bin/env python2
+
+"""
+Benchmark keeping toolpaths in a toolpath file.
+
+The isolation paths of a synthetic board are generated, saved with
+fabtotum.toolpath.Toolpaths and loaded back memory mapped and read, and
+compared with pickling the shapely paths. The time to generate the paths
+is what loading them from the file saves.
+"""
+
+import os
+import time
+import pickle
+import argparse
+import tempfile
+
+from fabtotum.loaders.gerber import rs274x
+from fabtotum.loaders.gerber.render import ShapelyContext
+from fabtotum.toolpath import IsolationToolpath, Toolpaths, ToolpathFile
+from fabtotum.toolpath.pathfile import FEED_MILL
+
+from synthetic import gerber_board
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Toolpath file benchmark')
+    parser.add_argument('-n', '--count', type=int, default=2000,
+                        help='Number of tracks and pads of the synthetic board')
+    parser.add_argument('-d', '--tool', type=float, default=0.4,
+                        help='Tool diameter')
+    args = parser.parse_args()
+
+    side = 100.0 * (args.count / 1000.0) ** 0.5
+    gerber = rs274x.loads(gerber_board(tracks=args.count, pads=args.count,
+                                       pour_vertices=0, width=side,
+                                       height=side * 0.75, track_length=2.0))
+    ctx = ShapelyContext()
+    gerber.render(ctx)
+    toolpath = IsolationToolpath()
+    toolpath.settings['optimize'] = False
+    toolpath.add_tool(args.tool)
+    t0 = time.time()
+    paths = toolpath.generate(ctx.figs)
+    generate = time.time() - t0
+    print('{} paths, {} vertices, generated in {:.2f}s'.format(
+        len(paths), sum(len(path.coords) for path in paths), generate))
+
+    handle, filename = tempfile.mkstemp(suffix='.tlp')
+    os.close(handle)
+    print('{:<10} {:>8} {:>8} {:>8} {:>10}'.format('', 'save', 'load', 'read', 'bytes'))
+    try:
+        t0 = time.time()
+        with open(filename, 'wb') as fd:
+            pickle.dump(paths, fd, pickle.HIGHEST_PROTOCOL)
+        save = time.time() - t0
+        t0 = time.time()
+        with open(filename, 'rb') as fd:
+            loaded = pickle.load(fd)
+        load = time.time() - t0
+        print('{:<10} {:>7.2f}s {:>7.2f}s {:>7.2f}s {:>10}'.format(
+            'pickle', save, load, 0.0, os.path.getsize(filename)))
+
+        for mmap in (True, False):
+            t0 = time.time()
+            toolpaths = Toolpaths()
+            toolpaths.add(paths, FEED_MILL, tool=args.tool)
+            toolpaths.save(filename)
+            save = time.time() - t0
+            t0 = time.time()
+            loaded = ToolpathFile(filename, mmap=mmap)
+            load = time.time() - t0
+            t0 = time.time()
+            vertices = sum(len(path.coords) for path in loaded.paths(FEED_MILL))
+            read = time.time() - t0
+            print('{:<10} {:>7.2f}s {:>7.2f}s {:>7.2f}s {:>10}'.format(
+                'mmap' if mmap else 'read', save, load, read, os.path.getsize(filename)))
+            del loaded
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
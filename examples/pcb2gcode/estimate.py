@@ -0,0 +1,35 @@
+#!/usr/bin/env python2
+
+from fabtotum.gcode import estimate_file
+
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate the time of gcode files')
+    parser.add_argument('files', metavar='<file>', nargs='+',
+                        help='Gcode files to estimate')
+    parser.add_argument('-a', '--acceleration', type=float, default=None,
+                        help='Machine acceleration in mm/s^2, moves at full feed rate if not given')
+    parser.add_argument('-f', '--feed', type=float, default=1000,
+                        help='Feed rate of moves before any F word in mm/min')
+    parser.add_argument('-s', '--sections', action='store_true',
+                        help='Show the time of each section, sections start at comments')
+    app_args = parser.parse_args()
+
+    total = 0.0
+    for filename in app_args.files:
+        estimator = estimate_file(filename, feed=app_args.feed,
+                                  acceleration=app_args.acceleration)
+        print filename
+        print estimator.summary()
+        if app_args.sections:
+            for name, times in estimator.sections:
+                seconds = sum(times.values())
+                if seconds > 0:
+                    print "{0:>10.1f}s  {1}".format(seconds, name)
+        total += estimator.total_time
+    if len(app_args.files) > 1:
+        print "Total {0:.0f}s".format(total)
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,19 @@
 from fabtotum.loaders import gerber
 from fabtotum.loaders.gerber.render import *
 from fabtotum.toolpath import *
+from fabtotum.toolpath.drilling import order_hits, route_length
+from fabtotum.toolpath.pathfile import FEED_MILL, FEED_CUT, FEED_RUBOUT
+from fabtotum.loaders.gerber.excellon import DrillHit
 from fabtotum.gcode import *
 
 import os,sys
 import argparse
 import json
+import hashlib
 
 import shapely.geometry as sg
 from shapely import affinity
+from shapely.ops import cascaded_union, polygonize
 
 
 ################################ DEBUG #########################################
@@ -51,14 +56,67 @@ def load_config_from_file(filename):
     
 ########################################################################
 
-class GCodeOutput(object):
-    
-    def __init__(self, filename):
-        self.filename = filename
-        self.fd = open(filename, 'w')
-    
-    def write(self, v):
-        self.fd.write(v + '\r\n')
+# Settings shaping the toolpaths of copper and outline layers
+COPPER_KEYS = ('mill-bit-diameter', 'plunge-depth', 'isolation-passes', 'isolation-stepover',
+               'rubout', 'rubout-strategy', 'rubout-stepover', 'chord-error',
+               'optimize-passes', 'optimize-time', 'flip-top-bottom', 'rotation')
+OUTLINE_KEYS = ('cut-bit-diameter', 'cut-depth', 'use-holders', 'chord-error',
+                'optimize-passes', 'optimize-time', 'flip-top-bottom', 'rotation')
+
+def toolpath_key(config, keys, pcb):
+    """
+    Key of toolpaths generated with the settings ``keys`` from the files
+    of ``pcb`` as they are now.
+    """
+    sources = []
+    for layer in pcb.layers:
+        filename = layer.cam_source.filename
+        if filename and os.path.exists(filename):
+            sources.append([filename, os.path.getmtime(filename), os.path.getsize(filename)])
+    settings = [config[k] for k in keys]
+    return hashlib.sha1(json.dumps([settings, sources], sort_keys=True)).hexdigest()
+
+def cached_toolpaths(cache, name, key, generate):
+    """
+    Return toolpaths ``name`` from directory ``cache`` if they were made
+    for ``key``, otherwise save the Toolpaths returned by ``generate`` there
+    and return them as read back. Nothing is saved if ``cache`` is None.
+    """
+    if cache is None:
+        return generate()
+    filename = os.path.join(cache, name + '.tlp')
+    if os.path.exists(filename):
+        try:
+            toolpaths = ToolpathFile(filename)
+        except ValueError:
+            toolpaths = None
+        if toolpaths is not None and toolpaths.meta.get('key') == key:
+            print "- toolpaths loaded from", filename
+            return toolpaths
+    if not os.path.exists(cache):
+        os.mkdir(cache, 0755)
+    toolpaths = generate()
+    toolpaths.meta['key'] = key
+    toolpaths.save(filename)
+    return ToolpathFile(filename)
+
+def job_output(out, config):
+    """
+    Output of a job written to ``out``, with its time estimated if
+    'estimate-time' is set.
+    """
+    if config['estimate-time']:
+        return Estimator(out, acceleration=config['acceleration'])
+    return out
+
+def close_output(cnc, out):
+    cnc.flush()
+    if cnc.modal is not None:
+        print "- {0}: modal compression saved {1} bytes".format(out.fd.name, cnc.getBytesSaved())
+    if isinstance(cnc.output, Estimator):
+        print "- {0}: estimated time".format(out.fd.name)
+        print cnc.output.summary()
+    out.close()
 
 def main():
     parser = argparse.ArgumentParser(description='-=[[ PCB2GCODE ]]=-')
@@ -113,13 +171,31 @@ def main():
         'travel-z-speed'    : 1000,        # Z speed for getting to travel height
         'milling-start-pause' : 1000,       # Pause after plunging the milling bit into the material
         'number-of-passes'  : 2,        # Number of milling passes for each conture
+        'isolation-passes'  : 1,        # Number of concentric isolation contours around copper
+        'isolation-stepover' : None,    # Offset between isolation contours, half the mill bit diameter if None
+        'rubout'            : False,    # Clear all the copper inside the board outline that is not isolated
+        'rubout-strategy'   : 'zigzag', # Rubout fill, 'zigzag' lines or 'contour' offsets
+        'rubout-stepover'   : None,     # Distance between rubout lines, half the mill bit diameter if None
+        'chord-error'       : None,     # Simplify all paths of a layer at once within this fraction of the bit diameter, each path within 0.01mm while milling if None
+        'arc-tolerance'     : None,     # Mill circular runs of paths within this distance with G2/G3 arcs, lines only if None
+        'modal-compression' : False,    # Leave unchanged axes and zero length moves out, merge G1 moves along one line
+        'modal-tolerance'   : 0.001,    # Largest distance of a merged point from the merged G1 move
+        'modal-motion-words' : True,    # Write G0/G1 on every move, set to False only if the firmware supports modal motion
+        'estimate-time'     : False,    # Print the estimated length and time of each job
+        'acceleration'      : None,     # Machine acceleration in mm/s^2 used for the estimate, moves at full feed rate if None
+        'optimize-passes'   : 4,        # Rounds of moves improving the order of the paths of each layer and of the drill hits
+        'optimize-time'     : None,     # Seconds after which improving the order stops, the G-code then depends on the machine speed. No limit if None
+        'processes'         : 1,        # Number of processes loading files
+        'toolpath-cache'    : None,     # Directory keeping generated toolpaths, reused while the input files and the settings shaping them do not change
         # Probe
         'use-continuity-probe'    :    True,
         # Holders
         'use-holders'    : True,    # Skip cutting PCB at some places to keep it in place
         'holder-size'    : 2.0,     # Single holder size
         'holder-height'  : 0.8,     # Thickness of the holders
-        'holder-min-length' : 5,   # Path must be at least this long to include a holder. Use this to avoid putting holders on short segments.
+        'holder-min-length' : 5,   # Length of outline free of corners around a holder. Use this to avoid putting holders on short segments.
+        'holder-count'   : 4,       # Number of holders of each outline
+        'holder-spacing' : None,    # Distance between holders, used instead of holder-count if set
         # Array (TODO)
         # Rotation (TODO)
         'rotation'      : 0.0,      # Board rotation in degrees
@@ -137,13 +213,14 @@ def main():
         fd.write(content)
         sys.exit(0)
 
-    config = load_config_from_file(app_args.config_file)
+    config.update( load_config_from_file(app_args.config_file) )
     
     #~ markers = config['markers']
     #~ marker_mid = ( (markers[0][0] + markers[2][0])/2.0, 
                    #~ (markers[0][1] + markers[1][1])/2.0)
 
-    pcb = gerber.PCB.from_directory(app_args.input, verbose=True)
+    pcb = gerber.PCB.from_directory(app_args.input, verbose=True,
+                                    processes=config['processes'])
 
     layer_shape = {}
     
@@ -178,12 +255,51 @@ def main():
         if not os.path.exists(app_args.output):
             os.mkdir(app_args.output, 0755)
         
-        out = GCodeOutput(app_args.output+'/'+layer.layer_class+'.gcode')
+        out = GCodeWriter(app_args.output+'/'+layer.layer_class+'.gcode')
         toolpath = IsolationToolpath()
+        toolpath.set_passes( config['isolation-passes'], config['isolation-stepover'] )
         toolpath.add_tool( config['mill-bit-diameter'] )
-        paths = toolpath.generate(layer_shape[layer.layer_class].figs)
-
-        cnc = MillingPCB(out)
+        toolpath.settings['optimize-passes'] = config['optimize-passes']
+        toolpath.settings['optimize-time'] = config['optimize-time']
+        toolpath.settings['chord-error'] = config['chord-error']
+
+        def generate():
+            paths = toolpath.generate(layer_shape[layer.layer_class].figs)
+
+            rubout_paths = []
+            if config['rubout']:
+                copper = layer_shape[layer.layer_class]
+                mirrored = (layer.layer_class == 'bottom') != config['flip-top-bottom']
+                outline = layer_shape.get('outline_mirrored' if mirrored else 'outline',
+                                          layer_shape.get('outline'))
+                boundary = None
+                if outline is not None:
+                    boundary = cascaded_union(list(polygonize(outline.figs)))
+                if boundary is None or boundary.is_empty:
+                    boundary = sg.box(*cascaded_union(copper.figs).bounds)
+                rubout = PocketToolpath(strategy=config['rubout-strategy'],
+                                        stepover=config['rubout-stepover'],
+                                        boundary=boundary)
+                rubout.add_tool( config['mill-bit-diameter'] )
+                rubout.settings['optimize-passes'] = config['optimize-passes']
+                rubout.settings['optimize-time'] = config['optimize-time']
+                rubout.settings['chord-error'] = config['chord-error']
+                if paths:
+                    rubout.settings['start'] = paths[-1].coords[-1]
+                rubout_paths = rubout.generate(copper.figs)
+
+            toolpaths = Toolpaths()
+            toolpaths.add(paths, FEED_MILL, z=-config['plunge-depth'], tool=config['mill-bit-diameter'])
+            toolpaths.add(rubout_paths, FEED_RUBOUT, z=-config['plunge-depth'], tool=config['mill-bit-diameter'])
+            return toolpaths
+
+        toolpaths = cached_toolpaths(config['toolpath-cache'], layer.layer_class,
+                                     toolpath_key(config, COPPER_KEYS, pcb), generate)
+
+        cnc = MillingPCB(job_output(out, config))
+        if config['modal-compression']:
+            cnc.setModalCompression(tolerance=config['modal-tolerance'],
+                                    motion_words=config['modal-motion-words'])
 
         # Start code
         cnc.setTravelSpeed    ( XY= config['travel-xy-speed'], Z = config['travel-z-speed'])
@@ -193,6 +309,9 @@ def main():
         cnc.setPlungeDepth    ( config['plunge-depth'] )
         cnc.setSpindleSpeed   ( config['spindle-speed'] )
         cnc.setMillingStartPause ( config['milling-start-pause'] )
+        cnc.setArcTolerance ( config['arc-tolerance'] )
+        if config['chord-error'] is not None:
+            cnc.setMinimalXYStep( None )
 
         if config['use-continuity-probe']:
             cnc.zeroZtoTool()
@@ -203,26 +322,31 @@ def main():
 
         np = config['number-of-passes']
         # Milling code
-        if paths:
-            i = 1
-            for tlp in paths:
-                cnc.addComment('Path #' + str(i) )
-                i += 1
-                is_first = True
-                for p in xrange(np):
-                    if is_first:
-                        cnc.millPath(tlp, feedrate=config['milling-xy-speed1'])
-                        is_first = False
-                    else:
-                        cnc.millPath(tlp)
-                
-                if use_matplot:
-                    plot_line(ax, tlp, color=colors[idx])
-                    #~ plot_coords(ax, tlp)
+        i = 1
+        for tlp in toolpaths.paths(FEED_MILL):
+            cnc.addComment('Path #' + str(i) )
+            i += 1
+            is_first = True
+            for p in xrange(np):
+                if is_first:
+                    cnc.millPath(tlp, feedrate=config['milling-xy-speed1'])
+                    is_first = False
+                else:
+                    cnc.millPath(tlp)
+            
+            if use_matplot:
+                plot_line(ax, tlp, color=colors[idx])
+                #~ plot_coords(ax, tlp)
+
+        # Rubout is milled once, after the isolation
+        for i, tlp in enumerate(toolpaths.paths(FEED_RUBOUT), 1):
+            cnc.addComment('Rubout path #' + str(i) )
+            cnc.millPath(tlp)
 
         # End code
         cnc.stopMilling()
         cnc.spindleOFF()
+        close_output(cnc, out)
         
         idx += 1
 
@@ -239,15 +363,23 @@ def main():
 
     # Prepare drilling
     for layer in pcb.drill_layers:
+        hits = layer.cam_source.hits
+        ordered_hits = order_hits(hits, passes=config['optimize-passes'],
+                                  time_limit=config['optimize-time'])
+        print "Drill route {0:.1f} -> {1:.1f}".format(sum(route_length(hits).values()),
+                                                     sum(route_length(ordered_hits).values()))
         for drill in layer.drills:
             suffix = ''
             if layer.mirrored in ['x', 'y']:
-                out = GCodeOutput(app_args.output+'/'+layer.layer_class+'_'+str(drill)+'_bottom.gcode')
+                out = GCodeWriter(app_args.output+'/'+layer.layer_class+'_'+str(drill)+'_bottom.gcode')
                 suffix = '_mirrored'
             else:
-                out = GCodeOutput(app_args.output+'/'+layer.layer_class+'_'+str(drill)+'.gcode')
+                out = GCodeWriter(app_args.output+'/'+layer.layer_class+'_'+str(drill)+'.gcode')
             
-            cnc = MillingPCB(out)
+            cnc = MillingPCB(job_output(out, config))
+            if config['modal-compression']:
+                cnc.setModalCompression(tolerance=config['modal-tolerance'],
+                                        motion_words=config['modal-motion-words'])
 
             # Start code
             cnc.setTravelSpeed    (    XY= config['travel-xy-speed'],
@@ -267,9 +399,9 @@ def main():
             
             # Drilling
             cnc.addComment('Drill ' + str(drill) + 'mm' )
-            for hole in layer.primitives:
-                if hole.diameter == drill:
-                    p = sg.Point(hole.position)
+            for hit in ordered_hits:
+                if isinstance(hit, DrillHit) and hit.tool.diameter == drill:
+                    p = sg.Point(hit.position)
                                         
                     if layer.mirrored == 'x':
                         center=(0,0,0)
@@ -283,16 +415,17 @@ def main():
             # End code
             cnc.stopMilling()
             cnc.spindleOFF()
+            close_output(cnc, out)
 
     # Prepare cutting
     
     for layer in pcb.outline_layers:
         suffix = ''
         if layer.mirrored in ['x', 'y']:
-            out = GCodeOutput(app_args.output+'/'+layer.layer_class+'_bottom.gcode')
+            out = GCodeWriter(app_args.output+'/'+layer.layer_class+'_bottom.gcode')
             suffix = '_mirrored'
         else:
-            out = GCodeOutput(app_args.output+'/'+layer.layer_class+'.gcode')
+            out = GCodeWriter(app_args.output+'/'+layer.layer_class+'.gcode')
         
         layer_class = layer.layer_class+suffix
         
@@ -304,19 +437,32 @@ def main():
         with open('figs.json', 'w') as f:
             f.write( json.dumps(figs) )
         
-        toolpath = IsolationToolpath(use_interior=False)
+        if config['use-holders']:
+            toolpath = HoldersToolpath()
+            toolpath.set_holder_params(holder_size = config['holder-size'],
+                                       min_len = config['holder-min-length'],
+                                       count = config['holder-count'],
+                                       spacing = config['holder-spacing'] )
+        else:
+            toolpath = IsolationToolpath(use_interior=False)
         toolpath.add_tool( config['cut-bit-diameter'] )
-        paths = toolpath.generate(layer_shape[layer_class].figs)
+        toolpath.settings['optimize-passes'] = config['optimize-passes']
+        toolpath.settings['optimize-time'] = config['optimize-time']
+        toolpath.settings['chord-error'] = config['chord-error']
 
-        toolpath2 = HoldersToolpath()
-        toolpath2.set_holder_params(holder_size = config['holder-size'],
-                                     min_len = config['holder-min-length'] )
-        toolpath2.add_tool( config['cut-bit-diameter'] )
-        paths2 = toolpath2.generate(layer_shape[layer_class].figs)
+        def generate():
+            toolpaths = Toolpaths()
+            toolpaths.add(toolpath.generate(layer_shape[layer_class].figs), FEED_CUT,
+                          z=-config['cut-depth'], tool=config['cut-bit-diameter'])
+            return toolpaths
 
-        print "TOOLPATHS", len(paths2)
+        toolpaths = cached_toolpaths(config['toolpath-cache'], layer_class,
+                                     toolpath_key(config, OUTLINE_KEYS, pcb), generate)
 
-        cnc = MillingPCB(out)
+        cnc = MillingPCB(job_output(out, config))
+        if config['modal-compression']:
+            cnc.setModalCompression(tolerance=config['modal-tolerance'],
+                                    motion_words=config['modal-motion-words'])
 
         # Start code
         cnc.setTravelSpeed  (XY= config['travel-xy-speed'], Z = config['travel-z-speed'])
@@ -325,16 +471,13 @@ def main():
         cnc.setTravelHeight ( config['travel-height'] )
         cnc.setPlungeDepth  ( config['plunge-depth'] )
         cnc.setSpindleSpeed ( config['spindle-speed'] )
+        cnc.setArcTolerance ( config['arc-tolerance'] )
+        if config['chord-error'] is not None:
+            cnc.setMinimalXYStep( None )
         
-        cut_start_depth = 0
-        #~ cut_end_depth = config['pcb-thickness'] + 0.1 #config['cut-depth']
         cut_end_depth = config['cut-depth']
-        
-        if config['use-holders']:
-            #cnc.setCutDepth( config['cut-depth'] - config['holder-height'])
-            holder_cut_start_depth = config['pcb-thickness'] - config['holder-height']
-            holder_cut_end_depth = cut_end_depth
-            cut_end_depth = holder_cut_start_depth
+        # Holders are left standing above this depth
+        holder_depth = config['pcb-thickness'] - config['holder-height']
 
         cnc.setCutStep( config['cut-step'] )
 
@@ -349,28 +492,20 @@ def main():
         
         # Cutting
         cnc.addComment('Cutting')
-        if paths2:
-            i = 1
-            for tlp in paths:
-                cnc.addComment('Path #' + str(i) )
-                i += 1
+        i = 1
+        for tlp in toolpaths.paths(FEED_CUT):
+            cnc.addComment('Path #' + str(i) )
+            i += 1
+            if config['use-holders']:
+                cnc.cutPath(tlp, cut_end_depth=cut_end_depth,
+                            tabs=toolpath.holders(tlp), tab_depth=holder_depth)
+            else:
                 cnc.cutPath(tlp, cut_end_depth=cut_end_depth)
-
-        # Cutting holders
-        if config['use-holders']:
-            cnc.addComment('Cutting Holders')
-            if paths2:
-                i = 1
-                for tlp in paths2:
-                    cnc.addComment('Path #' + str(i) )
-                    i += 1
-                    cnc.cutPath(tlp, 
-                        cut_start_depth=holder_cut_start_depth,
-                        cut_end_depth=holder_cut_end_depth)
         
         # End code
         cnc.stopMilling()
         cnc.spindleOFF()
+        close_output(cnc, out)
 
 
 if __name__ == '__main__':
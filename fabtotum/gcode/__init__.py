@@ -2,3 +2,5 @@ from .raw import RAW
 from .cnc import CNC
 from .milling import Milling
 from .milling_pcb import MillingPCB
+from .writer import GCodeWriter
+from .estimate import Estimator, estimate_file
@@ -0,0 +1,139 @@
+"""
+Arc fitting for toolpaths.
+
+Buffered shapes approximate round pads and corners with many short
+segments. Runs of points that lie on a circle within a tolerance are
+replaced by one arc, so that they can be milled with a single G2/G3.
+"""
+
+import math
+
+import numpy as np
+
+
+def fit_arcs(coords, tolerance, min_segments=3):
+    """ Replace circular runs of a polyline by arcs
+
+    Runs are grown greedily from the first point: the run is doubled while
+    it fits a circle and the longest fitting run is then found by bisection.
+    A run fits when every point of it is within ``tolerance`` of the circle
+    through its first, middle and last points, every segment of it is
+    within ``tolerance`` of the arc, it turns one way only and by less than
+    a full turn. The longest run is left as lines if it is within
+    ``tolerance`` of its chord.
+
+    Parameters
+    ----------
+    coords : sequence of (x, y)
+        Points of the polyline.
+    tolerance : float
+        Largest distance between the polyline and the arcs replacing it.
+    min_segments : int
+        Fewest segments replaced by an arc.
+
+    Returns
+    -------
+    moves : list of ((x, y), arc)
+        End point of each move from the first point on. ``arc`` is None for
+        a line, or ``((cx, cy), ccw)`` for an arc around center ``(cx, cy)``,
+        counter clockwise if ``ccw``.
+    """
+    xy = np.asarray(coords, dtype=float)[:, :2]
+    count = len(xy)
+    moves = []
+    i = 0
+    while i < count - 1:
+        j = i + min_segments
+        arc = _fit(xy, i, j, tolerance) if j < count else None
+        if arc is None:
+            moves.append((tuple(xy[i + 1]), None))
+            i += 1
+            continue
+        # Double the run while it fits, then bisect the longest one
+        step = min_segments
+        good, bad = j, None
+        while bad is None:
+            j = min(good + step, count - 1)
+            if j == good:
+                break
+            fitted = _fit(xy, i, j, tolerance)
+            if fitted is None:
+                bad = j
+            else:
+                good, arc = j, fitted
+                step *= 2
+        while bad is not None and bad - good > 1:
+            j = (good + bad) // 2
+            fitted = _fit(xy, i, j, tolerance)
+            if fitted is None:
+                bad = j
+            else:
+                good, arc = j, fitted
+        if _straight(xy, i, good, tolerance):
+            # Barely away from its chord, better milled as lines
+            moves.extend((tuple(p), None) for p in xy[i + 1:good + 1])
+        else:
+            moves.append((tuple(xy[good]), arc))
+        i = good
+    return moves
+
+
+def reverse_moves(start, moves):
+    """ Return the moves of fit_arcs going back to ``start``
+
+    Moves may carry more items after the arc, they are kept with the move.
+    """
+    points = [start] + [move[0] for move in moves]
+    reversed_moves = []
+    for k in xrange(len(moves) - 1, -1, -1):
+        arc = moves[k][1]
+        if arc is not None:
+            arc = (arc[0], not arc[1])
+        reversed_moves.append((points[k], arc) + tuple(moves[k][2:]))
+    return reversed_moves
+
+
+def _straight(xy, i, j, tolerance):
+    """ Whether points ``i`` to ``j`` are within ``tolerance`` of their chord """
+    run = xy[i:j + 1] - xy[i]
+    chord = run[-1]
+    length = math.hypot(*chord)
+    if length == 0:
+        return False
+    return np.abs(run[:, 0] * chord[1] - run[:, 1] * chord[0]).max() / length < tolerance
+
+
+def _fit(xy, i, j, tolerance):
+    """ Arc through points ``i`` to ``j``, None if they do not fit one """
+    run = xy[i:j + 1]
+    a, b, c = run[0], run[(j - i) // 2], run[-1]
+    ab = b - a
+    ac = c - a
+    d = 2.0 * (ab[0] * ac[1] - ab[1] * ac[0])
+    if abs(d) < 1e-12:
+        return None
+    ab2 = ab.dot(ab)
+    ac2 = ac.dot(ac)
+    center = a + np.array([ac[1] * ab2 - ab[1] * ac2, ab[0] * ac2 - ac[0] * ab2]) / d
+    radius = math.hypot(*(a - center))
+
+    offsets = run - center
+    if np.abs(np.hypot(offsets[:, 0], offsets[:, 1]) - radius).max() > tolerance:
+        return None
+    # Segments bulge inwards from the arc at their middle
+    middles = (offsets[1:] + offsets[:-1]) / 2
+    if (radius - np.hypot(middles[:, 0], middles[:, 1])).max() > tolerance:
+        return None
+
+    angles = np.diff(np.arctan2(offsets[:, 1], offsets[:, 0]))
+    angles = (angles + math.pi) % (2 * math.pi) - math.pi
+    ccw = d > 0
+    if ccw:
+        if angles.min() <= 0:
+            return None
+    elif angles.max() >= 0:
+        return None
+    # A full turn ends where it starts, G2/G3 would not move
+    if abs(angles.sum()) >= 2 * math.pi - 1e-6:
+        return None
+    return (tuple(center), bool(ccw))
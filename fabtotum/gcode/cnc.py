@@ -2,7 +2,10 @@
 CNC module used to abstract calling RAW GCodes.
 """
 
+import numpy as np
+
 from .raw import RAW
+from .modal import ModalOutput, TOLERANCE
 
 class CNC(object):
     """
@@ -31,6 +34,10 @@ class CNC(object):
         ----------
         raw : RAW
             RAW gcode access.
+            
+        modal : ModalOutput
+            Modal compression of the moves, None if disabled.
+            
         curX : int
             Current X coordinate.
 
@@ -58,6 +65,8 @@ class CNC(object):
         mvType: (eABSOLUTE,eRELATIVE)
             Movement type.
         """
+        self.output = output
+        self.modal = None
         self.raw = RAW(output)
         self.curX = 0
         self.curY = 0
@@ -104,6 +113,48 @@ class CNC(object):
             
         return (atX and atY and atZ and atE)
 
+    def setModalCompression(self, enabled=True, tolerance=TOLERANCE, motion_words=True):
+        """
+        Leave out of the moves what is already in effect.
+        
+        Unchanged axes and feed rates are not written, moves of zero length
+        are dropped and consecutive G1 moves within ``tolerance`` of one
+        line are merged.
+        
+        Args:
+            enabled (bool): Compress the moves from now on
+            tolerance (float): Largest distance of a merged point [mm],
+                None to merge no moves
+            motion_words (bool): Write G0/G1 on every move, the firmware
+                must support modal motion if False
+        """
+        if self.modal is not None:
+            self.modal.flush()
+        if enabled:
+            self.modal = ModalOutput(self.output, tolerance, motion_words)
+            self.raw = RAW(self.modal)
+        else:
+            self.modal = None
+            self.raw = RAW(self.output)
+    
+    def getBytesSaved(self):
+        """
+        Return the bytes saved by modal compression.
+        
+        Returns:
+            int: bytes left out of the moves.
+        """
+        if self.modal is None:
+            return 0
+        return self.modal.saved
+    
+    def flush(self):
+        """Write the moves held back and flush the output if it can."""
+        if self.modal is not None:
+            self.modal.flush()
+        elif hasattr(self.output, 'flush'):
+            self.output.flush()
+
     def addComment(self, comment):
         """Add comment."""
         self.raw.COMMENT(comment)
@@ -300,6 +351,96 @@ class CNC(object):
         else:
             self.raw.G0(X=X, Y=Y, Z=Z, F=F)
 
+    def moveAlongXY(self, XY, F = None, use_tool=False):
+        """
+        Execute movements to each `X`,`Y` point of `XY` with speed of `F`,
+        as moveToXY on each point does in absolute mode.
+        Z coordinate is not affected.
+        
+        Points are rounded and the ones at the position of the point before
+        them are skipped, all with numpy, and the moves are formatted at
+        once by outputs that can. If every point is skipped nothing is
+        written and the feed rate is left as it was.
+        
+        Args:
+            XY (array): (n, 2) array of absolute X,Y coordinates [mm]
+            F (float): Feedrate [mm/min]
+            
+            Example:
+                >>> cnc.moveAlongXY(numpy.array([(10, 0), (10, 10)]), F=1000)
+        """
+        self.__update()
+        
+        XY = np.asarray(XY, dtype=float)[:, :2]
+        if not len(XY):
+            return
+        if self.mvType != CNC.eABSOLUTE:
+            for X, Y in XY.tolist():
+                (X, Y, Z) = self.convertToRelative(X, Y)
+                self.moveToXYZ(X, Y, None, F, use_tool)
+            return
+        
+        rounded = np.round(XY, self.decimals)
+        previous = np.empty_like(rounded)
+        previous[0] = (self.curX, self.curY)
+        previous[1:] = rounded[:-1]
+        moved = (np.abs(rounded - previous) >= 1e-8).any(axis=1)
+        rounded = rounded[moved]
+        if not len(rounded):
+            return
+        
+        X, Y = XY[-1].tolist()
+        self.curX = round(X, self.decimals)
+        self.curY = round(Y, self.decimals)
+        
+        if self.curF == F:
+            F = None
+        else:
+            self.curF = F
+        
+        self.raw.G1Path(rounded, F=F, code='G1' if use_tool else 'G0')
+
+    def arcToXY(self, X, Y, I, J, direction=None, F=None):
+        """
+        Execute an arc movement to `X`,`Y` coordinates around the center
+        at `I`,`J` from the current position, with speed of `F`.
+        Z coordinate is not affected.
+        
+        Args:
+            X (float): X coordinate [mm]
+            Y (float): Y coordinate [mm]
+            I (float): X offset of the center [mm]
+            J (float): Y offset of the center [mm]
+            direction (eCW,eCCW): Arc direction, eCW if None
+            F (float): Feedrate [mm/min]
+            
+            Example:
+                >>> cnc.arcToXY(X=10, Y=0, I=5, J=0, direction=CNC.eCW, F=100)
+        """
+        self.__update()
+        
+        X = round(X, self.decimals)
+        Y = round(Y, self.decimals)
+        I = round(I, self.decimals)
+        J = round(J, self.decimals)
+        
+        if self.mvType == CNC.eABSOLUTE:
+            self.curX = X
+            self.curY = Y
+        else:
+            self.curX += X
+            self.curY += Y
+        
+        if self.curF == F:
+            F = None
+        else:
+            self.curF = F
+        
+        if direction == CNC.eCCW:
+            self.raw.G3(X=X, Y=Y, I=I, J=J, F=F)
+        else:
+            self.raw.G2(X=X, Y=Y, I=I, J=J, F=F)
+
     def moveToXY(self, X=None, Y=None, F=None, use_tool=False):
         """
         Execute movement to `X`,`Y` coordinates with speed of `F`.
@@ -0,0 +1,250 @@
+"""
+Time and distance estimation of G-code jobs.
+
+Estimator is an ``output`` for RAW, CNC and its subclasses that adds up
+the length and time of the moves and pauses of a job, and passes the
+gcodes on to another output. estimate_file does the same for a file.
+
+Moves take their length over the feed rate in effect. If an acceleration
+is given every move starts and ends at rest, with a trapezoidal speed
+profile, which overestimates jobs made of many short moves in line.
+"""
+
+import math
+
+import numpy as np
+
+from .raw import format_move
+
+# Kinds of time of a job
+CATEGORIES = ('cut', 'travel', 'z', 'dwell', 'spindle')
+
+
+class Estimator(object):
+    """
+    Add up the length and time of a G-code job.
+    """
+
+    def __init__(self, output=None, feed=1000, acceleration=None, z_acceleration=None):
+        """
+        Construct a new Estimator object.
+
+        Parameters
+        ----------
+        output: Output
+            Output object the gcodes are passed on to, None to only count.
+        feed: float
+            Feed rate of moves before any F word [mm/min].
+        acceleration: float
+            XY acceleration [mm/s^2], None for moves at the feed rate only.
+        z_acceleration: float
+            Acceleration of Z only moves [mm/s^2], ``acceleration`` if None.
+
+        Attributes
+        ----------
+        lengths : dict
+            Length of the moves by category [mm]: 'cut' for G1 moves and
+            arcs in XY, 'travel' for G0 moves in XY, 'z' for Z only moves.
+        times : dict
+            Time by category [s], with 'dwell' for G4 pauses and 'spindle'
+            for the G4 pause after the spindle is turned on or off.
+        sections : list of [name, dict]
+            Time by category of each section of the job, a comment starts
+            a new section named by it. The first section is named None.
+        """
+        self.output = output
+        self.feed = feed
+        self.acceleration = acceleration
+        self.z_acceleration = z_acceleration or acceleration
+        self.format_move = getattr(output, 'format_move', format_move)
+        self.newline = getattr(output, 'newline', '\r\n')
+        self._move = getattr(output, 'move', None)
+        self._moves = getattr(output, 'moves', None)
+        self.position = [0.0, 0.0, 0.0]
+        self.F = None
+        self.relative = False
+        self.motion = 'G0'
+        # The next pause waits for the spindle
+        self.spindle = False
+        self.lengths = dict.fromkeys(CATEGORIES[:3], 0.0)
+        self.times = dict.fromkeys(CATEGORIES, 0.0)
+        self.sections = [[None, dict.fromkeys(CATEGORIES, 0.0)]]
+
+    @property
+    def total_time(self):
+        """Time of the whole job [s]."""
+        return sum(self.times.values())
+
+    def write(self, line):
+        """Count a line of gcode and pass it on."""
+        self.parse(line)
+        if self.output is not None:
+            self.output.write(line)
+
+    def move(self, code, X=None, Y=None, Z=None, I=None, J=None, E=None, F=None):
+        """Count a move ``code`` and pass it on."""
+        self.__move(code, X, Y, Z, I, J, F)
+        if self._move is not None:
+            self._move(code, X, Y, Z, I, J, E, F)
+        elif self.output is not None:
+            self.output.write(self.format_move(code, X, Y, Z, I, J, E, F))
+
+    def moves(self, code, XY, F=None):
+        """Count a move ``code`` to each point of ``XY`` and pass them on."""
+        if len(XY):
+            if F is not None:
+                self.F = F
+            if self.relative:
+                XY = self.position[:2] + np.cumsum(XY, axis=0)
+            steps = np.diff(np.vstack((self.position[:2], XY)), axis=0)
+            lengths = np.hypot(steps[:, 0], steps[:, 1])
+            self.__add('cut' if code != 'G0' else 'travel',
+                       lengths.sum(), self.__time(lengths, self.acceleration).sum())
+            self.position[:2] = XY[-1].tolist()
+            self.motion = code
+        if self._moves is not None:
+            self._moves(code, XY, F)
+        elif self.output is not None:
+            for X, Y in XY.tolist():
+                if self._move is not None:
+                    self._move(code, X, Y, F=F)
+                else:
+                    self.output.write(self.format_move(code, X, Y, F=F))
+                F = None
+
+    def parse(self, line):
+        """Count a line of gcode."""
+        line = line.split(';', 1)
+        if len(line) > 1 and not line[0].strip():
+            self.sections.append([line[1].strip(), dict.fromkeys(CATEGORIES, 0.0)])
+            return
+        words = line[0].upper().split()
+        if not words:
+            return
+        if words[0][0] in 'GM':
+            code = words[0][0] + str(int(float(words[0][1:])))
+            words = words[1:]
+        else:
+            # Modal motion, the move word is left out
+            code = self.motion
+        values = {}
+        for word in words:
+            try:
+                values[word[0]] = float(word[1:])
+            except ValueError:
+                values[word[0]] = None
+
+        get = values.get
+        if code in ('G0', 'G1', 'G2', 'G3'):
+            self.__move(code, get('X'), get('Y'), get('Z'), get('I'), get('J'), get('F'))
+        elif code == 'G4':
+            seconds = (get('S') or 0.0) + (get('P') or 0.0) / 1000.0
+            self.__add('spindle' if self.spindle else 'dwell', None, seconds)
+            self.spindle = False
+        elif code in ('M3', 'M4', 'M5'):
+            self.spindle = True
+        elif code == 'G90':
+            self.relative = False
+        elif code == 'G91':
+            self.relative = True
+        elif code in ('G28', 'G92'):
+            # Homed or set axes, all of them if none is given
+            axes = [axis for axis in 'XYZ' if axis in values] or 'XYZ'
+            for axis in axes:
+                self.position['XYZ'.index(axis)] = (get(axis) or 0.0) if code == 'G92' else 0.0
+
+    def flush(self):
+        """Flush the output if it can."""
+        if hasattr(self.output, 'flush'):
+            self.output.flush()
+
+    def close(self):
+        """Close the output if it can."""
+        if hasattr(self.output, 'close'):
+            self.output.close()
+
+    def summary(self):
+        """Return the lengths and times of the job as text."""
+        lines = ['{0:<8} {1:>10} {2:>10}'.format('', 'length', 'time')]
+        for category in CATEGORIES:
+            length = self.lengths.get(category)
+            lines.append('{0:<8} {1:>10} {2:>10}'.format(
+                category, '' if length is None else '{0:.1f}mm'.format(length),
+                _hms(self.times[category])))
+        lines.append('{0:<8} {1:>10} {2:>10}'.format('total', '', _hms(self.total_time)))
+        return '\n'.join(lines)
+
+    def __move(self, code, X, Y, Z, I, J, F):
+        if F is not None:
+            self.F = F
+        x0, y0, z0 = self.position
+        if self.relative:
+            x = x0 + (X or 0.0)
+            y = y0 + (Y or 0.0)
+            z = z0 + (Z or 0.0)
+        else:
+            x = x0 if X is None else X
+            y = y0 if Y is None else Y
+            z = z0 if Z is None else Z
+        self.position = [x, y, z]
+        self.motion = code
+
+        dz = z - z0
+        if code in ('G2', 'G3'):
+            cx = x0 + (I or 0.0)
+            cy = y0 + (J or 0.0)
+            radius = math.hypot(x0 - cx, y0 - cy)
+            sweep = math.atan2(y - cy, x - cx) - math.atan2(y0 - cy, x0 - cx)
+            if code == 'G2':
+                sweep = -sweep
+            # An arc ending where it starts is a full circle
+            sweep %= 2 * math.pi
+            if sweep == 0.0:
+                sweep = 2 * math.pi
+            length = math.hypot(radius * sweep, dz)
+            category = 'cut'
+        else:
+            planar = math.hypot(x - x0, y - y0)
+            if planar == 0.0:
+                if dz == 0.0:
+                    return
+                self.__add('z', abs(dz), self.__time(abs(dz), self.z_acceleration))
+                return
+            length = math.hypot(planar, dz)
+            category = 'cut' if code == 'G1' else 'travel'
+        self.__add(category, length, self.__time(length, self.acceleration))
+
+    def __time(self, length, acceleration):
+        """Time of moves of ``length`` at the feed rate in effect."""
+        speed = (self.F or self.feed) / 60.0
+        if acceleration is None:
+            return length / speed
+        # Moves shorter than a speed up and a slow down never reach the feed
+        return np.where(length >= speed * speed / acceleration,
+                        length / speed + speed / acceleration,
+                        2.0 * np.sqrt(length / acceleration))
+
+    def __add(self, category, length, seconds):
+        seconds = float(np.sum(seconds))
+        if length is not None:
+            self.lengths[category] += length
+        self.times[category] += seconds
+        self.sections[-1][1][category] += seconds
+
+
+def estimate_file(filename, **kwargs):
+    """
+    Return an Estimator that counted the gcode file ``filename``,
+    ``kwargs`` are passed to Estimator.
+    """
+    estimator = Estimator(**kwargs)
+    with open(filename) as fd:
+        for line in fd:
+            estimator.parse(line)
+    return estimator
+
+
+def _hms(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{0}:{1:02d}:{2:02d}'.format(hours, minutes, seconds)
@@ -1,6 +1,8 @@
 from .cnc import CNC
+from .arcs import fit_arcs, reverse_moves
 
 import math
+import numpy as np
 from shapely.geometry import Point,LineString,Polygon,box
 
 eZERO    = 0
@@ -35,6 +37,10 @@ class MillingPCB(CNC):
         self.cut_start_depth = 0
         # Minimal xy step
         self.min_xy_step = 0.01
+        # Last simplified path, as (path, simplified path)
+        self.__simplified = None
+        # Arc fitting tolerance, paths are milled with lines only if None
+        self.arc_tolerance = None
         
         # Pauses
         self.mill_start_pause = 1000
@@ -64,7 +70,19 @@ class MillingPCB(CNC):
         self.mill_start_pause = value
     
     def setMinimalXYStep(self, step):
+        """
+        Simplify each path within ``step`` before milling it, None to mill
+        paths as they are, e.g. when they were simplified for the whole job.
+        """
         self.min_xy_step = step
+        self.__simplified = None
+        
+    def setArcTolerance(self, tolerance):
+        """
+        Mill circular runs of paths within ``tolerance`` with G2/G3 arcs,
+        None to mill them with lines.
+        """
+        self.arc_tolerance = tolerance
         
     def setTravelSpeed(self, XY, Z = None):
         self.travel_speed_xy = XY
@@ -194,6 +212,19 @@ class MillingPCB(CNC):
         self.moveToCutZ(cut_depth)
         self.moveToXY(X, Y, F=feedrate, use_tool=True)
         
+    def millArcTo(self, X, Y, I, J, direction, feedrate=None):
+        if feedrate == None:
+            feedrate = self.milling_speed_xy
+        
+        self.moveToMillingZ()
+        self.arcToXY(X, Y, I, J, direction, F=feedrate)
+        
+    def cutArcTo(self, X, Y, I, J, direction, cut_depth, feedrate=None):
+        if feedrate == None:
+            feedrate = self.cutting_speed_xy
+        self.moveToCutZ(cut_depth)
+        self.arcToXY(X, Y, I, J, direction, F=feedrate)
+        
     def drillAt(self, X, Y, drill_depth = None):
         if drill_depth == None:
             drill_depth = self.drill_depth
@@ -217,7 +248,14 @@ class MillingPCB(CNC):
         self.stopMilling()
     
     def __optimize(self, obj):
+        if self.min_xy_step is None:
+            return obj
+        # Passes of a path follow each other, only the last path is kept
+        # so that paths loaded on demand are not held in memory
+        if self.__simplified is not None and self.__simplified[0] is obj:
+            return self.__simplified[1]
         opt_obj = obj.simplify(tolerance=self.min_xy_step, preserve_topology=True)
+        self.__simplified = (obj, opt_obj)
         return opt_obj
     
     def __reverse(self, obj):
@@ -225,40 +263,91 @@ class MillingPCB(CNC):
         obj_cpy.coords = list(obj_cpy.coords)[::-1]
         return obj_cpy
     
+    def __arcTo(self, X, Y, arc, move, *args, **kwargs):
+        """
+        Move to ``X``,``Y`` with ``move`` along ``arc`` from fit_arcs,
+        given in absolute coordinates.
+        """
+        (cx, cy), ccw = arc
+        I = cx - self.curX
+        J = cy - self.curY
+        if self.isRelative():
+            (X,Y,rz) = self.convertToRelative(X,Y)
+        direction = CNC.eCCW if ccw else CNC.eCW
+        move(X, Y, I, J, direction, *args, **kwargs)
+    
     def millPath(self, path, feedrate=None, reverse=False):
         # TODO: check if path is shapely object
+        if self.arc_tolerance:
+            # Arcs are fitted to the path before simplifying it looses them
+            if reverse:
+                path = self.__reverse(path)
+            self.__millArcs(path, feedrate)
+            return
+        
         op = self.__optimize(path)
         
+        xy = np.asarray(op.coords)[:, :2]
         if reverse:
-            op = self.__reverse(op)
+            xy = xy[::-1]
+        if not len(xy):
+            return
         
-        x = op.xy[0]
-        y = op.xy[1]
+        X, Y = xy[0].tolist()
+        if self.isAbsolute():
+            self.travelTo(X,Y)
+        else:
+            (rx,ry,rz) = self.convertToRelative(X,Y)
+            self.travelTo(rx,ry)
         
-        for i in range(len(x)):
-            X = x[i]
-            Y = y[i]
+        if len(xy) > 1:
+            if feedrate == None:
+                feedrate = self.milling_speed_xy
+            self.moveToMillingZ()
+            # All the moves at once, as millTo on each point
+            self.moveAlongXY(xy[1:], F=feedrate, use_tool=True)
 
-            if i == 0:
-                if self.isAbsolute():
-                    self.travelTo(X,Y)
-                else:
-                    (rx,ry,rz) = self.convertToRelative(X,Y)
-                    self.travelTo(rx,ry)
+    def __millArcs(self, op, feedrate=None):
+        X, Y = op.coords[0][:2]
+        if self.isAbsolute():
+            self.travelTo(X,Y)
+        else:
+            (rx,ry,rz) = self.convertToRelative(X,Y)
+            self.travelTo(rx,ry)
+        
+        for (X, Y), arc in fit_arcs(op.coords, self.arc_tolerance):
+            if arc is None and self.isAt(X=X, Y=Y):
+                # Unsimplified paths repeat points
+                continue
+            if arc is not None:
+                self.__arcTo(X, Y, arc, self.millArcTo, feedrate=feedrate)
+            elif self.isAbsolute():
+                self.millTo(X,Y, feedrate=feedrate)
             else:
-                if self.isAbsolute():
-                    self.millTo(X,Y, feedrate=feedrate)
-                else:
-                    (rx,ry,rz) = self.convertToRelative(X,Y)
-                    self.millTo(rx,ry, feedrate=feedrate)
+                (rx,ry,rz) = self.convertToRelative(X,Y)
+                self.millTo(rx,ry, feedrate=feedrate)
 
-    def cutPath(self, path, feedrate=None, cut_start_depth = None, cut_end_depth = None, cut_step = None):
+    def cutPath(self, path, feedrate=None, cut_start_depth = None, cut_end_depth = None, cut_step = None,
+                tabs = None, tab_depth = None):
+        """
+        Cut along ``path`` in steps of ``cut_step`` from ``cut_start_depth``
+        to ``cut_end_depth``. Within ``tabs``, ranges of distance along the
+        path, the cut goes no deeper than ``tab_depth``.
+        """
         # TODO: check if path is shapely object
+        if self.arc_tolerance or tabs:
+            self.__cutSections(path, feedrate, cut_start_depth, cut_end_depth, cut_step,
+                               tabs, tab_depth)
+            return
         op = self.__optimize(path)
-        x = list(op.xy[0])
-        y = list(op.xy[1])
+        xy = np.asarray(op.coords)[:, :2]
+        if not len(xy):
+            return
         need_to_travel = True
         
+        if feedrate == None:
+            feedrate = self.cutting_speed_xy
+        
         if cut_start_depth == None:
             cut_start_depth = self.cut_start_depth
             
@@ -273,7 +362,7 @@ class MillingPCB(CNC):
         num_of_steps = int(math.ceil( (cut_end_depth - cut_start_depth) / cut_step))
         #~ print "num_of_steps",num_of_steps
         for step in range(1,num_of_steps+1):
-            cut_depth = cut_start_depth + (self.cut_step * step)
+            cut_depth = cut_start_depth + (cut_step * step)
             
             #~ print "target_cut_depth",cut_depth,"[",cut_step,"]",cut_end_depth
             
@@ -283,33 +372,123 @@ class MillingPCB(CNC):
             #~ print "cut_depth",cut_depth,"[",cut_step,"]"
             self.addComment('Cut-Depth: ' + str(cut_depth) )
             
-            for i in range(len(x)):
-                X = x[i]
-                Y = y[i]
-                
-                if i == 0 and need_to_travel:
-                    need_to_travel = False
-                    if self.isAbsolute():
-                        self.travelTo(X,Y)
-                    else:
-                        (rx,ry,rz) = self.convertToRelative(X,Y)
-                        self.travelTo(rx,ry)
-
+            if need_to_travel:
+                need_to_travel = False
+                X, Y = xy[0].tolist()
                 if self.isAbsolute():
-                    self.cutTo(X,Y, cut_depth)
+                    self.travelTo(X,Y)
                 else:
                     (rx,ry,rz) = self.convertToRelative(X,Y)
-                    self.cutTo(rx,ry, cut_depth)
+                    self.travelTo(rx,ry)
             
-
-            if X != x[0] or Y != y[0]:
+            # All the moves at once, as cutTo on each point
+            self.moveToCutZ(cut_depth)
+            self.moveAlongXY(xy, F=feedrate, use_tool=True)
+            
+            if (xy[-1] != xy[0]).any():
                 self.addComment('Reversing movement')
                 #~ print "reversing"
                 # Reverse the direction for next step
-                x.reverse()
-                y.reverse()  
+                xy = xy[::-1]
                 
 
+    def __sections(self, coords, tabs):
+        """
+        Split ``coords`` at the ends of the ``tabs``, return a list of
+        (coords, in_tab) sharing their end points.
+        """
+        coords = [c[:2] for c in coords]
+        bounds = sorted(set(d for tab in (tabs or []) for d in tab))
+        sections = []
+        current = [coords[0]]
+        in_tab = False
+        b = 0
+        walked = 0.0
+        for (x1, y1), (x2, y2) in zip(coords[:-1], coords[1:]):
+            length = math.hypot(x2 - x1, y2 - y1)
+            while b < len(bounds) and bounds[b] < walked + length:
+                if bounds[b] > walked:
+                    t = (bounds[b] - walked) / length
+                    current.append((x1 + (x2 - x1) * t, y1 + (y2 - y1) * t))
+                    sections.append((current, in_tab))
+                    current = [current[-1]]
+                elif len(current) > 1:
+                    sections.append((current, in_tab))
+                    current = [current[-1]]
+                in_tab = any(a <= bounds[b] < e for a, e in tabs)
+                b += 1
+            current.append((x2, y2))
+            walked += length
+        sections.append((current, in_tab))
+        return [section for section in sections if len(section[0]) > 1]
+
+    def __cutSections(self, path, feedrate=None, cut_start_depth = None, cut_end_depth = None, cut_step = None,
+                      tabs = None, tab_depth = None):
+        if self.arc_tolerance:
+            # Arcs are fitted to the path before simplifying it looses them
+            op = path
+        else:
+            op = self.__optimize(path)
+        start = op.coords[0][:2]
+        moves = []
+        for coords, in_tab in self.__sections(op.coords, tabs):
+            if self.arc_tolerance:
+                section = fit_arcs(coords, self.arc_tolerance)
+            else:
+                section = [(c, None) for c in coords[1:]]
+            moves.extend((end, arc, in_tab) for end, arc in section)
+        if not moves:
+            return
+        need_to_travel = True
+        
+        if cut_start_depth == None:
+            cut_start_depth = self.cut_start_depth
+            
+        if cut_end_depth == None:
+            cut_end_depth = self.cut_depth
+            
+        if cut_step == None:
+            cut_step = self.cut_step
+        
+        num_of_steps = int(math.ceil( (cut_end_depth - cut_start_depth) / cut_step))
+        for step in range(1,num_of_steps+1):
+            cut_depth = cut_start_depth + (cut_step * step)
+            
+            if cut_depth > cut_end_depth:
+                cut_depth = cut_end_depth
+            
+            self.addComment('Cut-Depth: ' + str(cut_depth) )
+            
+            X, Y = start
+            if need_to_travel:
+                need_to_travel = False
+                if self.isAbsolute():
+                    self.travelTo(X,Y)
+                else:
+                    (rx,ry,rz) = self.convertToRelative(X,Y)
+                    self.travelTo(rx,ry)
+            
+            for k, ((X, Y), arc, in_tab) in enumerate([(start, None, moves[0][2])] + moves):
+                if k and arc is None and self.isAt(X=X, Y=Y):
+                    continue
+                depth = cut_depth
+                if in_tab and tab_depth is not None:
+                    # Tabs are left standing above the tab depth
+                    depth = min(cut_depth, tab_depth)
+                if arc is not None:
+                    self.__arcTo(X, Y, arc, self.cutArcTo, depth, feedrate=feedrate)
+                elif self.isAbsolute():
+                    self.cutTo(X,Y, depth, feedrate=feedrate)
+                else:
+                    (rx,ry,rz) = self.convertToRelative(X,Y)
+                    self.cutTo(rx,ry, depth, feedrate=feedrate)
+            
+            if (X, Y) != start:
+                self.addComment('Reversing movement')
+                # Reverse the direction for next step
+                moves = reverse_moves(start, moves)
+                start = (X, Y)
+
     def millContures(self, objs):
         pass
 
@@ -0,0 +1,184 @@
+"""
+Modal compression of G-code moves.
+
+ModalOutput sits between RAW and an output. Axes and feed rates already in
+effect are left out of moves, moves that end where they start are dropped
+and consecutive G1 moves that stay within a tolerance of one line are
+merged into a single move.
+"""
+
+from .raw import format_move
+
+# Default largest distance of a merged point from the merged move [mm]
+TOLERANCE = 0.001
+
+# Longest run of moves merged into one
+MAX_RUN = 32
+
+# Codes that move the machine to a position not known here
+UNKNOWN_POSITION = ('G27', 'G28', 'G29', 'G30', 'G38', 'G92')
+
+
+class ModalOutput(object):
+    """
+    Compress the moves written to an output.
+    """
+
+    def __init__(self, output, tolerance=TOLERANCE, motion_words=True):
+        """
+        Construct a new ModalOutput object.
+
+        Parameters
+        ----------
+        output: Output
+            Output object the compressed gcodes are written to.
+        tolerance: float
+            Largest distance of the end of a G1 move from the move it is
+            merged into, None to merge no moves.
+        motion_words: bool
+            Write G0/G1 on every move. If False the word is left out when it
+            is the motion mode already in effect, which the firmware must
+            support.
+
+        Attributes
+        ----------
+        full : int
+            Bytes the moves would have taken without compression.
+        written : int
+            Bytes the moves took.
+        """
+        self.output = output
+        self.tolerance = tolerance
+        self.motion_words = motion_words
+        self.format_move = getattr(output, 'format_move', format_move)
+        self.newline = len(getattr(output, 'newline', '\r\n'))
+        self.full = 0
+        self.written = 0
+        self.relative = False
+        # Position after the queued moves, None where unknown
+        self.pos = [None, None, None, None]
+        # Feed rate asked for and feed rate in effect
+        self.feed = None
+        self.F = None
+        self.motion = None
+        # Merged G1 move waiting to be written, as [start, points, feed]
+        self._run = None
+
+    @property
+    def saved(self):
+        """Bytes saved by the compression."""
+        return self.full - self.written
+
+    def write(self, line):
+        """Write a line that is not a move."""
+        self.__flushRun()
+        code = line.split(' ', 1)[0]
+        if code == 'G90':
+            self.relative = False
+        elif code == 'G91':
+            self.relative = True
+            self.pos = [None, None, None, None]
+        elif code in UNKNOWN_POSITION:
+            self.pos = [None, None, None, None]
+            self.F = None
+            self.motion = None
+        self.output.write(line)
+
+    def move(self, code, X=None, Y=None, Z=None, I=None, J=None, E=None, F=None):
+        """Write a move ``code``, compressed."""
+        self.full += len(self.format_move(code, X, Y, Z, I, J, E, F)) + self.newline
+        if F is not None:
+            self.feed = F
+
+        if self.relative:
+            self.__flushRun()
+            self.__emit(code, X, Y, Z, I, J, E)
+            return
+
+        if code not in ('G0', 'G1'):
+            # Arcs keep both ends, an arc without them would be a full circle
+            self.__flushRun()
+            self.__emit(code, X, Y, None, I, J, E)
+            self.pos[0] = X
+            self.pos[1] = Y
+            return
+
+        pos = self.pos
+        X = None if X == pos[0] else X
+        Y = None if Y == pos[1] else Y
+        Z = None if Z == pos[2] else Z
+        E = None if E == pos[3] else E
+        if X is None and Y is None and Z is None and E is None:
+            # Zero length, a new feed rate goes with the next move
+            return
+
+        run = self._run
+        planar = (code == 'G1' and Z is None and E is None and
+                  pos[0] is not None and pos[1] is not None)
+        if planar:
+            end = (pos[0] if X is None else X, pos[1] if Y is None else Y)
+            if run is not None and self.feed == run[2] and self.__extends(run, end):
+                run[1].append(end)
+            else:
+                self.__flushRun()
+                self._run = [(pos[0], pos[1]), [end], self.feed]
+            pos[0], pos[1] = end
+            return
+
+        self.__flushRun()
+        self.__emit(code, X, Y, Z, None, None, E)
+        for axis, value in enumerate((X, Y, Z, E)):
+            if value is not None:
+                pos[axis] = value
+
+    def flush(self):
+        """Write the merged move waiting, and flush the output if it can."""
+        self.__flushRun()
+        if hasattr(self.output, 'flush'):
+            self.output.flush()
+
+    def __extends(self, run, end):
+        """Whether every point of ``run`` is within tolerance of the move to ``end``."""
+        points = run[1]
+        if self.tolerance is None or len(points) >= MAX_RUN:
+            return False
+        x0, y0 = run[0]
+        dx = end[0] - x0
+        dy = end[1] - y0
+        length2 = dx * dx + dy * dy
+        if length2 == 0:
+            return False
+        limit = self.tolerance * self.tolerance * length2
+        last = 0.0
+        for x, y in points:
+            # Points must go forward along the move and stay close to it
+            t = (x - x0) * dx + (y - y0) * dy
+            if t <= last or t >= length2:
+                return False
+            cross = (x - x0) * dy - (y - y0) * dx
+            if cross * cross > limit:
+                return False
+            last = t
+        return True
+
+    def __flushRun(self):
+        run = self._run
+        if run is None:
+            return
+        self._run = None
+        (x0, y0), points, feed = run
+        x, y = points[-1]
+        feed, self.feed = self.feed, feed
+        self.__emit('G1', None if x == x0 else x, None if y == y0 else y)
+        self.feed = feed
+
+    def __emit(self, code, X=None, Y=None, Z=None, I=None, J=None, E=None):
+        F = None
+        if self.feed is not None and self.feed != self.F:
+            F = self.F = self.feed
+        line = self.format_move(code, X, Y, Z, I, J, E, F)
+        if not self.motion_words and code == self.motion and code in ('G0', 'G1'):
+            line = line[len(code) + 1:]
+        self.motion = code
+        self.written += len(line) + self.newline
+        self.output.write(line)
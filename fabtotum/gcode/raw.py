@@ -1,3 +1,23 @@
+def format_move(code, X = None, Y = None, Z = None, I = None, J = None, E = None, F = None):
+    """
+    Return the line of a move ``code`` with the given words.
+    """
+    if X != None:
+        code += ' X' + str(X)
+    if Y != None:
+        code += ' Y' + str(Y)
+    if Z != None:
+        code += ' Z' + str(Z)
+    if I != None:
+        code += ' I' + str(I)
+    if J != None:
+        code += ' J' + str(J)
+    if E != None:
+        code += ' E' + str(E)
+    if F != None:
+        code += ' F' + str(F)
+    return code
+
 class RAW(object):
     """
     RAW GCodes for Marlin/FABtotum version.
@@ -6,6 +26,9 @@ class RAW(object):
     """
     def __init__(self, output):
         self.output = output
+        # Outputs like GCodeWriter format moves themselves
+        self.move = getattr(output, 'move', None)
+        self.moves = getattr(output, 'moves', None)
     
     def COMMENT(self, comment):
         self.output.write('; ' + comment)
@@ -15,54 +38,34 @@ class RAW(object):
     #~ G0  -> G1
     #~ G1  - Coordinated Movement X Y Z E F, S?
     def G0(self, X = None, Y = None, Z = None, E = None, F = None, code = 'G0'):
-        if X != None:
-            code += ' X' + str(X)
-        if Y != None:
-            code += ' Y' + str(Y)
-        if Z != None:
-            code += ' Z' + str(Z)
-        if E != None:
-            code += ' E' + str(E)
-        if F != None:
-            code += ' F' + str(F)
-        
-        self.output.write(code)
+        if self.move is not None:
+            self.move(code, X=X, Y=Y, Z=Z, E=E, F=F)
+        else:
+            self.output.write(format_move(code, X=X, Y=Y, Z=Z, E=E, F=F))
         
     def G1(self, X = None, Y = None, Z = None, E = None, F = None):
         self.G0(X, Y, Z, E, F, code='G1')
         
+    # G1 to each X,Y point of an (n, 2) array, F on the first move only
+    def G1Path(self, XY, F = None, code = 'G1'):
+        if self.moves is not None:
+            self.moves(code, XY, F)
+            return
+        for X, Y in XY.tolist():
+            self.G0(X=X, Y=Y, F=F, code=code)
+            F = None
+        
     #~ G2  - CW ARC
     # Example: G2 X90.6 Y13.8 I5 J10 E22.4, Move in a CW arc starting from current point to point (X,Y) with center at (X+I, Y+J), extruding 22.4mm of material
-    def G2(self, X = None, Y = None, I = None, J = None, E = None, F = None):
-        code = 'G2'
-        if X != None:
-            code += ' X' + str(X)
-        if Y != None:
-            code += ' Y' + str(Y)
-        if Z != None:
-            code += ' I' + str(I)
-        if E != None:
-            code += ' J' + str(J)
-        if F != None:
-            code += ' F' + str(F)
-        
-        self.output.write(code)
+    def G2(self, X = None, Y = None, I = None, J = None, E = None, F = None, code = 'G2'):
+        if self.move is not None:
+            self.move(code, X=X, Y=Y, I=I, J=J, E=E, F=F)
+        else:
+            self.output.write(format_move(code, X=X, Y=Y, I=I, J=J, E=E, F=F))
 
     #~ G3  - CCW ARC
     def G3(self, X = None, Y = None, I = None, J = None, E = None, F = None):
-        code = 'G3'
-        if X != None:
-            code += ' X' + str(X)
-        if Y != None:
-            code += ' Y' + str(Y)
-        if Z != None:
-            code += ' I' + str(I)
-        if E != None:
-            code += ' J' + str(J)
-        if F != None:
-            code += ' F' + str(F)
-        
-        self.output.write(code)
+        self.G2(X, Y, I, J, E, F, code='G3')
 
     #~ G4  - Dwell S<seconds> or P<milliseconds>
     def G4(self, S = None, P = None):
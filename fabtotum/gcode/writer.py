@@ -0,0 +1,120 @@
+"""
+Buffered G-code writer.
+
+GCodeWriter is an ``output`` for RAW, CNC and its subclasses. Moves are
+formatted in one go with a fixed number of decimals and lines are written
+in large chunks instead of one file write per line.
+"""
+
+
+class GCodeWriter(object):
+    """
+    Write G-code lines to a file in chunks.
+    """
+
+    def __init__(self, output, decimals=5, newline='\r\n', chunk_lines=8192):
+        """
+        Construct a new GCodeWriter object.
+
+        Parameters
+        ----------
+        output: str or file
+            Filename to write to, or a file like object with ``write``.
+        decimals: int
+            Decimals of the coordinates of moves. Feed rates are written
+            with ``%g``.
+        newline: str
+            Line ending.
+        chunk_lines: int
+            Lines kept before writing them at once.
+
+        Attributes
+        ----------
+        lines : int
+            Lines written to the file so far.
+        """
+        if isinstance(output, basestring):
+            self.fd = open(output, 'w')
+            self._own = True
+        else:
+            self.fd = output
+            self._own = False
+        self.newline = newline
+        self.chunk_lines = chunk_lines
+        self.lines = 0
+        self._words = tuple(' {0}%.{1}f'.format(letter, decimals) for letter in 'XYZIJE') + (' F%g',)
+        self._buffer = []
+        # Lines in the buffer, an entry of moves() holds several
+        self._pending = 0
+
+    def write(self, line):
+        """Add a line, written with the next chunk."""
+        self._buffer.append(line)
+        self._pending += 1
+        if self._pending >= self.chunk_lines:
+            self.flush()
+
+    def format_move(self, code, X=None, Y=None, Z=None, I=None, J=None, E=None, F=None):
+        """Return the line of a move ``code`` with the given words."""
+        x, y, z, i, j, e, f = self._words
+        if X is not None:
+            code += x % X
+        if Y is not None:
+            code += y % Y
+        if Z is not None:
+            code += z % Z
+        if I is not None:
+            code += i % I
+        if J is not None:
+            code += j % J
+        if E is not None:
+            code += e % E
+        if F is not None:
+            code += f % F
+        return code
+
+    def move(self, code, X=None, Y=None, Z=None, I=None, J=None, E=None, F=None):
+        """Add a move ``code`` with the given words, formatted at once."""
+        self._buffer.append(self.format_move(code, X, Y, Z, I, J, E, F))
+        self._pending += 1
+        if self._pending >= self.chunk_lines:
+            self.flush()
+
+    def moves(self, code, XY, F=None):
+        """
+        Add a move ``code`` to each point of ``XY``, an (n, 2) array, with
+        feed rate ``F`` on the first one. All lines are formatted at once.
+        """
+        if not len(XY):
+            return
+        x, y = self._words[:2]
+        line = code + x + y
+        lines = [line] * len(XY)
+        if F is not None:
+            lines[0] = line + self._words[6] % F
+        self._buffer.append(self.newline.join(lines) % tuple(XY.ravel().tolist()))
+        self._pending += len(lines)
+        if self._pending >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered lines to the file."""
+        buf = self._buffer
+        if buf:
+            data = self.newline.join(buf) + self.newline
+            self.fd.write(data)
+            self.lines += data.count(self.newline)
+            self._buffer = []
+            self._pending = 0
+
+    def close(self):
+        """Flush and close the file if it was opened by the writer."""
+        self.flush()
+        if self._own:
+            self.fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -274,9 +274,22 @@ class CamFile(object):
         ctx._paint_background()
         ctx.invert = invert
         ctx._new_render_layer()
-        for p in self.primitives:
-            ctx.render(p)
+        self._render_primitives(ctx)
         ctx._flatten()
 
         if filename is not None:
             ctx.dump(filename)
+
+    def _render_primitives(self, ctx):
+        for p in self.primitives:
+            ctx.render(p)
+
+    def _changed(self):
+        """ Clear memoized properties.
+
+        Forces a recalculation of the bounds next time they are queried.
+        This must be called every time the statements or primitives are
+        changed in place, as offset, to_inch and to_metric do.
+        """
+        self._bounds = None
+        self._bounding_box = None
@@ -0,0 +1,455 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+gerber.columnar
+===============
+**Columnar primitive storage**
+
+This module provides PrimitiveColumns, which stores the primitives of a layer
+as NumPy record arrays, one per primitive kind, rather than as one Python
+object per primitive. Bounding box, offset and unit conversion then run on
+whole arrays at once.
+"""
+
+import copy
+import math
+
+import numpy as np
+
+from .primitives import Arc, Circle, Flash, Line, Region
+from .utils import MILLIMETERS_PER_INCH
+
+# Coordinates are (x, y) pairs. `aperture` indexes PrimitiveColumns.apertures,
+# `order` is the position of the primitive in the layer, or in its region for
+# region segments, and `region` indexes PrimitiveColumns.regions (-1 when the
+# segment is not part of a region).
+LINE_DTYPE = np.dtype([('start', 'f8', 2), ('end', 'f8', 2),
+                       ('aperture', 'i4'), ('dark', '?'),
+                       ('order', 'i4'), ('region', 'i4')])
+
+ARC_DTYPE = np.dtype([('start', 'f8', 2), ('end', 'f8', 2),
+                      ('center', 'f8', 2), ('clockwise', '?'),
+                      ('multi_quadrant', '?'), ('aperture', 'i4'),
+                      ('dark', '?'), ('order', 'i4'), ('region', 'i4')])
+
+FLASH_DTYPE = np.dtype([('position', 'f8', 2), ('aperture', 'i4'),
+                        ('dark', '?'), ('order', 'i4')])
+
+REGION_DTYPE = np.dtype([('dark', '?'), ('order', 'i4')])
+
+
+class PrimitiveColumns(object):
+    """ Primitives of a layer stored as typed arrays
+
+    Lines, arcs, flashes and regions each get a record array (see the *_DTYPE
+    definitions of this module). Region outlines are stored as lines and arcs
+    tagged with their region. Apertures are shared and stored once in
+    `apertures`. Primitives of any other kind, or in other units than the
+    layer, are kept as objects in `others`.
+
+    Parameters
+    ----------
+    units : string
+        Units of the coordinates, 'inch' or 'metric'.
+
+    Attributes
+    ----------
+    lines, arcs, flashes, regions : numpy.ndarray
+        Record arrays of LINE_DTYPE, ARC_DTYPE, FLASH_DTYPE and REGION_DTYPE.
+
+    apertures : list of Primitive
+        Apertures referenced by the `aperture` field of the records.
+
+    others : list of tuple (<int>, Primitive)
+        Primitives kept as objects, along with their position in the layer.
+    """
+
+    def __init__(self, units='inch'):
+        self.units = units
+        self.lines = np.zeros(0, LINE_DTYPE)
+        self.arcs = np.zeros(0, ARC_DTYPE)
+        self.flashes = np.zeros(0, FLASH_DTYPE)
+        self.regions = np.zeros(0, REGION_DTYPE)
+        self.apertures = []
+        self.others = []
+
+    def __len__(self):
+        return (len(self.flashes) + len(self.regions) + len(self.others) +
+                int(np.count_nonzero(self.lines['region'] < 0)) +
+                int(np.count_nonzero(self.arcs['region'] < 0)))
+
+    @classmethod
+    def from_primitives(cls, primitives, units='inch'):
+        """ Build the columns from a list of primitives.
+
+        Parameters
+        ----------
+        primitives : list of Primitive
+            Primitives of the layer, Flash records included.
+
+        units : string
+            Units of the layer, primitives in other units are kept as objects.
+
+        Returns
+        -------
+        columns : PrimitiveColumns
+        """
+        columns = cls(units)
+        aperture_ids = {}
+        lines = []
+        arcs = []
+        flashes = []
+        regions = []
+
+        def aperture_id(aperture):
+            key = id(aperture)
+            if key not in aperture_ids:
+                aperture_ids[key] = len(columns.apertures)
+                columns.apertures.append(aperture)
+            return aperture_ids[key]
+
+        def segment(primitive, order, region):
+            dark = primitive.level_polarity == 'dark'
+            if type(primitive) is Line:
+                lines.append((primitive.start, primitive.end,
+                              aperture_id(primitive.aperture), dark,
+                              order, region))
+            else:
+                arcs.append((primitive.start, primitive.end, primitive.center,
+                             primitive.direction == 'clockwise',
+                             primitive.quadrant_mode == 'multi-quadrant',
+                             aperture_id(primitive.aperture), dark,
+                             order, region))
+
+        for order, primitive in enumerate(primitives):
+            kind = type(primitive)
+            if primitive.units != units:
+                columns.others.append((order, primitive))
+            elif kind is Flash:
+                flashes.append((primitive.position,
+                                aperture_id(primitive.aperture),
+                                primitive.level_polarity == 'dark', order))
+            elif kind is Line or kind is Arc:
+                segment(primitive, order, -1)
+            elif kind is Region and all(type(p) is Line or type(p) is Arc
+                                        for p in primitive.primitives):
+                for index, p in enumerate(primitive.primitives):
+                    segment(p, index, len(regions))
+                regions.append((primitive.level_polarity == 'dark', order))
+            else:
+                columns.others.append((order, primitive))
+
+        columns.lines = np.array(lines, LINE_DTYPE)
+        columns.arcs = np.array(arcs, ARC_DTYPE)
+        columns.flashes = np.array(flashes, FLASH_DTYPE)
+        columns.regions = np.array(regions, REGION_DTYPE)
+        return columns
+
+    def to_primitives(self):
+        """ Build the list of primitives, in layer order.
+
+        Returns
+        -------
+        primitives : list of Primitive
+            New primitives, changing them does not affect the columns.
+        """
+        return list(self.iter_primitives())
+
+    def iter_primitives(self, kinds=None):
+        """ Iterate over the primitives, built one at a time, in layer order.
+
+        Parameters
+        ----------
+        kinds : iterable of string, optional
+            Only iterate over these kinds of primitives, among 'line', 'arc',
+            'flash', 'region' and 'other'. All of them by default.
+        """
+        lines = np.flatnonzero(self.lines['region'] < 0)
+        arcs = np.flatnonzero(self.arcs['region'] < 0)
+        others = np.array([order for order, p in self.others], dtype='i4')
+        tables = [table for table in (
+                  ('line', lines, self.lines['order'][lines]),
+                  ('arc', arcs, self.arcs['order'][arcs]),
+                  ('flash', np.arange(len(self.flashes)), self.flashes['order']),
+                  ('region', np.arange(len(self.regions)), self.regions['order']),
+                  ('other', np.arange(len(others)), others))
+                  if kinds is None or table[0] in kinds]
+        if not tables:
+            return
+        orders = np.concatenate([table[2] for table in tables])
+        kind = np.concatenate([np.full(len(table[1]), number, dtype='i1')
+                               for number, table in enumerate(tables)])
+        index = np.concatenate([table[1] for table in tables])
+        region_segments = None
+
+        for position in np.argsort(orders, kind='mergesort'):
+            name = tables[kind[position]][0]
+            i = index[position]
+            if name == 'line':
+                yield self._segment(Line, self.lines[i])
+            elif name == 'arc':
+                yield self._segment(Arc, self.arcs[i])
+            elif name == 'flash':
+                record = self.flashes[i]
+                yield Flash(self.apertures[record['aperture']],
+                            tuple(record['position'].tolist()),
+                            _polarity(record['dark']), self.units)
+            elif name == 'region':
+                if region_segments is None:
+                    region_segments = self._region_segments()
+                yield Region(region_segments[i],
+                             level_polarity=_polarity(self.regions[i]['dark']),
+                             units=self.units)
+            else:
+                yield self.others[i][1]
+
+    def _region_segments(self):
+        """ Build the outline segments of every region, in order """
+        segments = [[] for region in self.regions]
+        for kind, records in ((Line, self.lines), (Arc, self.arcs)):
+            for record in records[records['region'] >= 0]:
+                segments[record['region']].append(
+                    (record['order'], self._segment(kind, record)))
+        return [[p for order, p in sorted(items, key=lambda item: item[0])]
+                for items in segments]
+
+    def _segment(self, kind, record):
+        aperture = self.apertures[record['aperture']]
+        start = tuple(record['start'].tolist())
+        end = tuple(record['end'].tolist())
+        if kind is Line:
+            return Line(start, end, aperture,
+                        level_polarity=_polarity(record['dark']),
+                        units=self.units)
+        return Arc(start, end, tuple(record['center'].tolist()),
+                   'clockwise' if record['clockwise'] else 'counterclockwise',
+                   aperture,
+                   'multi-quadrant' if record['multi_quadrant'] else 'single-quadrant',
+                   level_polarity=_polarity(record['dark']),
+                   units=self.units)
+
+    @property
+    def bounding_box(self):
+        """ Bounding box of all primitives, apertures included.
+
+        Same as the union of the primitive bounding boxes.
+
+        Returns
+        -------
+        bounding_box : tuple ((<float>, <float>), (<float>, <float>))
+            ((min x, max x), (min y, max y))
+        """
+        min_x = min_y = 1000000
+        max_x = max_y = -1000000
+
+        for x0, x1, y0, y1 in (self._line_extents(), self._arc_extents(),
+                               self._flash_extents(), self._region_extents()):
+            if len(x0):
+                min_x = min(float(x0.min()), min_x)
+                max_x = max(float(x1.max()), max_x)
+                min_y = min(float(y0.min()), min_y)
+                max_y = max(float(y1.max()), max_y)
+
+        for order, primitive in self.others:
+            bounds = primitive.bounding_box
+            min_x = min(bounds[0][0], min_x)
+            max_x = max(bounds[0][1], max_x)
+            min_y = min(bounds[1][0], min_y)
+            max_y = max(bounds[1][1], max_y)
+
+        return ((min_x, max_x), (min_y, max_y))
+
+    def _aperture_table(self, ids, extent):
+        """ Tabulate extent(aperture) for the apertures in ids """
+        table = np.zeros((len(self.apertures), 4))
+        for index in np.unique(ids):
+            table[index] = extent(self.apertures[index])
+        return table[ids]
+
+    def _line_extents(self):
+        lines = self.lines[self.lines['region'] < 0]
+
+        def extent(aperture):
+            if isinstance(aperture, Circle):
+                return (aperture.radius,) * 4
+            return (aperture.width / 2., aperture.width / 2.,
+                    aperture.height / 2., aperture.height / 2.)
+
+        size = self._aperture_table(lines['aperture'], extent)
+        start = lines['start']
+        end = lines['end']
+        return (np.minimum(start[:, 0], end[:, 0]) - size[:, 0],
+                np.maximum(start[:, 0], end[:, 0]) + size[:, 1],
+                np.minimum(start[:, 1], end[:, 1]) - size[:, 2],
+                np.maximum(start[:, 1], end[:, 1]) + size[:, 3])
+
+    def _arc_extents(self):
+        arcs = self.arcs[self.arcs['region'] < 0]
+
+        def extent(aperture):
+            if hasattr(aperture, 'radius'):
+                return (aperture.radius,) * 4
+            return (aperture.width, aperture.width,
+                    aperture.height, aperture.height)
+
+        size = self._aperture_table(arcs['aperture'], extent)
+        x0, x1, y0, y1 = _arc_extents(arcs)
+        return x0 - size[:, 0], x1 + size[:, 1], y0 - size[:, 2], y1 + size[:, 3]
+
+    def _flash_extents(self):
+        flashes = self.flashes
+        units = self.units
+
+        def extent(aperture):
+            (x0, x1), (y0, y1) = Flash(aperture, (0., 0.), 'dark', units).bounding_box
+            return x0, x1, y0, y1
+
+        size = self._aperture_table(flashes['aperture'], extent)
+        position = flashes['position']
+        return (position[:, 0] + size[:, 0], position[:, 0] + size[:, 1],
+                position[:, 1] + size[:, 2], position[:, 1] + size[:, 3])
+
+    def _region_extents(self):
+        count = len(self.regions)
+        min_x = np.full(count, np.inf)
+        max_x = np.full(count, -np.inf)
+        min_y = np.full(count, np.inf)
+        max_y = np.full(count, -np.inf)
+
+        # Region extents do not account for the aperture
+        lines = self.lines[self.lines['region'] >= 0]
+        arcs = self.arcs[self.arcs['region'] >= 0]
+        line_x = np.minimum(lines['start'][:, 0], lines['end'][:, 0]), \
+            np.maximum(lines['start'][:, 0], lines['end'][:, 0])
+        line_y = np.minimum(lines['start'][:, 1], lines['end'][:, 1]), \
+            np.maximum(lines['start'][:, 1], lines['end'][:, 1])
+        arc_x0, arc_x1, arc_y0, arc_y1 = _arc_extents(arcs)
+
+        for region, x0, x1, y0, y1 in (
+                (lines['region'], line_x[0], line_x[1], line_y[0], line_y[1]),
+                (arcs['region'], arc_x0, arc_x1, arc_y0, arc_y1)):
+            np.minimum.at(min_x, region, x0)
+            np.maximum.at(max_x, region, x1)
+            np.minimum.at(min_y, region, y0)
+            np.maximum.at(max_y, region, y1)
+        return min_x, max_x, min_y, max_y
+
+    def offset(self, x_offset=0, y_offset=0):
+        """ Move all primitives by the specified x and y offset amount. """
+        delta = np.array([x_offset, y_offset], dtype='f8')
+        for records, fields in ((self.lines, ('start', 'end')),
+                                (self.arcs, ('start', 'end', 'center')),
+                                (self.flashes, ('position',))):
+            for field in fields:
+                records[field] += delta
+        for order, primitive in self.others:
+            primitive.offset(x_offset, y_offset)
+
+    def to_inch(self):
+        """ Convert all primitives to inches. """
+        if self.units == 'metric':
+            self._convert('inch')
+            for order, primitive in self.others:
+                primitive.to_inch()
+
+    def to_metric(self):
+        """ Convert all primitives to millimeters. """
+        if self.units == 'inch':
+            self._convert('metric')
+            for order, primitive in self.others:
+                primitive.to_metric()
+
+    def _convert(self, units):
+        self.units = units
+        for records, fields in ((self.lines, ('start', 'end')),
+                                (self.arcs, ('start', 'end', 'center')),
+                                (self.flashes, ('position',))):
+            for field in fields:
+                # Same operations as utils.inch and utils.metric
+                if units == 'inch':
+                    records[field] /= MILLIMETERS_PER_INCH
+                else:
+                    records[field] *= MILLIMETERS_PER_INCH
+
+        # Apertures may be shared with primitives outside of the columns
+        apertures = []
+        for aperture in self.apertures:
+            aperture = copy.deepcopy(aperture)
+            if units == 'inch':
+                aperture.to_inch()
+            else:
+                aperture.to_metric()
+            apertures.append(aperture)
+        self.apertures = apertures
+
+    def render(self, ctx):
+        """ Render the primitives with a GerberContext. """
+        ctx.render_columns(self)
+
+
+def _polarity(dark):
+    return 'dark' if dark else 'clear'
+
+
+def _arc_extents(arcs):
+    """ Extents of arcs without the aperture, see Arc.bounding_box_no_aperture
+
+    Returns
+    -------
+    extents : tuple of numpy.ndarray
+        min x, max x, min y and max y of each arc
+    """
+    two_pi = 2 * math.pi
+    start = arcs['start']
+    end = arcs['end']
+    center = arcs['center']
+
+    dx0 = start[:, 0] - center[:, 0]
+    dy0 = start[:, 1] - center[:, 1]
+    radius = np.sqrt(dy0 ** 2 + dx0 ** 2)
+    theta0 = (np.arctan2(dy0, dx0) + two_pi) % two_pi
+    theta1 = (np.arctan2(end[:, 1] - center[:, 1],
+                         end[:, 0] - center[:, 0]) + two_pi) % two_pi
+
+    # Clockwise arcs are counterclockwise ones run backwards
+    clockwise = arcs['clockwise']
+    first = np.where(clockwise, theta1, theta0)
+    last = np.where(clockwise, theta0, theta1)
+
+    def passes(angle):
+        return (((first <= angle) & ((last >= angle) | (last <= first)))
+                | ((last > angle) & (last <= first)))
+
+    multi = arcs['multi_quadrant']
+    passes_0 = multi & (first >= last)
+    passes_90 = multi & passes(math.pi / 2.)
+    passes_180 = multi & passes(math.pi)
+    passes_270 = multi & passes(math.pi * 1.5)
+
+    # Extreme points the arc passes through update both axes, as in
+    # Arc.bounding_box_no_aperture
+    min_x = np.minimum(start[:, 0], end[:, 0])
+    max_x = np.maximum(start[:, 0], end[:, 0])
+    min_y = np.minimum(start[:, 1], end[:, 1])
+    max_y = np.maximum(start[:, 1], end[:, 1])
+    for passes, x, y in ((passes_0, center[:, 0] + radius, center[:, 1]),
+                         (passes_90, center[:, 0], center[:, 1] + radius),
+                         (passes_180, center[:, 0] - radius, center[:, 1]),
+                         (passes_270, center[:, 0], center[:, 1] - radius)):
+        min_x = np.where(passes, np.minimum(min_x, x), min_x)
+        max_x = np.where(passes, np.maximum(max_x, x), max_x)
+        min_y = np.where(passes, np.minimum(min_y, y), min_y)
+        max_y = np.where(passes, np.maximum(max_y, y), max_y)
+    return min_x, max_x, min_y, max_y
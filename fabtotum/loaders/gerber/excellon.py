@@ -25,6 +25,7 @@ This module provides Excellon file classes and parsing utilities
 
 import math
 import operator
+import re
 
 from .cam import CamFile, FileSettings
 from .excellon_statements import *
@@ -56,8 +57,7 @@ def read(filename):
     # File object should use settings from source file by default.
     with open(filename, 'rU') as f:
         data = f.read()
-    settings = FileSettings(**detect_excellon_format(data))
-    return ExcellonParser(settings).parse(filename)
+    return loads(data, filename)
 
 def loads(data, filename=None, settings=None, tools=None):
     """ Read data from string and return an ExcellonFile
@@ -80,7 +80,11 @@ def loads(data, filename=None, settings=None, tools=None):
     """
     # File object should use settings from source file by default.
     if not settings:
-        settings = FileSettings(**detect_excellon_format(data))
+        detected, excellon_file = _detect_excellon_format(data, filename)
+        # Detection may have parsed the file already
+        if excellon_file is not None and not tools:
+            return excellon_file
+        settings = FileSettings(**detected)
     return ExcellonParser(settings, tools).parse_raw(data, filename)
 
 
@@ -290,8 +294,7 @@ class ExcellonFile(CamFile):
                 tool.to_inch()
             #for primitive in self.primitives:
             #    primitive.to_inch()
-            #for hit in self.hits:
-            #    hit.to_inch()
+            self._convert_hits(inch)
             self.units = 'inch'
 
     def to_metric(self):
@@ -306,10 +309,19 @@ class ExcellonFile(CamFile):
             #    print("Converting to metric: {}".format(primitive))
             #    primitive.to_metric()
             #    print(primitive)
-            for hit in self.hits:
-                hit.to_metric()
+            self._convert_hits(metric)
             self.units = 'metric'
 
+    def _convert_hits(self, convert):
+        # DrillHit.to_inch and to_metric go by the units of the tool, which
+        # are converted first and shared by the hits of a tool
+        for hit in self.hits:
+            if isinstance(hit, DrillSlot):
+                hit.start = tuple(map(convert, hit.start))
+                hit.end = tuple(map(convert, hit.end))
+            else:
+                hit.position = tuple(map(convert, hit.position))
+
     def offset(self, x_offset=0, y_offset=0):
         for statement in self.statements:
             statement.offset(x_offset, y_offset)
@@ -792,39 +804,59 @@ def detect_excellon_format(data=None, filename=None):
             - `format`: decimal format as tuple (<int part>, <decimal part>)
             - `zero_suppression`: zero suppression, 'leading' or 'trailing'
     """
-    results = {}
-    detected_zeros = None
-    detected_format = None
-    zeros_options = ('leading', 'trailing', )
-    format_options = ((2, 4), (2, 5), (3, 3),)
-
     if data is None and filename is None:
         raise ValueError('Either data or filename arguments must be provided')
     if data is None:
         with open(filename, 'rU') as f:
             data = f.read()
+    return _detect_excellon_format(data)[0]
 
-    # Check for obvious clues:
-    p = ExcellonParser()
-    p.parse_raw(data)
 
-    # Get zero_suppression from a unit statement
-    zero_statements = [stmt.zeros for stmt in p.statements
-                       if isinstance(stmt, UnitStmt)]
+# Number of coordinates looked at to guess the format
+DETECTION_SAMPLES = 1000
+
+_COORDINATE_LINE = re.compile(r'^[XY].*$', re.M)
+_COORDINATE_VALUE = re.compile(r'[XY]([+-]?[0-9.]+)')
 
-    # get format from altium comment
-    format_comment = [stmt.comment for stmt in p.statements
-                      if isinstance(stmt, CommentStmt)
-                      and 'FILE_FORMAT' in stmt.comment]
 
-    detected_format = (tuple([int(val) for val in
-                              format_comment[0].split('=')[1].split(':')])
-                       if len(format_comment) == 1 else None)
-    detected_zeros = zero_statements[0] if len(zero_statements) == 1 else None
+def _detect_excellon_format(data, filename=None):
+    """ Detect the settings of an Excellon file, see detect_excellon_format.
+
+    The header and a sample of the coordinates are looked at first. The file
+    is only parsed with each remaining candidate setting when they leave
+    more than one option.
+
+    Returns
+    -------
+    settings : dict
+        Detected excellon file settings.
+
+    excellon_file : :class:`gerber.excellon.ExcellonFile`
+        The file parsed with the detected settings if it had to be parsed,
+        None otherwise.
+    """
+    results = {}
+    parsed = {}
+    zeros_options = ('leading', 'trailing', )
+    format_options = ((2, 4), (2, 5), (3, 3),)
+
+    # Check for obvious clues:
+    detected_format, detected_zeros = _header_clues(data)
 
     # Bail out here if possible
     if detected_format is not None and detected_zeros is not None:
-        return {'format': detected_format, 'zeros': detected_zeros}
+        return {'format': detected_format, 'zeros': detected_zeros}, None
+
+    # Then for the zeros and number of digits of the coordinates
+    if detected_zeros is None:
+        detected_zeros = _sampled_zeros(data)
+    if detected_format is None:
+        format_options = _sampled_formats(data, detected_zeros, format_options)
+        if len(format_options) == 1:
+            detected_format = format_options[0]
+
+    if detected_format is not None and detected_zeros is not None:
+        return {'format': detected_format, 'zeros': detected_zeros}, None
 
     # Only look at remaining options
     if detected_format is not None:
@@ -839,13 +871,14 @@ def detect_excellon_format(data=None, filename=None):
             settings = FileSettings(zeros=zeros, format=fmt)
             try:
                 p = ExcellonParser(settings)
-                ef = p.parse_raw(data)
+                ef = p.parse_raw(data, filename)
                 size = tuple([t[0] - t[1] for t in ef.bounding_box])
                 hole_area = 0.0
                 for hit in p.hits:
                     tool = hit.tool
                     hole_area += math.pow(math.pi * tool.diameter / 2., 2)
                 results[key] = (size, p.hole_count, hole_area)
+                parsed[key] = ef
             except:
                 pass
 
@@ -859,7 +892,8 @@ def detect_excellon_format(data=None, filename=None):
 
     # Bail out here if we got everything....
     if detected_format is not None and detected_zeros is not None:
-        return {'format': detected_format, 'zeros': detected_zeros}
+        return ({'format': detected_format, 'zeros': detected_zeros},
+                parsed.get((detected_format, detected_zeros)))
 
     # Otherwise score each option and pick the best candidate
     else:
@@ -870,7 +904,79 @@ def detect_excellon_format(data=None, filename=None):
         minscore = min(scores.values())
         for key in iter(scores.keys()):
             if scores[key] == minscore:
-                return {'format': key[0], 'zeros': key[1]}
+                return {'format': key[0], 'zeros': key[1]}, parsed[key]
+
+
+def _header_clues(data):
+    """ Format and zeros set by the header of an Excellon file, None when
+    not set or set more than once.
+
+    The header is taken as everything before the first coordinate.
+    """
+    match = _COORDINATE_LINE.search(data)
+    header = data[:match.start()] if match else data
+
+    zeros = []
+    formats = []
+    for line in header.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        # Same tests as ExcellonParser._parse_line
+        if line[0] == ';':
+            comment = CommentStmt.from_excellon(line).comment
+            # get format from altium comment
+            if 'FILE_FORMAT' in comment:
+                formats.append(tuple([int(val) for val in
+                                      comment.split('=')[1].split(':')]))
+        elif 'INCH' in line or 'METRIC' in line:
+            # Get zero_suppression from a unit statement
+            zeros.append(UnitStmt.from_excellon(line).zeros)
+
+    return (formats[0] if len(formats) == 1 else None,
+            zeros[0] if len(zeros) == 1 else None)
+
+
+def _sampled_coordinates(data):
+    """ Digits of evenly spaced coordinates of an Excellon file, without
+    sign. Coordinates with an explicit decimal point are left out, they do
+    not depend on the settings. """
+    lines = _COORDINATE_LINE.findall(data)
+    lines = lines[::max(1, len(lines) // DETECTION_SAMPLES)]
+    values = _COORDINATE_VALUE.findall(' '.join(lines))
+    return [value.lstrip('+-') for value in values if '.' not in value]
+
+
+def _sampled_zeros(data):
+    """ Zeros kept in the coordinates of an Excellon file, None if the
+    coordinates do not tell. """
+    values = [value for value in _sampled_coordinates(data) if len(value) > 1]
+    leading = any(value[0] == '0' for value in values)
+    trailing = any(value[-1] == '0' for value in values)
+    if leading and not trailing:
+        return 'leading'
+    if trailing and not leading:
+        return 'trailing'
+    return None
+
+
+def _sampled_formats(data, zeros, format_options):
+    """ Formats of `format_options` matching the number of digits of the
+    coordinates of an Excellon file.
+
+    When leading zeros are kept all digits are written unless they are
+    trailing zeros, so the longest coordinates have the full width. With
+    trailing zeros kept no coordinate is longer than the full width.
+    """
+    values = _sampled_coordinates(data)
+    if not values or zeros is None:
+        return format_options
+    longest = max(len(value) for value in values)
+    if zeros == 'leading':
+        options = tuple(fmt for fmt in format_options if sum(fmt) == longest)
+    else:
+        options = tuple(fmt for fmt in format_options if sum(fmt) >= longest)
+    return options or format_options
 
 
 def _layer_size_score(size, hole_count, hole_area):
@@ -1025,14 +1025,11 @@ class CoordStmt(Statement):
                 self.function = "G71"
 
     def offset(self, x_offset=0, y_offset=0):
+        # i and j are relative to the start of the arc, they do not move
         if self.x is not None:
             self.x += x_offset
         if self.y is not None:
             self.y += y_offset
-        if self.i is not None:
-            self.i += x_offset
-        if self.j is not None:
-            self.j += y_offset
 
     def __str__(self):
         coord_str = ''
@@ -19,8 +19,25 @@ CAM File Operations
 ===================
 **Transformations and other operations performed on Gerber and Excellon files**
 
+Unit conversions and offsets go through the methods of the file, which work
+on NumPy arrays when a Gerber file is stored in columnar form (see
+:meth:`gerber.rs274x.GerberFile.to_columnar`). Other affine transformations
+store Gerber files in columnar form and map all of their coordinates at once.
 """
 import copy
+import math
+from itertools import izip
+
+import numpy as np
+
+from .excellon_statements import CoordinateStmt
+from .gerber_statements import CoordStmt
+from .primitives import Arc, Flash, Primitive
+
+# Primitive attributes holding points, any other attribute listed in
+# Primitive._to_convert is a size, except for nested primitives
+POINT_ATTRIBUTES = ('position', 'start', 'end', 'center')
+NESTED_ATTRIBUTES = ('aperture', 'primitives')
 
 
 def to_inch(cam_file):
@@ -102,8 +119,7 @@ def scale(cam_file, x_scale, y_scale):
     cam_file : :class:`gerber.cam.CamFile` subclass
         An scaled deep copy of the source file.
     """
-    # TODO
-    pass
+    return transform(cam_file, [[x_scale, 0, 0], [0, y_scale, 0]])
 
 
 def rotate(cam_file, angle):
@@ -122,5 +138,223 @@ def rotate(cam_file, angle):
     cam_file : :class:`gerber.cam.CamFile` subclass
         An rotated deep copy of the source file.
     """
-    # TODO
-    pass
+    theta = math.radians(angle)
+    cos_theta = math.cos(theta)
+    sin_theta = math.sin(theta)
+    return transform(cam_file, [[cos_theta, -sin_theta, 0],
+                                [sin_theta, cos_theta, 0]])
+
+
+def transform(cam_file, matrix):
+    """ Apply an affine transformation to a Cam file.
+
+    Points are mapped by the matrix. Sizes (aperture and tool diameters,
+    widths...) are scaled by the square root of the determinant of its
+    linear part, so apertures are never distorted. A rotation is added to
+    the rotation of the primitives, and a mirroring matrix reverses the
+    direction of arcs. Aperture definition statements are left as they are.
+
+    Gerber files are returned in columnar form.
+
+    Parameters
+    ----------
+    cam_file : :class:`gerber.cam.CamFile` subclass
+        Gerber or Excellon file to transform
+
+    matrix : array-like, shape (2, 3) or (3, 3)
+        Affine transformation matrix, the last column is the translation.
+
+    Returns
+    -------
+    cam_file : :class:`gerber.cam.CamFile` subclass
+        A transformed deep copy of the source file.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.shape not in ((2, 3), (3, 3)):
+        raise ValueError('Affine matrix must be 2x3 or 3x3')
+    linear = matrix[:2, :2]
+    translation = matrix[:2, 2]
+    determinant = np.linalg.det(linear)
+    if determinant == 0:
+        raise ValueError('Affine matrix must be invertible')
+
+    def points(values):
+        return values.dot(linear.T) + translation
+
+    factor = math.sqrt(abs(determinant))
+    sizes = None
+    if factor != 1:
+        def sizes(value):
+            return value * factor
+
+    rotation = math.degrees(math.atan2(linear[1, 0], linear[0, 0]))
+    mirrored = determinant < 0
+
+    cam_file = copy.deepcopy(cam_file)
+    if hasattr(cam_file, 'to_columnar'):
+        cam_file.to_columnar()
+    _map_statements(cam_file.statements, linear, translation)
+    if getattr(cam_file, 'columns', None) is not None:
+        _map_columns(cam_file, points, sizes, rotation, mirrored)
+    elif not hasattr(cam_file, 'hits'):
+        # Excellon primitives are generated from the hits
+        _map_primitives(cam_file.primitives, points, sizes, rotation, mirrored)
+    _map_hits(cam_file, points, sizes)
+    cam_file._changed()
+    return cam_file
+
+
+def _map_columns(cam_file, points, sizes, rotation, mirrored):
+    """ Transform the columnar primitives of a Gerber file in place, along
+    with its apertures """
+    columns = cam_file.columns
+    for records, fields in ((columns.lines, ('start', 'end')),
+                            (columns.arcs, ('start', 'end', 'center')),
+                            (columns.flashes, ('position',))):
+        if len(records):
+            for field in fields:
+                records[field] = points(records[field])
+    if mirrored:
+        columns.arcs['clockwise'] = ~columns.arcs['clockwise']
+
+    primitives = list(columns.apertures)
+    primitives.extend(primitive for order, primitive in columns.others)
+    primitives.extend(cam_file.apertures or [])
+    _map_primitives(primitives, points, sizes, rotation, mirrored)
+
+
+def _map_statements(statements, linear, translation):
+    """ Transform the coordinates of the coordinate statements
+
+    When the linear part mixes x and y, statements missing a coordinate get
+    the current one, as in the Gerber modal coordinate rules. Arc center
+    offsets (I/J) only get the linear part.
+    """
+    coords = [statement for statement in statements
+              if isinstance(statement, (CoordStmt, CoordinateStmt))]
+    if not coords:
+        return
+
+    # Missing coordinates are None, and NaN in the array
+    xy = np.column_stack((np.array([statement.x for statement in coords], dtype=float),
+                          np.array([statement.y for statement in coords], dtype=float)))
+    missing = np.isnan(xy)
+    if linear[0, 1] == 0 and linear[1, 0] == 0:
+        xy = xy * linear.diagonal() + translation
+    else:
+        # Fill in the modal coordinates, starting from the origin
+        filled = np.vstack(([0., 0.], xy))
+        for column in (0, 1):
+            index = np.where(np.isnan(filled[:, column]), 0, np.arange(len(filled)))
+            filled[:, column] = filled[np.maximum.accumulate(index), column]
+        xy = filled[1:].dot(linear.T) + translation
+        missing = missing.all(axis=1)[:, np.newaxis].repeat(2, axis=1)
+    xy = xy.astype(object)
+    xy[missing] = None
+    for statement, x, y in izip(coords, xy[:, 0].tolist(), xy[:, 1].tolist()):
+        statement.x = x
+        statement.y = y
+
+    arcs = [statement for statement in coords
+            if isinstance(statement, CoordStmt) and
+            (statement.i is not None or statement.j is not None)]
+    if arcs:
+        ij = np.array([(statement.i or 0., statement.j or 0.)
+                       for statement in arcs], dtype=float)
+        for statement, (i, j) in zip(arcs, ij.dot(linear.T).tolist()):
+            # A missing offset is zero, keep it missing unless a rotation
+            # moved the other offset onto its axis
+            if statement.i is not None or i != 0:
+                statement.i = i
+            if statement.j is not None or j != 0:
+                statement.j = j
+
+
+def _map_primitives(primitives, points, sizes, rotation, mirrored):
+    """ Transform primitives and the primitives they are made of, in place
+
+    Shared primitives, such as apertures, are transformed once.
+
+    Parameters
+    ----------
+    points : callable
+        Maps an array of (x, y) points.
+
+    sizes : callable or None
+        Maps a size, sizes are left as they are when None.
+
+    rotation : float
+        Rotation in degrees added to the rotation of the primitives.
+
+    mirrored : bool
+        Whether the transformation mirrors the primitives.
+    """
+    seen = set()
+    pending = list(primitives)
+    while pending:
+        obj = pending.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        names = ('position', 'aperture') if isinstance(obj, Flash) else obj._to_convert
+        for name in names:
+            key = name.lstrip('_')
+            # Write behind the property setters, the position setter of an
+            # AMGroup would move its primitives a second time
+            storage = name
+            if isinstance(obj, Primitive) and '_' + key in obj.__dict__:
+                storage = '_' + key
+            value = getattr(obj, storage)
+            if value is None:
+                continue
+            if key in NESTED_ATTRIBUTES:
+                pending.extend(value if isinstance(value, list) else [value])
+            elif key in POINT_ATTRIBUTES:
+                setattr(obj, storage, tuple(points(np.array(value, dtype=float)).tolist()))
+            elif sizes is not None:
+                setattr(obj, storage, sizes(value))
+        if isinstance(obj, Flash):
+            # Its aperture may be changed in place
+            obj._changed()
+            continue
+        if mirrored and isinstance(obj, Arc):
+            obj.direction = ('counterclockwise' if obj.direction == 'clockwise'
+                             else 'clockwise')
+        if mirrored or rotation:
+            angle = round(((-obj.rotation if mirrored else obj.rotation) +
+                           rotation) % 360, 9)
+            if 'width' in names and 'height' in names:
+                # Shapes with a width and a height look the same after a
+                # half turn, and a quarter turn swaps their sides. Most of
+                # them are only drawn right when not rotated.
+                angle %= 180
+                if angle == 90:
+                    obj.width, obj.height = obj.height, obj.width
+                    angle = 0
+            # The rotation setter clears the memoized properties
+            obj.rotation = angle
+        else:
+            obj._changed()
+
+
+def _map_hits(cam_file, points, sizes):
+    """ Transform the drill hits and tools of an Excellon file in place """
+    hits = getattr(cam_file, 'hits', None)
+    if not hits:
+        return
+
+    refs = []
+    values = []
+    for hit in hits:
+        for name in ('position', 'start', 'end'):
+            if hasattr(hit, name):
+                refs.append((hit, name))
+                values.append(getattr(hit, name))
+    new_values = points(np.array(values, dtype=float)).tolist()
+    for (hit, name), value in zip(refs, new_values):
+        setattr(hit, name, tuple(value))
+
+    if sizes is not None:
+        tools = [tool for tool in cam_file.tools.values() if tool.diameter is not None]
+        for tool in tools:
+            tool.diameter = sizes(tool.diameter)
@@ -16,17 +16,73 @@
 # limitations under the License.
 
 
+import gc
 import os
+import multiprocessing
 from .exceptions import ParseError
 from .layers import PCBLayer, sort_layers
 from .common import read as gerber_read
 from .utils import listdir
 
 
+def _read_cam(path):
+    """ Read a file for PCB.from_directory, None if it is not a CAM file.
+
+    Module level so that it can run in a process pool.
+    """
+    try:
+        return gerber_read(path)
+    except ParseError:
+        return None
+
+
+def _read_cams(paths, processes):
+    """ Read files on a process pool, in the order of `paths` """
+    pool = multiprocessing.Pool(processes)
+    # Unpickling the parsed files allocates lots of objects that all stay
+    # alive, garbage collection passes would only slow it down
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pool.map(_read_cam, paths, chunksize=1)
+    finally:
+        if enabled:
+            gc.enable()
+        pool.close()
+        pool.join()
+
+
 class PCB(object):
 
     @classmethod
-    def from_directory(cls, directory, board_name=None, verbose=False):
+    def from_directory(cls, directory, board_name=None, verbose=False,
+                       processes=1):
+        """ Load the Gerber and Excellon files of a directory.
+
+        Parameters
+        ----------
+        directory : string
+            Directory containing the files of the board.
+
+        board_name : string, optional
+            Name of the board, guessed from the filenames if not provided.
+
+        verbose : bool
+            Print the layers added and the files skipped.
+
+        processes : int or None
+            Number of worker processes parsing the files. 1 parses them one
+            after another in this process, None uses one process per CPU.
+            Parsed files have to be sent back to this process, so a pool
+            only pays off with several CPUs and large files.
+
+        Returns
+        -------
+        pcb : PCB
+            Board with its layers in the order given by sort_layers.
+            Outline and drill layers get a mirrored layer sharing the same
+            parsed file.
+        """
         layers = []
         names = set()
 
@@ -35,27 +91,35 @@ class PCB(object):
         if not os.path.isdir(directory):
             raise TypeError('{} is not a directory.'.format(directory))
 
-        # Load gerber files
-        for filename in listdir(directory, True, True):
-            try:
-                camfile = gerber_read(os.path.join(directory, filename))
-                layer = PCBLayer.from_cam(camfile)
-                layers.append(layer)
-                
-                if layer.layer_class in ['outline', 'drill']:
-                    layer_mirror = PCBLayer.from_cam(camfile, mirrored='x')
-                    layers.append(layer_mirror)
-                    if verbose:
-                        print('[PCB]: Added {} layer(mirror) <{}>'.format(layer_mirror.layer_class,
-                                                                  filename))
-                    
-                names.add(os.path.splitext(filename)[0])
-                if verbose:
-                    print('[PCB]: Added {} layer <{}>'.format(layer.layer_class,
-                                                              filename))
-            except ParseError:
+        # Load gerber files, sorted so that layers of the same class always
+        # come in the same order
+        filenames = sorted(listdir(directory, True, True))
+        paths = [os.path.join(directory, filename) for filename in filenames]
+        if processes == 1 or len(paths) < 2:
+            camfiles = map(_read_cam, paths)
+        else:
+            camfiles = _read_cams(paths, processes)
+
+        for filename, camfile in zip(filenames, camfiles):
+            if camfile is None:
                 if verbose:
                     print('[PCB]: Skipping file {}'.format(filename))
+                continue
+
+            layer = PCBLayer.from_cam(camfile)
+            layers.append(layer)
+
+            if layer.layer_class in ['outline', 'drill']:
+                layer_mirror = PCBLayer.from_cam(camfile, mirrored='x')
+                layers.append(layer_mirror)
+                if verbose:
+                    print('[PCB]: Added {} layer(mirror) <{}>'.format(layer_mirror.layer_class,
+                                                              filename))
+
+            names.add(os.path.splitext(filename)[0])
+            if verbose:
+                print('[PCB]: Added {} layer <{}>'.format(layer.layer_class,
+                                                          filename))
 
         # Try to guess board name
         if board_name is None:
@@ -16,6 +16,7 @@
 # limitations under the License.
 
 
+import copy
 import math
 from operator import add
 from itertools import combinations
@@ -1689,3 +1690,118 @@ class TestRecord(Primitive):
         self.net_name = net_name
         self.layer = layer
         self._to_convert = ['position']
+
+
+class Flash(object):
+    """ Lightweight record of a flashed aperture
+
+    Flashing an aperture (D03) places a copy of the aperture primitive at a
+    given position. Boards with many identical pads would hold as many
+    copies, so a Flash only records the position, polarity and units of the
+    flash, and shares the aperture definition with every other flash of the
+    same aperture. The actual primitive is built on demand by
+    :meth:`to_primitive`, and any other attribute is read from it.
+
+    A Flash is not an instance of the class of its aperture, code testing
+    the type of primitives has to check `flashed` or build the primitive
+    first. The primitive attributes are read from a copy built on first
+    access and kept until the position, polarity, units or aperture of the
+    record change. Code changing the aperture in place has to call
+    :meth:`_changed`.
+
+    Parameters
+    ----------
+    aperture : Primitive
+        Flashed aperture, shared and never modified.
+
+    position : tuple (<float>, <float>)
+        Position of the flash.
+
+    level_polarity : string
+        Polarity of the flash. May be 'dark' or 'clear'.
+
+    units : string
+        Units of the flash, 'inch' or 'metric'. The aperture is converted to
+        these units when the primitive is built.
+    """
+    __slots__ = ('aperture', 'position', 'level_polarity', 'units', '_built')
+
+    def __init__(self, aperture, position, level_polarity='dark', units=None):
+        self.aperture = aperture
+        self.position = position
+        self.level_polarity = level_polarity
+        self.units = units
+        self._built = None
+
+    def __getattr__(self, name):
+        # Only reached for attributes missing on the record, private ones
+        # are never forwarded so that copy and pickle see a plain object
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._primitive(), name)
+
+    def __getstate__(self):
+        # The built primitive is not copied, it is built again if needed
+        return (self.aperture, self.position, self.level_polarity, self.units)
+
+    def __setstate__(self, state):
+        self.aperture, self.position, self.level_polarity, self.units = state
+        self._built = None
+
+    @property
+    def flashed(self):
+        return True
+
+    @property
+    def bounding_box(self):
+        return self._primitive().bounding_box
+
+    def _primitive(self):
+        """ The primitive the attributes are read from, not to be changed """
+        built = self._built
+        if (built is None or built[0] is not self.aperture or
+                built[1] != self.position or built[2] != self.level_polarity or
+                built[3] != self.units):
+            built = (self.aperture, self.position, self.level_polarity,
+                     self.units, self.to_primitive())
+            self._built = built
+        return built[4]
+
+    def _changed(self):
+        self._built = None
+
+    def to_primitive(self):
+        """ Build the flashed primitive.
+
+        Returns
+        -------
+        primitive : Primitive
+            A new primitive, changing it does not affect the Flash.
+        """
+        if isinstance(self.aperture, AMGroup):
+            # Moving a group moves its primitives, they must not be shared
+            primitive = copy.deepcopy(self.aperture)
+        else:
+            primitive = copy.copy(self.aperture)
+        if primitive.units != self.units:
+            if self.units == 'inch':
+                primitive.to_inch()
+            elif self.units == 'metric':
+                primitive.to_metric()
+        primitive.position = self.position
+        primitive.level_polarity = self.level_polarity
+        primitive.units = self.units
+        return primitive
+
+    def to_inch(self):
+        if self.units == 'metric':
+            self.units = 'inch'
+            self.position = tuple(map(inch, self.position))
+
+    def to_metric(self):
+        if self.units == 'inch':
+            self.units = 'metric'
+            self.position = tuple(map(metric, self.position))
+
+    def offset(self, x_offset=0, y_offset=0):
+        self.position = tuple(map(add, self.position, (x_offset, y_offset)))
@@ -139,6 +139,9 @@ class GerberContext(object):
         if not primitive:
             return
 
+        if isinstance(primitive, Flash):
+            primitive = primitive.to_primitive()
+
         self._pre_render_primitive(primitive)
 
         color = self.color
@@ -169,6 +172,15 @@ class GerberContext(object):
 
         self._post_render_primitive(primitive)
 
+    def render_columns(self, columns):
+        """ Render a :class:`gerber.columnar.PrimitiveColumns`
+
+        Primitives are built and rendered one at a time, in layer order.
+        Contexts that can draw straight from the arrays override this.
+        """
+        for primitive in columns.iter_primitives():
+            self.render(primitive)
+
     def _pre_render_primitive(self, primitive):
         """
         Called before rendering a primitive. Use the callback to perform some action before rendering
@@ -23,6 +23,8 @@ import shapely.geometry as sg
 #from shapely.geometry.polygon import orient
 from shapely.ops import cascaded_union
 from shapely.ops import linemerge
+from shapely.strtree import STRtree
+from shapely.prepared import prep
 from shapely import affinity
 from shapely import speedups
 
@@ -53,6 +55,10 @@ class ShapelyContext(GerberContext):
         self.origin = (0,0)
         self.size = (0,0)
         self.ignore_width = ignore_width
+        self._index = None
+        self._index_figs = None
+        self._index_size = 0
+        self._index_ids = {}
 
     def set_ignore_width(self, ignore_width):
         self.ignore_width = ignore_width
@@ -87,6 +93,187 @@ class ShapelyContext(GerberContext):
             ofigs.append(tmp)
         self.figs = ofigs
 
+    @property
+    def spatial_index(self):
+        """ STRtree over the bounds of figs, built on first use
+
+        The tree holds one box per position in figs, so that a fig listed
+        twice is found at both positions. Empty figs have no bounds and are
+        left out. The index is built again when figs is replaced by another
+        list or its length changes. Code replacing items of figs in place
+        has to call _changed().
+        """
+        if (self._index is None or self._index_figs is not self.figs or
+                self._index_size != len(self.figs)):
+            boxes = [(i, sg.box(*fig.bounds)) for i, fig in enumerate(self.figs)
+                     if not fig.is_empty]
+            self._index = STRtree([box for i, box in boxes])
+            self._index_figs = self.figs
+            self._index_size = len(self.figs)
+            self._index_ids = dict((id(box), i) for i, box in boxes)
+        return self._index
+
+    def _indices(self, window):
+        """ Positions in figs of the boxes intersecting a window """
+        index = self.spatial_index
+        ids = self._index_ids
+        return [ids[id(box)] for box in index.query(window)]
+
+    def _changed(self):
+        self._index = None
+
+    def query(self, window):
+        """ Find the figs whose bounds intersect a window
+
+        Parameters
+        ----------
+        window : shapely geometry or tuple
+            Geometry or (minx, miny, maxx, maxy) bounds to look into.
+
+        Returns
+        -------
+        indices : list of int
+            Sorted indices in figs. Only the bounds are compared, the
+            figs themselves may not intersect the window. Empty figs are
+            never found.
+        """
+        if isinstance(window, tuple):
+            window = sg.box(*window)
+        return sorted(self._indices(window))
+
+    def nearest(self, geometry):
+        """ Find the fig closest to a geometry
+
+        Returns
+        -------
+        nearest : tuple (<int>, <float>) or None
+            Index in figs and distance of the closest fig, None if there
+            are no figs. Ties go to the lowest index.
+        """
+        # Empty figs are at 0 from anything, they are not in the index
+        self.spatial_index
+        if geometry.is_empty or not self._index_ids:
+            return None
+        minx, miny, maxx, maxy = geometry.bounds
+        step = max(maxx - minx, maxy - miny)
+        if step <= 0:
+            step = 1.0
+        distances = {}
+        r = 0.0
+        while True:
+            window = sg.box(minx - r, miny - r, maxx + r, maxy + r)
+            for i in self._indices(window):
+                if i not in distances:
+                    distances[i] = self.figs[i].distance(geometry)
+            if distances:
+                d, idx = min((d, i) for i, d in distances.items())
+                # Any fig closer than d has its bounds within d
+                if d <= r:
+                    return idx, d
+                r = d
+            else:
+                r = max(r * 2, step)
+
+    def clip(self, outline):
+        """ Keep only the part of figs inside an outline
+
+        Figs entirely inside the outline are kept as they are, figs
+        outside of its bounds are dropped without being intersected.
+        """
+        inside = prep(outline)
+        candidates = self.query(outline)
+        ofigs = []
+        for i in candidates:
+            fig = self.figs[i]
+            if inside.contains(fig):
+                ofigs.append(fig)
+            elif inside.intersects(fig):
+                ofigs.extend(_parts(fig.intersection(outline)))
+        self.figs = ofigs
+
+    def clearance_violations(self, clearance):
+        """ Find the pairs of figs closer than a clearance
+
+        Only the figs whose bounds, grown by the clearance, intersect are
+        measured. Figs touching each other have a distance of 0 and are
+        reported too, use _flatten() first to merge them.
+
+        Returns
+        -------
+        violations : list of tuple (<int>, <int>, <float>)
+            Indices in figs, the first one lower, and distance of each pair.
+        """
+        violations = []
+        for i, fig in enumerate(self.figs):
+            if fig.is_empty:
+                continue
+            minx, miny, maxx, maxy = fig.bounds
+            window = sg.box(minx - clearance, miny - clearance,
+                            maxx + clearance, maxy + clearance)
+            touching = None
+            for j in self._indices(window):
+                if j <= i:
+                    continue
+                other = self.figs[j]
+                if touching is None:
+                    touching = prep(fig)
+                # Overlapping figs are common and much cheaper to find
+                if touching.intersects(other):
+                    distance = 0.0
+                else:
+                    distance = fig.distance(other)
+                if distance < clearance:
+                    violations.append((i, j, distance))
+        return violations
+
+    def render_columns(self, columns):
+        """ Render a PrimitiveColumns without building line or flash objects
+
+        Each aperture is rendered once and its flashes are copies of that
+        shape moved with NumPy. Arcs, regions and other primitives are
+        rendered one at a time.
+        """
+        lines = columns.lines[columns.lines['region'] < 0]
+        for aperture_id in np.unique(lines['aperture']):
+            aperture = columns.apertures[aperture_id]
+            selected = lines[lines['aperture'] == aperture_id]
+            segments = np.stack((selected['start'], selected['end']), axis=1)
+            if not isinstance(aperture, (Circle, Rectangle)):
+                continue
+            if self.ignore_width:
+                self.figs.extend(sg.LineString(segment) for segment in segments)
+            elif isinstance(aperture, Circle):
+                width = aperture.diameter / 2.0
+                if width >= 0.1:
+                    self.figs.extend(sg.LineString(segment).buffer(width, cap_style=1, join_style=1, resolution=8)
+                                     for segment in segments)
+            else:
+                # The swept rectangle is the convex hull of its corners at
+                # both ends of the line, as in Line.vertices
+                corners = np.array([(-1, -1), (1, -1), (1, 1), (-1, 1)]) * (aperture.width / 2.0,
+                                                                        aperture.height / 2.0)
+                strokes = (segments[:, :, np.newaxis, :] + corners).reshape(-1, 8, 2)
+                self.figs.extend(sg.MultiPoint(stroke).convex_hull for stroke in strokes)
+
+        flashes = columns.flashes
+        for aperture_id in np.unique(flashes['aperture']):
+            positions = flashes['position'][flashes['aperture'] == aperture_id]
+            figs = self.figs
+            self.figs = []
+            self.render(Flash(columns.apertures[aperture_id], (0.0, 0.0), 'dark', columns.units))
+            shapes, self.figs = self.figs, figs
+            for shape in shapes:
+                if shape.geom_type == 'Polygon' and not shape.interiors:
+                    exterior = np.asarray(shape.exterior.coords)
+                    for coords in exterior[np.newaxis, :, :] + positions[:, np.newaxis, :]:
+                        self.figs.append(sg.Polygon(coords))
+                else:
+                    for x, y in positions:
+                        self.figs.append(affinity.translate(shape, xoff=x, yoff=y))
+
+        for primitive in columns.iter_primitives(('arc', 'region', 'other')):
+            self.render(primitive)
+
     def _render_line(self, line, color):
         #print("TODO: render line")
         if isinstance(line.aperture, Circle):
@@ -99,13 +286,10 @@ class ShapelyContext(GerberContext):
                     return
                 self.figs.append( sg.LineString([line.start,line.end]).buffer(width, cap_style=1, join_style=1, resolution=8) )
         elif isinstance(line.aperture, Rectangle):
-            print("TODO: render line [aperture=rect]")
-            #~ points = [self.scale_point(x) for x in line.vertices]
-            #~ self.ctx.set_line_width(0)
-            #~ self.ctx.move_to(*points[0])
-            #~ for point in points[1:]:
-                #~ self.ctx.line_to(*point)
-            #~ self.ctx.fill()
+            if self.ignore_width:
+                self.figs.append( sg.LineString([line.start,line.end]) )
+            else:
+                self.figs.append( sg.MultiPoint(line.vertices).convex_hull )
             
     def __wrapTo360(self, angle):
         angle = np.fmod(angle,360);
@@ -314,6 +498,7 @@ class ShapelyContext(GerberContext):
         elif result.geom_type == 'MultiPolygon' or result.geom_type == 'MultiLineString':
             for f in result:
                 self.figs.append(f)
+        self._changed()
 
     def _new_render_layer(self, color=None, mirror=False):
         #~ print("_new_render_layer")
@@ -326,3 +511,17 @@ class ShapelyContext(GerberContext):
     def _paint_background(self, force=False):
         #~ print("_paint_background")
         pass
+
+
+def _parts(geometry):
+    """ Split a geometry into its polygons and lines """
+    if geometry.is_empty:
+        return []
+    if geometry.geom_type in ('Polygon', 'LineString', 'LinearRing'):
+        return [geometry]
+    if hasattr(geometry, 'geoms'):
+        parts = []
+        for g in geometry.geoms:
+            parts.extend(_parts(g))
+        return parts
+    return []
@@ -18,8 +18,8 @@
 """ This module provides an RS-274-X class and parser.
 """
 
-import copy
 import json
+import mmap
 import os
 import re
 import sys
@@ -32,7 +32,8 @@ except(ImportError):
 from .gerber_statements import *
 from .primitives import *
 from .cam import CamFile, FileSettings
-from .utils import sq_distance
+from .columnar import PrimitiveColumns
+from .utils import sq_distance, parse_gerber_value
 
 
 def read(filename):
@@ -70,6 +71,27 @@ def loads(data, filename=None):
     return GerberParser().parse_raw(data, filename)
 
 
+def stream_primitives(filename):
+    """ Iterate over the primitives of a gerber file as it is parsed
+
+    Neither the statements nor the primitives are kept, use this rather
+    than :func:`read` when only the primitives are needed, e.g. to build
+    toolpaths from very large files.
+
+    Parameters
+    ----------
+    filename : string
+        Filename of file to parse
+
+    Returns
+    -------
+    primitives : generator of :class:`gerber.primitives.Primitive`
+        The primitives of the file, in file order. Flashes are
+        :class:`gerber.primitives.Flash` records.
+    """
+    return GerberParser().stream_primitives(filename)
+
+
 class GerberFile(CamFile):
     """ A class representing a single gerber file
 
@@ -98,13 +120,57 @@ class GerberFile(CamFile):
         boundaries of the layer described by the gerber file.
         `bounds` is stored as ((min x, max x), (min y, max y))
 
+    bounding_box: tuple, ((<float>, <float>), (<float>, <float>))
+        boundaries of the primitives, apertures included. `bounds` and
+        `bounding_box` are computed on first access and kept until
+        :meth:`offset`, :meth:`to_inch` or :meth:`to_metric` change the file.
+        Code changing statements or primitives in place must call
+        :meth:`_changed`.
+
+    primitives : list of :class:`gerber.primitives.Primitive`
+        Primitives of the layer. Flashes are :class:`gerber.primitives.Flash`
+        records rather than instances of the class of their aperture, check
+        `flashed` or call `to_primitive()` before testing their type.
+
+    columns : :class:`gerber.columnar.PrimitiveColumns`
+        Primitives of the file in columnar form, see :meth:`to_columnar`.
+        None while the primitives are stored as objects.
+
     """
 
     def __init__(self, statements, settings, primitives, apertures, filename=None):
+        self.columns = None
+        self._bounds = None
+        self._bounding_box = None
         super(GerberFile, self).__init__(statements, settings, primitives, filename)
 
         self.apertures = apertures
 
+    @property
+    def primitives(self):
+        # Back to objects for code that needs them, see to_columnar
+        if self.columns is not None:
+            self._primitives = self.columns.to_primitives()
+            self.columns = None
+        return self._primitives
+
+    @primitives.setter
+    def primitives(self, primitives):
+        self._changed()
+        self.columns = None
+        self._primitives = primitives
+
+    def to_columnar(self):
+        """ Store the primitives in columnar form.
+
+        The bounding box, offset, unit conversion and rendering then work on
+        NumPy arrays. Accessing `primitives` converts them back to objects.
+        """
+        if self.columns is None:
+            self.columns = PrimitiveColumns.from_primitives(self._primitives,
+                                                            self.units)
+            self._primitives = None
+
     @property
     def comments(self):
         return [comment.comment for comment in self.statements
@@ -117,10 +183,16 @@ class GerberFile(CamFile):
 
     @property
     def bounds(self):
+        if self._bounds is not None:
+            return self._bounds
+
         min_x = min_y = 1000000
         max_x = max_y = -1000000
 
-        for stmt in [stmt for stmt in self.statements if isinstance(stmt, CoordStmt)]:
+        for stmt in self.statements:
+            if not isinstance(stmt, CoordStmt):
+                continue
+
             if stmt.x is not None:
                 min_x = min(stmt.x, min_x)
                 max_x = max(stmt.x, max_x)
@@ -129,10 +201,18 @@ class GerberFile(CamFile):
                 min_y = min(stmt.y, min_y)
                 max_y = max(stmt.y, max_y)
 
-        return ((min_x, max_x), (min_y, max_y))
+        self._bounds = ((min_x, max_x), (min_y, max_y))
+        return self._bounds
 
     @property
     def bounding_box(self):
+        if self._bounding_box is not None:
+            return self._bounding_box
+
+        if self.columns is not None:
+            self._bounding_box = self.columns.bounding_box
+            return self._bounding_box
+
         min_x = min_y = 1000000
         max_x = max_y = -1000000
 
@@ -144,7 +224,8 @@ class GerberFile(CamFile):
             min_y = min(bounds[1][0], min_y)
             max_y = max(bounds[1][1], max_y)
 
-        return ((min_x, max_x), (min_y, max_y))
+        self._bounding_box = ((min_x, max_x), (min_y, max_y))
+        return self._bounding_box
 
     def write(self, filename, settings=None):
         """ Write data out to a gerber file.
@@ -156,25 +237,43 @@ class GerberFile(CamFile):
 
     def to_inch(self):
         if self.units != 'inch':
+            self._changed()
             self.units = 'inch'
             for statement in self.statements:
                 statement.to_inch()
-            for primitive in self.primitives:
-                primitive.to_inch()
+            if self.columns is not None:
+                self.columns.to_inch()
+            else:
+                for primitive in self.primitives:
+                    primitive.to_inch()
 
     def to_metric(self):
         if self.units != 'metric':
+            self._changed()
             self.units = 'metric'
             for statement in self.statements:
                 statement.to_metric()
-            for primitive in self.primitives:
-                primitive.to_metric()
+            if self.columns is not None:
+                self.columns.to_metric()
+            else:
+                for primitive in self.primitives:
+                    primitive.to_metric()
 
     def offset(self, x_offset=0,  y_offset=0):
+        self._changed()
         for statement in self.statements:
             statement.offset(x_offset, y_offset)
-        for primitive in self.primitives:
-            primitive.offset(x_offset, y_offset)
+        if self.columns is not None:
+            self.columns.offset(x_offset, y_offset)
+        else:
+            for primitive in self.primitives:
+                primitive.offset(x_offset, y_offset)
+
+    def _render_primitives(self, ctx):
+        if self.columns is not None:
+            ctx.render_columns(self.columns)
+        else:
+            super(GerberFile, self)._render_primitives(ctx)
 
 
 class GerberParser(object):
@@ -216,6 +315,33 @@ class GerberParser(object):
 
     PARAM_STMT = [re.compile(r"%?{0}\*%?".format(p)) for p in PARAMS]
 
+    # Parameter matchers keyed by parameter name, in PARAMS order
+    PARAM_MATCHERS = {}
+    for _name, _expr in zip(('FS', 'MO', 'LP', 'AD', 'AD', 'AD', 'AD', 'AD',
+                             'AM', 'AS', 'IF', 'IN', 'IP', 'IR', 'MI', 'OF',
+                             'SF', 'LN'), PARAM_STMT):
+        PARAM_MATCHERS.setdefault(_name, []).append(('param', _expr))
+    del _name, _expr
+
+    # Parameter statement classes, keyed by parameter name. IF is handled
+    # by the parser itself.
+    PARAM_CLASSES = {
+        'FS': FSParamStmt,
+        'MO': MOParamStmt,
+        'LP': LPParamStmt,
+        'AD': ADParamStmt,
+        'AM': AMParamStmt,
+        'OF': OFParamStmt,
+        'IN': INParamStmt,
+        'LN': LNParamStmt,
+        # deprecated
+        'AS': ASParamStmt,
+        'IP': IPParamStmt,
+        'IR': IRParamStmt,
+        'MI': MIParamStmt,
+        'SF': SFParamStmt,
+    }
+
     COORD_FUNCTION = r"G0?[123]"
     COORD_OP = r"D0?[123]"
 
@@ -234,6 +360,37 @@ class GerberParser(object):
     REGION_MODE_STMT = re.compile(r'(?P<mode>G3[67])\*')
     QUAD_MODE_STMT = re.compile(r'(?P<mode>G7[45])\*')
 
+    # Statement recognizers keyed by the first two characters of a block,
+    # or by the first one when there is no two character entry. Candidates
+    # are tried in order and the first match wins.
+    RECOGNIZERS = {
+        'X': (('coord', COORD_STMT),),
+        'Y': (('coord', COORD_STMT),),
+        'I': (('coord', COORD_STMT),),
+        'J': (('coord', COORD_STMT),),
+        'D': (('coord', COORD_STMT), ('aperture', APERTURE_STMT)),
+        'G0': (('coord', COORD_STMT), ('comment', COMMENT_STMT)),
+        'G1': (('coord', COORD_STMT),),
+        'G2': (('coord', COORD_STMT),),
+        'G3': (('coord', COORD_STMT), ('region', REGION_MODE_STMT)),
+        'G4': (('comment', COMMENT_STMT),),
+        'G5': (('aperture', APERTURE_STMT),),
+        'G7': (('quadrant', QUAD_MODE_STMT), ('unit', DEPRECATED_UNIT)),
+        'G9': (('format', DEPRECATED_FORMAT),),
+        'M0': (('eof', EOF_STMT),),
+        'M1': (('eof', EOF_STMT),),
+        'M2': (('eof', EOF_STMT),),
+    }
+    for _name, _matchers in PARAM_MATCHERS.items():
+        RECOGNIZERS[_name] = tuple(_matchers)
+    del _name, _matchers
+
+    # Command splitting, see _split_commands
+    SPLIT_RUN = re.compile(r"[^*\r\n]*\*|[^*\r\n]+")
+    SPLIT_BLOCK = re.compile(r"[^*\r\n]*\*|[^*\r\n]+(?=[\r\n])")
+    SPLIT_HEADER = re.compile(r"(?P<block>%?[^%\r\n]*)(?P<end>%|[\r\n]|$)")
+    SPLIT_CHUNK_SIZE = 1 << 20
+
     # Keep include loop from crashing us
     INCLUDE_FILE_RECURSION_LIMIT = 10
 
@@ -276,36 +433,98 @@ class GerberParser(object):
 
         return GerberFile(self.statements, self.settings, self.primitives, self.apertures.values(), filename)
 
+    def stream_primitives(self, filename):
+        """ Parse a file and yield its primitives as soon as they are evaluated.
+
+        The file is memory mapped rather than read, and statements are
+        dropped once evaluated, so memory use does not grow with the file
+        size. Region primitives are yielded when the region is closed.
+        """
+        self.filename = filename
+        with open(filename, "rb") as fp:
+            try:
+                data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mapped
+                data = ''
+            try:
+                for primitive in self.stream_primitives_raw(data, filename):
+                    yield primitive
+            finally:
+                if data:
+                    data.close()
+
+    def stream_primitives_raw(self, data, filename=None):
+        """ Yield the primitives of gerber data as soon as they are evaluated.
+
+        Same as parse_raw but statements are not kept and primitives are
+        handed out instead of being collected into a GerberFile.
+        """
+        self.filename = filename
+        primitives = self.primitives
+        for stmt in self._parse(self._split_commands(data)):
+            self.evaluate(stmt)
+            if primitives:
+                for primitive in primitives:
+                    yield primitive
+                del primitives[:]
+
     def _split_commands(self, data):
         """
         Split the data into commands. Commands end with * (and also newline to help with some badly formatted files)
-        """
 
+        Runs of ordinary commands up to the next '%' are split in bulk with a
+        compiled regular expression, a chunk at a time. Parameter blocks
+        (``%...%``) and any line seen before the first closing '%' are
+        handled line by line, as they may span several lines.
+        """
         length = len(data)
         start = 0
         in_header = True
 
-        for cur in range(0, length):
-
-            val = data[cur]
-
-            if val == '%' and start == cur:
-                in_header = True
+        while start < length:
+            if in_header:
+                match = self.SPLIT_HEADER.match(data, start)
+                if match.group('end') == '%':
+                    yield match.group(0)
+                    in_header = False
+                elif match.group('end'):
+                    if match.group('block'):
+                        yield match.group('block')
+                else:
+                    # Unterminated data at the end of file
+                    return
+                start = match.end(0)
                 continue
 
-            if val == '\r' or val == '\n':
-                if start != cur:
-                    yield data[start:cur]
-                start = cur + 1
-
-            elif not in_header and val == '*':
-                yield data[start:cur + 1]
-                start = cur + 1
+            stop = data.find('%', start)
+            if stop < 0:
+                stop = length
+            if stop - start > self.SPLIT_CHUNK_SIZE:
+                stop = data.find('\n', start + self.SPLIT_CHUNK_SIZE, stop) + 1 or stop
+
+            # Only split up to the last terminator, whatever follows it
+            # belongs to a block that continues past `stop`
+            last = max(data.rfind('*', start, stop),
+                       data.rfind('\n', start, stop),
+                       data.rfind('\r', start, stop))
+            if last >= start:
+                for block in self.SPLIT_RUN.findall(data, start, last + 1):
+                    yield block
+                start = last + 1
+
+            if start == stop:
+                if start < length and data[start] == '%':
+                    in_header = True
+                continue
 
-            elif in_header and val == '%':
-                yield data[start:cur + 1]
-                start = cur + 1
-                in_header = False
+            # A '%' in the middle of a block does not start a parameter
+            match = self.SPLIT_BLOCK.match(data, start)
+            if match is None:
+                # Unterminated data at the end of file
+                return
+            yield match.group(0)
+            start = match.end(0)
 
     def dump_json(self):
         stmts = {"statements": [stmt.__dict__ for stmt in self.statements]}
@@ -319,165 +538,147 @@ class GerberParser(object):
 
     def _parse(self, data):
         oldline = ''
+        recognizers = self.RECOGNIZERS
+        param_matchers = self.PARAM_MATCHERS
+        coord_stmt = self._coord_stmt
 
         for line in data:
-            line = oldline + line.strip()
+            line = oldline + line.strip() if oldline else line.strip()
 
             # skip empty lines
-            if not len(line):
+            if not line:
                 continue
 
             # deal with multi-line parameters
-            if line.startswith("%") and not line.endswith("%") and not "%" in line[1:]:
+            if line[0] == "%" and not line.endswith("%") and not "%" in line[1:]:
                 oldline = line
                 continue
 
-            did_something = True  # make sure we do at least one loop
-            while did_something and len(line) > 0:
-                did_something = False
-
+            pos = 0
+            length = len(line)
+            while pos < length:
                 # consume empty data blocks
-                if line[0] == '*':
-                    line = line[1:]
-                    did_something = True
-                    continue
-
-                # coord
-                (coord, r) = _match_one(self.COORD_STMT, line)
-                if coord:
-                    yield CoordStmt.from_dict(coord, self.settings)
-                    line = r
-                    did_something = True
-                    continue
-
-                # aperture selection
-                (aperture, r) = _match_one(self.APERTURE_STMT, line)
-                if aperture:
-                    yield ApertureStmt(**aperture)
-                    did_something = True
-                    line = r
+                if line[pos] == '*':
+                    pos += 1
                     continue
 
-                # parameter
-                (param, r) = _match_one_from_many(self.PARAM_STMT, line)
-
-                if param:
-                    if param["param"] == "FS":
-                        stmt = FSParamStmt.from_dict(param)
-                        self.settings.zero_suppression = stmt.zero_suppression
-                        self.settings.format = stmt.format
-                        self.settings.notation = stmt.notation
-                        yield stmt
-                    elif param["param"] == "MO":
-                        stmt = MOParamStmt.from_dict(param)
-                        self.settings.units = stmt.mode
-                        yield stmt
-                    elif param["param"] == "LP":
-                        yield LPParamStmt.from_dict(param)
-                    elif param["param"] == "AD":
-                        yield ADParamStmt.from_dict(param)
-                    elif param["param"] == "AM":
-                        stmt = AMParamStmt.from_dict(param)
-                        stmt.units = self.settings.units
+                # dispatch on the leading characters of the block
+                if line[pos] == '%':
+                    candidates = param_matchers.get(line[pos + 1:pos + 3], ())
+                else:
+                    candidates = (recognizers.get(line[pos:pos + 2]) or
+                                  recognizers.get(line[pos], ()))
+
+                match = None
+                for kind, expr in candidates:
+                    match = expr.match(line, pos)
+                    if match:
+                        break
+
+                if match is None:
+                    if line.find('*', pos) > pos:
+                        yield UnknownStmt(line[pos:])
+                        pos = length
+                    break
+
+                if kind == 'coord':
+                    yield coord_stmt(*match.group('function', 'x', 'y', 'i', 'j', 'op'))
+
+                elif kind == 'aperture':
+                    yield ApertureStmt(match.group('d'), match.group('deprecated'))
+
+                elif kind == 'param':
+                    param = match.groupdict()
+                    if param["param"] == "IF":
+                        for stmt in self._parse_include(param["filename"]):
+                            yield stmt
+                    elif param["param"] in self.PARAM_CLASSES:
+                        stmt = self.PARAM_CLASSES[param["param"]].from_dict(param)
+                        if stmt.param == "FS":
+                            self.settings.zero_suppression = stmt.zero_suppression
+                            self.settings.format = stmt.format
+                            self.settings.notation = stmt.notation
+                        elif stmt.param == "MO":
+                            self.settings.units = stmt.mode
+                        elif stmt.param == "AM":
+                            stmt.units = self.settings.units
                         yield stmt
-                    elif param["param"] == "OF":
-                        yield OFParamStmt.from_dict(param)
-                    elif param["param"] == "IF":
-                        # Don't crash on include loop
-                        if self._recursion_depth < self.INCLUDE_FILE_RECURSION_LIMIT:
-                            self._recursion_depth += 1
-                            with open(os.path.join(os.path.dirname(self.filename), param["filename"]), 'r') as f:
-                                inc_data = f.read()
-                            for stmt in self._parse(self._split_commands(inc_data)):
-                                yield stmt
-                            self._recursion_depth -= 1
-                        else:
-                            raise IOError("Include file nesting depth limit exceeded.")
-                    elif param["param"] == "IN":
-                        yield INParamStmt.from_dict(param)
-                    elif param["param"] == "LN":
-                        yield LNParamStmt.from_dict(param)
-                    # deprecated commands AS, IN, IP, IR, MI, OF, SF, LN
-                    elif param["param"] == "AS":
-                        yield ASParamStmt.from_dict(param)
-                    elif param["param"] == "IN":
-                        yield INParamStmt.from_dict(param)
-                    elif param["param"] == "IP":
-                        yield IPParamStmt.from_dict(param)
-                    elif param["param"] == "IR":
-                        yield IRParamStmt.from_dict(param)
-                    elif param["param"] == "MI":
-                        yield MIParamStmt.from_dict(param)
-                    elif param["param"] == "OF":
-                        yield OFParamStmt.from_dict(param)
-                    elif param["param"] == "SF":
-                        yield SFParamStmt.from_dict(param)
-                    elif param["param"] == "LN":
-                        yield LNParamStmt.from_dict(param)
                     else:
-                        yield UnknownStmt(line)
+                        yield UnknownStmt(line[pos:])
 
-                    did_something = True
-                    line = r
-                    continue
+                elif kind == 'region':
+                    yield RegionModeStmt.from_gerber(line[pos:])
 
-                # Region Mode
-                (mode, r) = _match_one(self.REGION_MODE_STMT, line)
-                if mode:
-                    yield RegionModeStmt.from_gerber(line)
-                    line = r
-                    did_something = True
-                    continue
+                elif kind == 'quadrant':
+                    yield QuadrantModeStmt.from_gerber(line[pos:])
 
-                # Quadrant Mode
-                (mode, r) = _match_one(self.QUAD_MODE_STMT, line)
-                if mode:
-                    yield QuadrantModeStmt.from_gerber(line)
-                    line = r
-                    did_something = True
-                    continue
+                elif kind == 'comment':
+                    yield CommentStmt(match.group('comment'))
 
-                # comment
-                (comment, r) = _match_one(self.COMMENT_STMT, line)
-                if comment:
-                    yield CommentStmt(comment["comment"])
-                    did_something = True
-                    line = r
-                    continue
-
-                # deprecated codes
-                (deprecated_unit, r) = _match_one(self.DEPRECATED_UNIT, line)
-                if deprecated_unit:
+                elif kind == 'unit':
+                    # deprecated G70/G71
                     stmt = MOParamStmt(param="MO", mo="inch" if "G70" in
-                                       deprecated_unit["mode"] else "metric")
+                                       match.group('mode') else "metric")
                     self.settings.units = stmt.mode
                     yield stmt
-                    line = r
-                    did_something = True
-                    continue
 
-                (deprecated_format, r) = _match_one(self.DEPRECATED_FORMAT, line)
-                if deprecated_format:
-                    yield DeprecatedStmt.from_gerber(line)
-                    line = r
-                    did_something = True
-                    continue
+                elif kind == 'format':
+                    # deprecated G90/G91
+                    yield DeprecatedStmt.from_gerber(line[pos:])
 
-                # eof
-                (eof, r) = _match_one(self.EOF_STMT, line)
-                if eof:
+                elif kind == 'eof':
                     yield EofStmt()
-                    did_something = True
-                    line = r
-                    continue
 
-                if line.find('*') > 0:
-                    yield UnknownStmt(line)
-                    did_something = True
-                    line = ""
-                    continue
+                pos = match.end(0)
 
-            oldline = line
+            oldline = line[pos:]
+
+    def _coord_stmt(self, function, x, y, i, j, op):
+        """ Build a CoordStmt from the raw strings of a coordinate block.
+
+        With leading zeros suppressed, short enough X and Y values are plain
+        counts of the smallest unit. Reading them with float() and dividing
+        by an exact power of ten gives what parse_gerber_value would return,
+        signed zero included, without its overhead.
+        """
+        settings = self.settings
+        fmt = settings.format
+        zero_suppression = settings.zero_suppression
+        if zero_suppression == 'leading':
+            max_digits = fmt[0] + fmt[1]
+            scale = 10.0 ** fmt[1]
+            if x is not None:
+                if len(x) <= max_digits:
+                    x = float(x) / scale
+                else:
+                    x = parse_gerber_value(x, fmt, zero_suppression)
+            if y is not None:
+                if len(y) <= max_digits:
+                    y = float(y) / scale
+                else:
+                    y = parse_gerber_value(y, fmt, zero_suppression)
+        else:
+            if x is not None:
+                x = parse_gerber_value(x, fmt, zero_suppression)
+            if y is not None:
+                y = parse_gerber_value(y, fmt, zero_suppression)
+        if i is not None:
+            i = parse_gerber_value(i, fmt, zero_suppression)
+        if j is not None:
+            j = parse_gerber_value(j, fmt, zero_suppression)
+        return CoordStmt(function, x, y, i, j, op, settings)
+
+    def _parse_include(self, filename):
+        # Don't crash on include loop
+        if self._recursion_depth < self.INCLUDE_FILE_RECURSION_LIMIT:
+            self._recursion_depth += 1
+            with open(os.path.join(os.path.dirname(self.filename), filename), 'r') as f:
+                inc_data = f.read()
+            for stmt in self._parse(self._split_commands(inc_data)):
+                yield stmt
+            self._recursion_depth -= 1
+        else:
+            raise IOError("Include file nesting depth limit exceeded.")
 
     def evaluate(self, stmt):
         """ Evaluate Gerber statement and update image accordingly.
@@ -705,15 +906,15 @@ class GerberParser(object):
                 self.current_region = None
 
         elif self.op == "D03" or self.op == "D3":
-            primitive = copy.deepcopy(self.apertures[self.aperture])
+            primitive = self.apertures[self.aperture]
 
             if primitive is not None:
 
                 if not isinstance(primitive, AMParamStmt):
-                    primitive.position = (x, y)
-                    primitive.level_polarity = self.level_polarity
-                    primitive.units = self.settings.units
-                    self.primitives.append(primitive)
+                    # Flashes share the aperture, see Flash
+                    self.primitives.append(Flash(primitive, (x, y),
+                                                 self.level_polarity,
+                                                 self.settings.units))
                 else:
                     # Aperture Macro
                     for am_prim in primitive.primitives:
@@ -779,19 +980,3 @@ class GerberParser(object):
 
     def _evaluate_aperture(self, stmt):
         self.aperture = stmt.d
-
-def _match_one(expr, data):
-    match = expr.match(data)
-    if match is None:
-        return ({}, None)
-    else:
-        return (match.groupdict(), data[match.end(0):])
-
-
-def _match_one_from_many(exprs, data):
-    for expr in exprs:
-        match = expr.match(data)
-        if match:
-            return (match.groupdict(), data[match.end(0):])
-
-    return ({}, None)
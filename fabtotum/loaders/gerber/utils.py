@@ -83,6 +83,16 @@ def parse_gerber_value(value, format=(2, 5), zero_suppression='trailing'):
 
     missing_digits = MAX_DIGITS - len(value)
 
+    # Fast path for plain digit strings. Dividing the integer by an exact
+    # power of ten rounds the same way as parsing the decimal string.
+    if missing_digits >= 0 and value.isdigit():
+        if zero_suppression == 'leading':
+            result = int(value) / (10.0 ** decimal_digits)
+            return -result if negative else result
+        elif zero_suppression == 'trailing':
+            result = (int(value) * 10 ** missing_digits) / (10.0 ** decimal_digits)
+            return -result if negative else result
+
     if zero_suppression == 'trailing':
         digits = list(value + ('0' * missing_digits))
     elif zero_suppression == 'leading':
@@ -1,3 +1,5 @@
 
 from .isolation import IsolationToolpath
 from .holders import HoldersToolpath
+from .pocket import PocketToolpath
+from .pathfile import Toolpaths, ToolpathFile
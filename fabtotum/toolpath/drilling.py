@@ -0,0 +1,128 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Order Excellon drill hits so that the tool travels as little as possible.
+
+Hits are the DrillHit and DrillSlot objects of ExcellonFile.hits. They are
+drilled tool by tool, in the order the tools are first used.
+"""
+
+import math
+
+from .ordering import order_points
+
+
+def order_hits(hits, start=(0.0, 0.0), chain_tools=False, passes=4, time_limit=None):
+    """ Return drill hits in a short drilling order
+
+    The hits of each tool are ordered with order_points(). Slots are kept
+    after the hits of their tool, in the order they were given.
+
+    Parameters
+    ----------
+    hits : list of DrillHit or DrillSlot
+        Hits to order, as in ExcellonFile.hits.
+    start : tuple (<float>, <float>)
+        Position of the tool before drilling.
+    chain_tools : bool
+        Start each tool where the previous one ended instead of at start,
+        for machines that do not move back between tools.
+    passes : int
+        Rounds of moves improving the order of each tool, see order_points().
+    time_limit : float or None
+        Seconds after which improving stops, shared between the tools by
+        their number of hits. No limit if None.
+
+    Returns
+    -------
+    hits : list of DrillHit or DrillSlot
+        The same hits grouped by tool. Setting them back to
+        ExcellonFile.hits makes ExcellonFile.path_length measure the new
+        order.
+    """
+    ordered = []
+    position = start
+    for tool_hits in _by_tool(hits):
+        if not chain_tools:
+            position = start
+        drills = [hit for hit in tool_hits if not _is_slot(hit)]
+        slots = [hit for hit in tool_hits if _is_slot(hit)]
+        budget = None
+        if time_limit is not None:
+            budget = time_limit * len(tool_hits) / max(len(hits), 1)
+        order = order_points([hit.position for hit in drills], position,
+                             passes, budget)
+        shorter = [drills[i] for i in order]
+        # Keep the given order when it is already as short
+        if _travel(shorter, position) < _travel(drills, position):
+            drills = shorter
+        tool_hits = drills + slots
+        ordered.extend(tool_hits)
+        position = _end(tool_hits[-1])
+    return ordered
+
+
+def route_length(hits, start=(0.0, 0.0), chain_tools=False):
+    """ Return the travel drilling hits in the given order
+
+    Without chain_tools the result is the same as ExcellonFile.path_length
+    for hits in the same order, each tool being measured from start.
+
+    Returns
+    -------
+    lengths : dict
+        Travel of each tool, by tool number.
+    """
+    lengths = {}
+    position = start
+    for tool_hits in _by_tool(hits):
+        if not chain_tools:
+            position = start
+        lengths[tool_hits[0].tool.number] = _travel(tool_hits, position)
+        position = _end(tool_hits[-1])
+    return lengths
+
+
+def _travel(hits, position):
+    travel = 0.0
+    for hit in hits:
+        x, y = hit.start if _is_slot(hit) else hit.position
+        travel += math.hypot(position[0] - x, position[1] - y)
+        position = _end(hit)
+    return travel
+
+
+def _by_tool(hits):
+    """ Group hits by tool number, in the order the tools are first used """
+    groups = {}
+    numbers = []
+    for hit in hits:
+        number = hit.tool.number
+        if number not in groups:
+            groups[number] = []
+            numbers.append(number)
+        groups[number].append(hit)
+    return [groups[number] for number in numbers]
+
+
+def _is_slot(hit):
+    return not hasattr(hit, 'position')
+
+
+def _end(hit):
+    return hit.end if _is_slot(hit) else hit.position
@@ -24,105 +24,55 @@ from shapely.ops import linemerge
 from shapely import speedups
 
 from .toolpath import ToolpathContext
-
-def cut_line(line, distance):
-    # Cuts a line in two at a distance from its starting point
-    if distance <= 0.0 or distance >= line.length:
-        return [LineString(line)]
-    coords = list(line.coords)
-    for i, p in enumerate(coords):
-        pd = line.project(Point(p))
-        if pd == distance:
-            return [
-                LineString(coords[:i+1]),
-                LineString(coords[i:])]
-        if pd > distance:
-            cp = line.interpolate(distance)
-            return [
-                LineString(coords[:i] + [(cp.x, cp.y)]),
-                LineString([(cp.x, cp.y)] + coords[i:])]
+from .union import buffer_union
+from .tabs import place_tabs
 
 
 class HoldersToolpath(ToolpathContext):
+	"""
+	Outline cut leaving holders, tabs of material keeping the board in place.
+	The paths are the whole outlines, ``holders`` returns the tabs of each.
+	"""
 
 	def __init__(self):
 		super(HoldersToolpath, self).__init__()
 		self.min_len = 10
 		self.holder_size = 2
+		self.count = None
+		self.spacing = None
 	
-	def set_holder_params(self, holder_size=2, min_len=10):
+	def set_holder_params(self, holder_size=2, min_len=10, count=None, spacing=None):
+		"""
+		@holder_size Length of a holder
+		@min_len Length of outline free of corners around a holder
+		@count Number of holders of each outline, four if both count and spacing are None
+		@spacing Distance between holders, used instead of count if not None
+		"""
 		self.min_len = min_len
 		self.holder_size = holder_size
+		self.count = count
+		self.spacing = spacing
 	
-	def add_holders(self, ring, holder_size, min_len):
-		x = ring.xy[0]
-		y = ring.xy[1]
-			
-		X1 = x[0]
-		Y1 = y[0]
-
-		lines = []
-
-		for i in range(1,len(x)):
-			X2 = x[i]
-			Y2 = y[i]
-			
-			l = LineString( [(X1,Y1),(X2,Y2)] )
-			
-			if l.length >= min_len:
-				lp1 = (l.length/2.0) - (holder_size/2.0)
-				lp2 = (l.length/2.0) + (holder_size/2.0)
-				
-				hp1 = l.interpolate(lp1)
-				hp2 = l.interpolate(lp2)
-				
-				l1 = cut_line(l, lp1)
-				l2 = cut_line(l, lp2)
-				
-				lines.append(l1[0])
-				lines.append(l2[1])
-			else:
-				lines.append(l)
-			
-			X1=X2
-			Y1=Y2
-
-		ml = linemerge(lines)
-		
-		lines = []
-		
-		if ml.geom_type == 'MultiLineString':
-			for ls in ml:
-				lines.append(ls)
-		else:
-			lines.append(ml)
-		
-		return lines
+	def holders(self, path):
+		"""
+		@path One of the generated paths
+		Return the holders of the path as ranges of distance along it,
+		the diameter of the first tool is added to the holder size.
+		"""
+		return place_tabs(path.coords, self.holder_size + self._tool_list[0],
+						  count=self.count, spacing=self.spacing,
+						  stretch=self.min_len)
 
 	def generate_paths(self, shapes, tool_d):
 		tool_r = tool_d / 2.0
-		toolpath = []
-		for shp in shapes:
-			toolpath.append( shp.buffer(tool_r) )
-
-		result = cascaded_union(toolpath)
+		result = buffer_union(shapes, tool_r)
 		
 		if result.geom_type == 'Polygon':
-			opt_obj = result.simplify(tolerance=0.01, preserve_topology=False)
-			tmp = self.add_holders(opt_obj.exterior, self.holder_size + tool_d, self.min_len)
-			if type(tmp) == list:
-				return tmp
-			else:
-				return [tmp]
-			
+			polygons = [result]
 		elif result.geom_type == 'MultiPolygon':
-			tmp = []
-			for f in result:
-				opt_obj = f.simplify(tolerance=0.01, preserve_topology=False)
-				tmp2 = self.add_holders(opt_obj.exterior, self.holder_size + tool_d, self.min_len)
-				if type(tmp2) == list:
-					for item in tmp2:
-						tmp.append(item)
-				else:
-					tmp.append( tmp2 )
-			return tmp
+			polygons = result.geoms
+		else:
+			polygons = []
+		
+		# Milling simplifies the paths, arcs are fitted to them as they are
+		return [f.exterior for f in polygons]
@@ -20,42 +20,58 @@ from shapely.ops import cascaded_union
 from shapely import affinity
 
 from .toolpath import ToolpathContext
+from .union import buffer_union
 
 class IsolationToolpath(ToolpathContext):
     
-    def __init__(self, use_exterior=True, use_interior=True):
+    def __init__(self, use_exterior=True, use_interior=True, passes=1, stepover=None):
         super(IsolationToolpath, self).__init__()
         self.use_exterior = use_exterior
         self.use_interior = use_interior
+        self.passes = passes
+        self.stepover = stepover
+
+    def set_passes(self, passes=1, stepover=None):
+        """
+        @passes Number of concentric isolation passes
+        @stepover Offset between passes, half the tool diameter if None
+        """
+        self.passes = passes
+        self.stepover = stepover
 
     def generate_paths(self, shapes, tool_d):
         tool_r = tool_d / 2.0
-        toolpath = []
-        for shp in shapes:
-            toolpath.append( shp.buffer(tool_r) )
-
-        result = cascaded_union(toolpath)
+        stepover = self.stepover if self.stepover is not None else tool_r
+        result = buffer_union(shapes, tool_r)
+        
+        tmp = self._rings(result)
         
-        tmp = []
+        for i in range(1, self.passes):
+            # Grow the previous pass instead of buffering the copper again
+            result = result.buffer(stepover)
+            tmp.extend( self._rings(result) )
+                
+        return tmp
+
+    def _rings(self, result):
+        """
+        @result Polygon or MultiPolygon
+        Rings to mill, exteriors first and then interiors, in polygon order.
+        """
+        exteriors = []
+        interiors = []
         
         if result.geom_type == 'Polygon':
-            if self.use_exterior:
-                tmp = [result.exterior]
-            
-            if self.use_interior:
-                for i in result.interiors:
-                    poly = Polygon(i)
-                    tmp.append( poly.exterior )
-            
+            polygons = [result]
         elif result.geom_type == 'MultiPolygon':
+            polygons = result.geoms
+        else:
+            polygons = []
+        
+        for f in polygons:
             if self.use_exterior:
-                for f in result:
-                    tmp.append( f.exterior )
-
+                exteriors.append( f.exterior )
             if self.use_interior:
-                for i in f.interiors:
-                    poly = Polygon(i)
-                    tmp.append( poly.exterior )
+                interiors.extend( f.interiors )
                 
-        return tmp
-            
+        return exteriors + interiors
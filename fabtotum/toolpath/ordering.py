@@ -0,0 +1,518 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Order toolpaths so that the tool travels as little as possible between them.
+
+Paths are milled from their first to their last coordinate, the tool
+travelling at travel height from the end of a path to the start of the next
+one. Closed rings can be entered anywhere and open paths milled in either
+direction.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from shapely.geometry import Point, box
+from shapely.strtree import STRtree
+
+
+def path_travel(paths, start=(0.0, 0.0)):
+    """ Return the travel distance between paths milled in the given order
+
+    Parameters
+    ----------
+    paths : list of shapely LineString or LinearRing
+        Paths in milling order.
+    start : tuple (<float>, <float>)
+        Position of the tool before the first path.
+
+    Returns
+    -------
+    travel : float
+        Distance travelled from the start to the first path and from the end
+        of each path to the start of the next one.
+    """
+    travel = 0.0
+    x, y = start[:2]
+    for path in paths:
+        if path.is_empty:
+            continue
+        coords = path.coords
+        x1, y1 = coords[0][:2]
+        travel += math.hypot(x1 - x, y1 - y)
+        x, y = coords[-1][:2]
+    return travel
+
+
+def rotate_ring(coords, entry, point):
+    """ Return the coordinates of a closed ring entered at another point
+
+    Parameters
+    ----------
+    coords : list of tuple (<float>, <float>)
+        Coordinates of the ring, the last one repeating the first.
+    entry : float
+        Distance along the ring of the new first point, strictly between 0
+        and the length of the ring.
+    point : tuple (<float>, <float>)
+        The point at ``entry``, as given by interpolate().
+
+    Returns
+    -------
+    coords : list of tuple (<float>, <float>)
+        Coordinates of the same ring starting and ending at ``point``.
+    """
+    xy = np.asarray(coords, dtype=float)
+    lengths = np.cumsum(np.hypot(*np.diff(xy, axis=0).T))
+    k = min(int(np.searchsorted(lengths, entry)), len(coords) - 2)
+    ring = coords[k + 1:-1] + coords[:k + 1]
+    # Do not repeat a vertex the entry point falls on
+    if _distance(point, ring[0]) < 1e-12:
+        ring = ring[1:]
+    elif _distance(point, ring[-1]) < 1e-12:
+        ring = ring[:-1]
+    return [point] + ring + [point]
+
+
+def order_paths(paths, start=(0.0, 0.0), passes=4, time_limit=None, neighbours=8):
+    """ Order paths to shorten the travel between them
+
+    Paths are first ordered by always going to the nearest unvisited one,
+    entering closed rings at their closest point. The order is then improved
+    with 2-opt and Or-opt moves between nearby paths and the entry point of
+    each ring moved to shorten the travel to and from it.
+
+    Parameters
+    ----------
+    paths : list of shapely LineString or LinearRing
+        Paths to order. Empty paths and other geometries are put last.
+    start : tuple (<float>, <float>)
+        Position of the tool before the first path.
+    passes : int
+        Rounds of moves over all the paths to improve the nearest neighbour
+        order, 0 to keep it as it is. Improving stops earlier when a round
+        does not shorten the travel.
+    time_limit : float or None
+        Seconds after which improving stops, even within a round. The order
+        then depends on the speed of the machine, no limit if None.
+    neighbours : int
+        Number of nearby paths tried for each move.
+
+    Returns
+    -------
+    paths : list of shapely LineString or LinearRing
+        The same paths, reordered, with rings starting at another point and
+        open paths possibly reversed. The paths are returned unchanged when
+        their travel cannot be shortened.
+    """
+    deadline = _deadline(time_limit)
+    nodes = []
+    other = []
+    for path in paths:
+        if path.is_empty or path.geom_type not in ('LineString', 'LinearRing'):
+            other.append(path)
+        else:
+            nodes.append(_Node(path))
+
+    if len(nodes) < 2:
+        return list(paths)
+
+    start = tuple(start[:2])
+    tour = _Tour(_nearest_neighbour(nodes, start), start)
+    if passes > 0:
+        tour.improve(neighbours, passes, deadline)
+
+    ordered = [node.ordered_path() for node in tour.order] + other
+    if path_travel(ordered, start) >= path_travel(paths, start):
+        return list(paths)
+    return ordered
+
+
+def order_points(points, start=(0.0, 0.0), passes=4, time_limit=None, neighbours=8):
+    """ Order points to shorten the travel visiting them
+
+    The points are ordered like the paths of order_paths(), each point
+    being a path that starts and ends at the same place.
+
+    Parameters
+    ----------
+    points : list of tuple (<float>, <float>)
+        Points to visit.
+    start : tuple (<float>, <float>)
+        Position of the tool before the first point.
+    passes : int
+        Rounds of moves over all the points, as in order_paths().
+    time_limit : float or None
+        Seconds after which improving stops, no limit if None.
+    neighbours : int
+        Number of nearby points tried for each move.
+
+    Returns
+    -------
+    order : list of int
+        Indices in points, in visiting order.
+    """
+    deadline = _deadline(time_limit)
+    nodes = [_Point(point, i) for i, point in enumerate(points)]
+    if len(nodes) < 2:
+        return range(len(nodes))
+
+    start = tuple(start[:2])
+    tour = _Tour(_nearest_neighbour(nodes, start), start)
+    if passes > 0:
+        tour.improve(neighbours, passes, deadline)
+    return [node.index for node in tour.order]
+
+
+class _Node(object):
+    """ A path with the point it is entered at and the point it is left at """
+
+    def __init__(self, path):
+        self.path = path
+        coords = path.coords
+        self.closed = path.geom_type == 'LinearRing' or coords[0] == coords[-1]
+        self.first = tuple(coords[0][:2])
+        self.last = tuple(coords[-1][:2])
+        self.reversed = False
+        # Distance along a closed ring of its entry point
+        self.entry = 0.0
+
+    def enter_closest(self, point):
+        """ Enter at the point of the path closest to ``point`` """
+        if self.closed:
+            self.entry = self.path.project(Point(point))
+            self.first = self.last = self.path.interpolate(self.entry).coords[0][:2]
+        elif _distance(point, self.last) < _distance(point, self.first):
+            self.flip()
+
+    def flip(self):
+        if not self.closed:
+            self.first, self.last = self.last, self.first
+            self.reversed = not self.reversed
+
+    def distance(self, point):
+        """ Travel from ``point`` to the closest place to enter the path """
+        if self.closed:
+            return self.path.distance(Point(point))
+        return min(_distance(point, self.first), _distance(point, self.last))
+
+    def ordered_path(self):
+        """ Return the path rotated or reversed to be milled from first to last """
+        path = self.path
+        coords = [c[:2] for c in path.coords]
+        if self.closed and self.entry > 0.0 and self.entry < path.length:
+            coords = rotate_ring(coords, self.entry, self.first)
+        elif self.reversed:
+            coords = coords[::-1]
+        else:
+            return path
+        return type(path)(coords)
+
+
+class _Point(object):
+    """ A point to visit, the index is its place in the points ordered """
+
+    closed = False
+
+    def __init__(self, point, index):
+        self.first = self.last = tuple(point[:2])
+        self.path = Point(self.first)
+        self.index = index
+
+    def enter_closest(self, point):
+        pass
+
+    def flip(self):
+        pass
+
+    def distance(self, point):
+        return _distance(point, self.first)
+
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def _deadline(time_limit):
+    return None if time_limit is None else time.time() + time_limit
+
+
+def _expired(deadline):
+    return deadline is not None and time.time() > deadline
+
+
+def _nearest_neighbour(nodes, start):
+    """ Order nodes by always going to the nearest unvisited one
+
+    Nodes are kept in an STRtree and looked for in a window around the
+    current position, grown until the closest node found is within it.
+    Ties go to the lowest index.
+    """
+    unvisited = set(range(len(nodes)))
+    radius = max(_search_radius(nodes), 1e-6)
+    order = []
+    point = start
+    tree = None
+    while unvisited:
+        if tree is None or stale * 2 > len(ids):
+            indexed = sorted(unvisited)
+            tree = STRtree([nodes[i].path for i in indexed])
+            ids = dict((id(nodes[i].path), i) for i in indexed)
+            stale = 0
+        distances = {}
+        r = 0.0
+        while True:
+            window = box(point[0] - r, point[1] - r, point[0] + r, point[1] + r)
+            for path in tree.query(window):
+                i = ids[id(path)]
+                if i in unvisited and i not in distances:
+                    distances[i] = nodes[i].distance(point)
+            if distances:
+                d, idx = min((d, i) for i, d in distances.items())
+                # Any node closer than d has its bounds within d
+                if d <= r:
+                    break
+                r = d
+            else:
+                r = max(r * 2, radius)
+        node = nodes[idx]
+        node.enter_closest(point)
+        order.append(node)
+        unvisited.remove(idx)
+        stale += 1
+        point = node.last
+    return order
+
+
+def _search_radius(nodes):
+    """ Mean size of the nodes, or mean spacing between them if larger """
+    size = 0.0
+    bounds = [node.path.bounds for node in nodes]
+    for minx, miny, maxx, maxy in bounds:
+        size += (maxx - minx) + (maxy - miny)
+    width = max(b[2] for b in bounds) - min(b[0] for b in bounds)
+    height = max(b[3] for b in bounds) - min(b[1] for b in bounds)
+    spacing = math.sqrt(width * height / len(nodes)) or max(width, height) / len(nodes)
+    return max(size / (2 * len(nodes)), spacing)
+
+
+class _Tour(object):
+    """ Nodes in milling order, improved by local moves """
+
+    def __init__(self, order, start):
+        self.order = order
+        self.start = start
+        self.pos = dict((id(node), p) for p, node in enumerate(order))
+
+    def _end(self, p):
+        """ Point the tool is at before entering position ``p`` """
+        return self.start if p == 0 else self.order[p - 1].last
+
+    def _begin(self, p):
+        """ Point the tool goes to after leaving position ``p - 1`` """
+        return self.order[p].first if p < len(self.order) else None
+
+    def _update(self, lo, hi):
+        for p in xrange(lo, hi):
+            self.pos[id(self.order[p])] = p
+
+    def improve(self, neighbours, passes, deadline):
+        near = _near_nodes(self.order, self.start, neighbours)
+        improved = True
+        while improved and passes > 0 and not _expired(deadline):
+            passes -= 1
+            improved = self._two_opt(near, deadline)
+            improved = self._or_opt(near, deadline) or improved
+            improved = self._move_entries() or improved
+
+    def _reverse_gain(self, i, j):
+        """ Travel saved by milling positions ``i`` to ``j`` backwards """
+        order = self.order
+        a = self._end(i)
+        b = self._begin(j + 1)
+        first = order[i].first
+        last = order[j].last
+        gain = _distance(a, first) - _distance(a, last)
+        if b is not None:
+            gain += _distance(last, b) - _distance(first, b)
+        return gain
+
+    def _reverse(self, i, j):
+        segment = self.order[i:j + 1]
+        segment.reverse()
+        for node in segment:
+            node.flip()
+        self.order[i:j + 1] = segment
+        self._update(i, j + 1)
+
+    def _two_opt(self, near, deadline):
+        improved = False
+        n = len(self.order)
+        for g in xrange(n + 1):
+            if _expired(deadline):
+                break
+            # Bring a node close to the end of position g - 1 right after it
+            left = near[id(self.order[g - 1])] if g > 0 else near[None]
+            for node in left:
+                j = self.pos[id(node)]
+                if j >= g and self._reverse_gain(g, j) > 1e-9:
+                    self._reverse(g, j)
+                    improved = True
+            # Bring a node close to the start of position g right before it
+            if g < n:
+                for node in near[id(self.order[g])]:
+                    i = self.pos[id(node)]
+                    if i < g - 1 and self._reverse_gain(i, g - 1) > 1e-9:
+                        self._reverse(i, g - 1)
+                        improved = True
+        return improved
+
+    def _or_opt(self, near, deadline):
+        improved = False
+        n = len(self.order)
+        for length in (1, 2, 3):
+            for i in xrange(n - length + 1):
+                if _expired(deadline):
+                    return improved
+                improved = self._move_segment(i, length, near) or improved
+        return improved
+
+    def _move_segment(self, i, length, near):
+        """ Move positions ``i`` to ``i + length - 1`` where they save travel """
+        order = self.order
+        j = i + length - 1
+        first = order[i].first
+        last = order[j].last
+        a = self._end(i)
+        b = self._begin(j + 1)
+        removed = _distance(a, first)
+        if b is not None:
+            removed += _distance(last, b) - _distance(a, b)
+
+        best = (1e-9, None, False)
+        gaps = set()
+        for node in near[id(order[i])] + near[id(order[j])]:
+            p = self.pos[id(node)]
+            gaps.add(p)
+            gaps.add(p + 1)
+        for g in gaps:
+            if i <= g <= j + 1:
+                continue
+            x = self._end(g)
+            y = self._begin(g)
+            for backwards in (False, True):
+                s, e = (last, first) if backwards else (first, last)
+                added = _distance(x, s)
+                if y is not None:
+                    added += _distance(e, y) - _distance(x, y)
+                if removed - added > best[0]:
+                    best = (removed - added, g, backwards)
+
+        gain, g, backwards = best
+        if g is None:
+            return False
+        segment = order[i:j + 1]
+        if backwards:
+            segment.reverse()
+            for node in segment:
+                node.flip()
+        if g < i:
+            order[g:j + 1] = segment + order[g:i]
+            self._update(g, j + 1)
+        else:
+            order[i:g] = order[j + 1:g] + segment
+            self._update(i, g)
+        return True
+
+    def _move_entries(self):
+        """ Move the entry point of rings between the paths around them """
+        improved = False
+        for p, node in enumerate(self.order):
+            if not node.closed:
+                continue
+            a = self._end(p)
+            b = self._begin(p + 1)
+            cost = lambda point: _distance(a, point) + (
+                _distance(point, b) if b is not None else 0.0)
+            best = cost(node.first)
+            entry = node.entry
+            for target in (a, b):
+                if target is None:
+                    continue
+                along = node.path.project(Point(target))
+                point = node.path.interpolate(along).coords[0][:2]
+                if cost(point) < best - 1e-9:
+                    best = cost(point)
+                    entry = along
+            if entry != node.entry:
+                node.entry = entry
+                node.first = node.last = node.path.interpolate(entry).coords[0][:2]
+                improved = True
+        return improved
+
+
+def _near_nodes(order, start, count):
+    """ Map each node, and None for the start, to the nodes closest to it
+
+    Nodes are compared by their first and last point. The points are kept
+    in an STRtree and looked for in a window around each point, grown until
+    it holds the closest ones. Ties go to the lowest point.
+    """
+    points = []
+    owners = []
+    for node in order:
+        points.append(node.first)
+        owners.append(node)
+        if node.last != node.first:
+            points.append(node.last)
+            owners.append(node)
+    k = min(2 * count + 2, len(points))
+    # One geometry per point, so that points at the same place are told apart
+    geometries = [Point(point) for point in points]
+    tree = STRtree(geometries)
+    ids = dict((id(geometry), i) for i, geometry in enumerate(geometries))
+
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    width = max(xs) - min(xs)
+    height = max(ys) - min(ys)
+    radius = max(math.sqrt(width * height * k / len(points)),
+                 max(width, height) * k / len(points), 1e-6)
+
+    near = dict((id(node), []) for node in order)
+    near[None] = []
+    queries = [start] + points
+    keys = [None] + [id(node) for node in owners]
+    for key, (x, y) in zip(keys, queries):
+        r = radius
+        while True:
+            window = box(x - r, y - r, x + r, y + r)
+            found = sorted((_distance((x, y), points[i]), i) for i in
+                           (ids[id(geometry)] for geometry in tree.query(window)))
+            # Any point closer than the k-th found is within the window
+            if len(found) >= k and found[k - 1][0] <= r:
+                break
+            r *= 2
+        nodes = near[key]
+        for d, i in found[:k]:
+            node = owners[i]
+            if id(node) != key and node not in nodes and len(nodes) < count:
+                nodes.append(node)
+    return near
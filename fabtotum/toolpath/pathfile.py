@@ -0,0 +1,208 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact toolpath files between the toolpath and gcode stages.
+
+Toolpaths are saved with the coordinates of all paths in one array and
+a few arrays holding the Z level, feed class, tool and kind of each path.
+The arrays are stored after a JSON header at aligned offsets, so that a
+file is memory mapped when loaded and paths are read only as they are
+milled. Generated toolpaths can then be kept and milled again with other
+feeds or passes without computing them again.
+
+File layout::
+
+    MAGIC, version (uint32), header length (uint32), JSON header,
+    arrays, each starting at a multiple of ALIGN bytes
+
+All numbers are little endian.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from shapely.geometry import LineString, LinearRing
+
+MAGIC = 'FABTPATH'
+VERSION = 1
+ALIGN = 16
+
+# Feed classes, the feed rate of each is chosen when milling
+FEED_MILL = 0
+FEED_CUT = 1
+FEED_RUBOUT = 2
+
+_ARRAYS = (('coords', '<f8'),
+           ('offsets', '<i8'),
+           ('z', '<f8'),
+           ('feed', 'u1'),
+           ('tool', 'u1'),
+           ('closed', 'u1'))
+
+
+class Toolpaths(object):
+    """
+    Toolpaths in memory, grouped as they were added.
+    """
+
+    def __init__(self, meta=None):
+        """
+        @meta Data saved with the toolpaths in the JSON header
+        """
+        self.meta = meta or {}
+        self.tools = []
+        self._groups = []
+
+    def add(self, paths, feed=FEED_MILL, z=None, tool=None):
+        """
+        @paths Shapely LineString or LinearRing paths
+        @feed Feed class of the paths
+        @z Z level of the paths, None if chosen when milling
+        @tool Tool diameter
+        """
+        if tool not in self.tools:
+            self.tools.append(tool)
+        self._groups.append((list(paths), feed, z, tool))
+
+    def __len__(self):
+        return sum(len(group[0]) for group in self._groups)
+
+    def paths(self, feed=None):
+        """
+        Return the paths of feed class ``feed``, all of them if None.
+        """
+        for paths, group_feed, z, tool in self._groups:
+            if feed is None or group_feed == feed:
+                for path in paths:
+                    yield path
+
+    def save(self, filename):
+        """
+        Save the toolpaths to ``filename``.
+        """
+        coords = []
+        sizes = []
+        z = []
+        feed = []
+        tool = []
+        closed = []
+        for paths, group_feed, group_z, group_tool in self._groups:
+            for path in paths:
+                xy = np.asarray(path.coords, dtype=float).reshape(-1, 3 if path.has_z else 2)[:, :2]
+                coords.append(xy)
+                sizes.append(len(xy))
+            count = len(paths)
+            z.append(np.full(count, np.nan if group_z is None else group_z))
+            feed.append(np.full(count, group_feed, dtype=np.uint8))
+            tool.append(np.full(count, self.tools.index(group_tool), dtype=np.uint8))
+            closed.append(np.array([isinstance(path, LinearRing) for path in paths], dtype=np.uint8))
+
+        arrays = {'coords': np.concatenate(coords) if coords else np.zeros((0, 2)),
+                  'offsets': np.concatenate(([0], np.cumsum(sizes, dtype=np.int64))),
+                  'z': np.concatenate(z) if z else np.zeros(0),
+                  'feed': np.concatenate(feed) if feed else np.zeros(0),
+                  'tool': np.concatenate(tool) if tool else np.zeros(0),
+                  'closed': np.concatenate(closed) if closed else np.zeros(0)}
+
+        layout = {}
+        offset = 0
+        for name, dtype in _ARRAYS:
+            data = np.ascontiguousarray(arrays[name], dtype=dtype)
+            arrays[name] = data
+            layout[name] = [offset, dtype, list(data.shape)]
+            offset += _aligned(data.nbytes)
+        header = json.dumps({'meta': self.meta, 'tools': self.tools, 'arrays': layout})
+        start = _aligned(len(MAGIC) + 8 + len(header))
+
+        with open(filename, 'wb') as fd:
+            fd.write(MAGIC + struct.pack('<II', VERSION, len(header)) + header)
+            fd.write('\0' * (start - fd.tell()))
+            for name, dtype in _ARRAYS:
+                data = arrays[name]
+                fd.write(data.tobytes())
+                fd.write('\0' * (_aligned(data.nbytes) - data.nbytes))
+
+
+class ToolpathFile(object):
+    """
+    Toolpaths loaded from a file saved by Toolpaths.
+    """
+
+    def __init__(self, filename, mmap=True):
+        """
+        @filename File to load
+        @mmap Memory map the arrays instead of reading them
+        """
+        with open(filename, 'rb') as fd:
+            magic = fd.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError("{0} is not a toolpath file".format(filename))
+            version, length = struct.unpack('<II', fd.read(8))
+            if version != VERSION:
+                raise ValueError("{0} has unknown toolpath file version {1}".format(filename, version))
+            header = json.loads(fd.read(length))
+            start = _aligned(len(MAGIC) + 8 + length)
+            if mmap:
+                data = np.memmap(filename, dtype=np.uint8, mode='r')
+            else:
+                fd.seek(0)
+                data = np.frombuffer(fd.read(), dtype=np.uint8)
+
+        self.meta = header['meta']
+        self.tools = header['tools']
+        for name, (offset, dtype, shape) in header['arrays'].items():
+            size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            array = data[start + offset:start + offset + size].view(dtype).reshape(shape)
+            setattr(self, name, array)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def path(self, i):
+        """
+        Return path ``i`` as a shapely LineString or LinearRing.
+        """
+        xy = self.coords[self.offsets[i]:self.offsets[i + 1]]
+        if self.closed[i]:
+            return LinearRing(xy)
+        return LineString(xy)
+
+    def paths(self, feed=None):
+        """
+        Return the paths of feed class ``feed``, all of them if None,
+        made as they are read.
+        """
+        for i in xrange(len(self)):
+            if feed is None or self.feed[i] == feed:
+                yield self.path(i)
+
+    def __iter__(self):
+        """
+        Return (path, z, feed, tool) of each path, ``z`` is None if chosen
+        when milling and ``tool`` is the tool diameter.
+        """
+        for i in xrange(len(self)):
+            z = float(self.z[i])
+            yield (self.path(i), None if np.isnan(z) else z,
+                   int(self.feed[i]), self.tools[self.tool[i]])
+
+
+def _aligned(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
@@ -0,0 +1,224 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from shapely.geometry import LineString, Point
+from shapely.ops import cascaded_union
+from shapely.prepared import prep
+from shapely import affinity
+
+from .toolpath import ToolpathContext
+from .union import buffer_union
+from .ordering import rotate_ring
+
+
+class PocketToolpath(ToolpathContext):
+    """ Clear the material of a region
+
+    Without a boundary the inside of the shapes is cleared. With a boundary,
+    e.g. the board outline, everything inside it but the shapes is cleared,
+    as for copper rubout.
+
+    The 'zigzag' strategy mills parallel lines at ``angle`` degrees, linked
+    into back and forth paths where the link stays in the region, and then
+    the outline of the region. The 'contour' strategy mills the outline of
+    the region shrunk again and again by the stepover, linking each contour
+    to the next one inside it.
+    """
+
+    def __init__(self, strategy='zigzag', stepover=None, angle=0.0, boundary=None):
+        super(PocketToolpath, self).__init__()
+        if strategy not in ('zigzag', 'contour'):
+            raise ValueError('Unknown pocket strategy "{0}"'.format(strategy))
+        self.strategy = strategy
+        self.stepover = stepover
+        self.angle = angle
+        self.boundary = boundary
+
+    def set_pocket_params(self, strategy='zigzag', stepover=None, angle=0.0):
+        """
+        @strategy 'zigzag' or 'contour'
+        @stepover Distance between lines or contours, half the tool diameter if None
+        @angle Direction of the zigzag lines in degrees
+        """
+        if strategy not in ('zigzag', 'contour'):
+            raise ValueError('Unknown pocket strategy "{0}"'.format(strategy))
+        self.strategy = strategy
+        self.stepover = stepover
+        self.angle = angle
+
+    def set_boundary(self, boundary):
+        """
+        @boundary Polygon to clear around the shapes, None to clear inside them
+        """
+        self.boundary = boundary
+
+    def pocket_region(self, shapes, tool_d):
+        """
+        Area the center of the tool can go through.
+        """
+        tool_r = tool_d / 2.0
+        if self.boundary is None:
+            return cascaded_union(shapes).buffer(-tool_r)
+        keep = buffer_union(shapes, tool_r)
+        return self.boundary.buffer(-tool_r).difference(keep)
+
+    def generate_paths(self, shapes, tool_d):
+        stepover = self.stepover if self.stepover is not None else tool_d / 2.0
+        region = self.pocket_region(shapes, tool_d)
+        if region.is_empty:
+            return []
+        if self.strategy == 'contour':
+            return _contour_paths(region, stepover)
+        return _zigzag_paths(region, stepover, self.angle)
+
+
+def _polygons(geometry):
+    if geometry.is_empty:
+        return []
+    if geometry.geom_type == 'Polygon':
+        return [geometry]
+    return [g for g in geometry.geoms if g.geom_type == 'Polygon' and not g.is_empty]
+
+
+def _rings(polygons):
+    rings = []
+    for polygon in polygons:
+        rings.append(polygon.exterior)
+        rings.extend(polygon.interiors)
+    return rings
+
+
+def _zigzag_paths(region, stepover, angle):
+    """ Scanlines clipped to the region and linked back and forth """
+    rotated = affinity.rotate(region, -angle, origin=(0, 0)) if angle else region
+    polygons = _polygons(rotated)
+    if not polygons:
+        return []
+    minx, miny, maxx, maxy = rotated.bounds
+    count = max(int(math.ceil((maxy - miny) / stepover)), 1)
+    spacing = (maxy - miny) / count
+    ys = miny + (np.arange(count) + 0.5) * spacing
+
+    # Every edge crosses the scanlines of a range of indices, found at once
+    edges = []
+    for ring in _rings(polygons):
+        xy = np.asarray(ring.coords)[:, :2]
+        edges.append(np.hstack((xy[:-1], xy[1:])))
+    edges = np.vstack(edges)
+    edges = edges[edges[:, 1] != edges[:, 3]]
+    x0, y0, x1, y1 = edges.T
+    low = np.minimum(y0, y1)
+    high = np.maximum(y0, y1)
+    # Scanlines with low <= y < high, so that vertices count once
+    first = np.ceil((low - miny) / spacing - 0.5).astype(int)
+    last = np.ceil((high - miny) / spacing - 0.5).astype(int) - 1
+    first = np.maximum(first, 0)
+    last = np.minimum(last, count - 1)
+    counts = np.maximum(last - first + 1, 0)
+    edge = np.repeat(np.arange(len(edges)), counts)
+    starts = np.cumsum(counts) - counts
+    line = first[edge] + np.arange(counts.sum()) - starts[edge]
+    y = ys[line]
+    x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+    order = np.lexsort((x, line))
+    line = line[order][0::2]
+    x = x[order].reshape(-1, 2)
+
+    # Link each segment to the chain ending closest to it on the line before
+    inside = prep(rotated.buffer(stepover * 1e-3))
+    reach = 2 * stepover
+    chains = []
+    ends = []
+    ends_x = []
+    for k in np.unique(line):
+        yk = ys[k]
+        new_ends = []
+        used = set()
+        for xa, xb in x[line == k]:
+            best = None
+            lo = bisect_left(ends_x, xa - reach)
+            hi = bisect_right(ends_x, xb + reach)
+            for i in xrange(lo, hi):
+                if i in used:
+                    continue
+                chain = ends[i]
+                ex, ey = chain[-1]
+                if ey != ys[k - 1]:
+                    continue
+                start, end = (xa, xb) if abs(ex - xa) <= abs(ex - xb) else (xb, xa)
+                d = math.hypot(ex - start, ey - yk)
+                if d <= reach and (best is None or d < best[0]):
+                    best = (d, i, start, end)
+            if best is not None:
+                d, i, start, end = best
+                if not inside.contains(LineString([ends[i][-1], (start, yk)])):
+                    best = None
+            if best is None:
+                chain = []
+                chains.append(chain)
+                start, end = xa, xb
+            else:
+                d, i, start, end = best
+                used.add(i)
+                chain = ends[i]
+            chain.append((start, yk))
+            chain.append((end, yk))
+            new_ends.append(chain)
+        new_ends.sort(key=lambda c: c[-1][0])
+        ends = new_ends
+        ends_x = [c[-1][0] for c in ends]
+
+    paths = [LineString(chain) for chain in chains] + _rings(polygons)
+    if angle:
+        paths = [affinity.rotate(path, angle, origin=(0, 0)) for path in paths]
+    return paths
+
+
+def _contour_paths(region, stepover):
+    """ Contours of the region shrunk by the stepover, linked inwards
+
+    The polygons of the region are disjoint, so each one is shrunk on its
+    own and the contours it splits into are known to lie inside it. The
+    first of them continues the path of their parent, the others start new
+    paths.
+    """
+    paths = []
+    # Polygons to shrink, with the path ending on their exterior
+    stack = [(polygon, None) for polygon in reversed(_polygons(region))]
+    while stack:
+        polygon, chain = stack.pop()
+        coords = [c[:2] for c in polygon.exterior.coords]
+        if chain is None:
+            chain = list(coords)
+            paths.append(chain)
+        else:
+            # Enter the contour at its point closest to the end of the chain
+            entry = polygon.exterior.project(Point(chain[-1]))
+            if 0.0 < entry < polygon.exterior.length:
+                point = polygon.exterior.interpolate(entry).coords[0][:2]
+                coords = rotate_ring(coords, entry, point)
+            chain.extend(coords)
+        paths.extend([c[:2] for c in ring.coords] for ring in polygon.interiors)
+        children = _polygons(polygon.buffer(-stepover))
+        for i, child in reversed(list(enumerate(children))):
+            stack.append((child, chain if i == 0 else None))
+    return [LineString(chain) for chain in paths]
@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Simplify all the paths of a job at once.
+
+Douglas-Peucker is run on every path together: the points of all paths
+are put in one array and each round splits all the ranges that are still
+too far from their chord with a few numpy operations, instead of one
+shapely call and one recursion per path.
+"""
+
+import numpy as np
+
+from shapely.geometry import LinearRing
+
+# Default chord error, as a fraction of the tool diameter
+CHORD_ERROR = 0.025
+
+
+def simplify_paths(paths, tolerance):
+    """ Simplify paths so that no removed vertex is farther than tolerance
+
+    Parameters
+    ----------
+    paths : list of shapely LineString or LinearRing
+        Paths to simplify, the first and last point of each are kept.
+    tolerance : float
+        Largest distance between a removed vertex and the simplified path.
+
+    Returns
+    -------
+    simplified : list
+        Simplified paths, of the same types as the given ones. Empty paths,
+        and rings that would be left with fewer than four points, are kept
+        as they are.
+    removed : int
+        Number of vertices removed.
+    """
+    simplified = list(paths)
+    # Empty paths have no coordinates to stack, they are kept as they are
+    solid = [i for i, path in enumerate(paths) if not path.is_empty]
+    if not solid:
+        return simplified, 0
+    coords = [np.asarray(paths[i].coords)[:, :2] for i in solid]
+    sizes = np.array([len(xy) for xy in coords])
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    xy = np.concatenate(coords)
+    keep = _douglas_peucker(xy, offsets, tolerance)
+
+    removed = 0
+    for i, xy_path, start, end in zip(solid, coords, offsets[:-1], offsets[1:]):
+        path = paths[i]
+        kept = xy_path[keep[start:end]]
+        if len(kept) == len(xy_path) or (isinstance(path, LinearRing) and len(kept) < 4):
+            continue
+        removed += len(xy_path) - len(kept)
+        simplified[i] = type(path)(kept)
+    return simplified, removed
+
+
+def _douglas_peucker(xy, offsets, tolerance):
+    """ Mask of the points of all paths kept by Douglas-Peucker
+
+    ``offsets`` holds the index of the first point of each path in ``xy``
+    and the total number of points last.
+    """
+    keep = np.zeros(len(xy), dtype=bool)
+    sizes = np.diff(offsets)
+    keep[offsets[:-1][sizes > 0]] = True
+    keep[offsets[1:][sizes > 0] - 1] = True
+
+    # Ranges of points still to split, by their first and last point
+    starts = offsets[:-1]
+    ends = offsets[1:] - 1
+    active = ends - starts > 1
+    starts = starts[active]
+    ends = ends[active]
+    while len(starts):
+        inner = ends - starts - 1
+        owner = np.repeat(np.arange(len(starts)), inner)
+        first = np.cumsum(inner) - inner
+        points = starts[owner] + 1 + np.arange(inner.sum()) - first[owner]
+        distance = _segment_distance(xy[points], xy[starts[owner]], xy[ends[owner]])
+
+        farthest = np.maximum.reduceat(distance, first)
+        split = farthest > tolerance
+        # First point at the largest distance of each range that is split
+        candidates = np.flatnonzero(split[owner] & (distance == farthest[owner]))
+        ranges, index = np.unique(owner[candidates], return_index=True)
+        pivots = points[candidates[index]]
+        keep[pivots] = True
+
+        starts = np.concatenate((starts[ranges], pivots))
+        ends = np.concatenate((pivots, ends[ranges]))
+        active = ends - starts > 1
+        starts = starts[active]
+        ends = ends[active]
+    return keep
+
+
+def _segment_distance(p, a, b):
+    """ Distance of points p to segments a-b, to a when a and b are one point """
+    ab = b - a
+    ap = p - a
+    length2 = (ab * ab).sum(axis=1)
+    t = np.zeros(len(p))
+    nonzero = length2 > 0
+    t[nonzero] = np.clip((ap[nonzero] * ab[nonzero]).sum(axis=1) / length2[nonzero], 0.0, 1.0)
+    d = ap - ab * t[:, np.newaxis]
+    return np.hypot(d[:, 0], d[:, 1])
@@ -0,0 +1,143 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Place holding tabs along a cut path.
+
+Tabs are the sections of an outline left uncut to the full depth so that
+the board stays in place. They are spread evenly along the path and moved
+to the closest stretch free of corners, so that a tab is not left on a
+bend where it would be weak and hard to break off.
+"""
+
+import math
+
+import numpy as np
+
+# Turn of the path within the stretch of a tab above which it is a corner
+CORNER_ANGLE = math.radians(30.0)
+
+
+def place_tabs(coords, tab_size, count=None, spacing=None, stretch=None,
+               corner_angle=CORNER_ANGLE):
+    """ Return the tabs of a path as ranges of distance along it
+
+    The ideal tab centers are spread evenly along the path. Each one is
+    moved to the closest center whose stretch turns by less than
+    ``corner_angle`` in total, and dropped if that is closer than a tab to
+    the tab before it or farther than half the spacing. It takes linear
+    time in the number of vertices, but for sorting the breakpoints.
+
+    Parameters
+    ----------
+    coords : sequence of (x, y)
+        Points of the path, closed if the last is the first.
+    tab_size : float
+        Length of a tab along the path.
+    count : int
+        Number of tabs, used if ``spacing`` is None.
+    spacing : float
+        Distance between tabs, four tabs if both are None.
+    stretch : float
+        Length of path around a tab center that must be free of corners,
+        at least ``tab_size``.
+    corner_angle : float
+        Largest turn of the path within the stretch, in radians.
+
+    Returns
+    -------
+    tabs : list of (start, end)
+        Sorted ranges of distance along the path. On a closed path a tab
+        over its start is split in two ranges, one at each end.
+    """
+    xy = np.asarray(coords, dtype=float)[:, :2]
+    if len(xy) < 2:
+        return []
+    steps = np.diff(xy, axis=0)
+    lengths = np.hypot(steps[:, 0], steps[:, 1])
+    nonzero = lengths > 0
+    steps = steps[nonzero]
+    lengths = lengths[nonzero]
+    total = lengths.sum()
+    if total <= tab_size or not len(steps):
+        return []
+    closed = np.allclose(xy[0], xy[-1])
+
+    if spacing is not None:
+        count = int(total // spacing)
+    elif count is None:
+        count = 4
+    if count < 1:
+        return []
+    spacing = total / count
+    half = max(stretch or 0.0, tab_size) / 2.0
+
+    # Position along the path and turn at each vertex between two steps
+    angles = np.arctan2(steps[:, 1], steps[:, 0])
+    positions = np.cumsum(lengths)[:-1]
+    turns = np.abs((np.diff(angles) + math.pi) % (2 * math.pi) - math.pi)
+    if closed:
+        last = abs((angles[0] - angles[-1] + math.pi) % (2 * math.pi) - math.pi)
+        positions = np.concatenate((positions - total, [0.0], positions,
+                                    [total], positions + total))
+        turns = np.concatenate((turns, [last], turns, [last], turns))
+    cumulative = np.concatenate(([0.0], np.cumsum(turns)))
+
+    # The turn around a center only changes half a stretch from a vertex
+    breaks = np.unique(np.concatenate(([0.0, total], positions - half, positions + half)))
+    breaks = breaks[(breaks >= 0.0) & (breaks <= total)]
+    middles = (breaks[:-1] + breaks[1:]) / 2.0
+    turned = (cumulative[np.searchsorted(positions, middles + half)] -
+              cumulative[np.searchsorted(positions, middles - half)])
+    free = turned < corner_angle
+    if not closed:
+        # Tabs stay whole on open paths
+        free &= (middles >= half) & (middles <= total - half)
+    lows = breaks[:-1][free]
+    highs = breaks[1:][free]
+    if not len(lows):
+        return []
+
+    tabs = []
+    for k in xrange(count):
+        target = (k + 0.5) * spacing
+        i = int(np.searchsorted(highs, target))
+        candidates = []
+        if i < len(lows):
+            candidates.append(max(lows[i], target))
+        if i > 0:
+            candidates.append(highs[i - 1])
+        center = min(candidates, key=lambda c: abs(c - target))
+        if abs(center - target) > spacing / 2.0:
+            continue
+        if tabs and center - tabs[-1] < 2 * tab_size:
+            continue
+        tabs.append(center)
+    if closed and len(tabs) > 1 and tabs[0] + total - tabs[-1] < 2 * tab_size:
+        tabs.pop()
+
+    ranges = []
+    for c in tabs:
+        start = c - tab_size / 2.0
+        end = c + tab_size / 2.0
+        # A tab over the start of a closed path is split in two
+        if closed and start < 0.0:
+            ranges.append((total + start, total))
+        elif closed and end > total:
+            ranges.append((0.0, end - total))
+        ranges.append((max(start, 0.0), min(end, total)))
+    return sorted(ranges)
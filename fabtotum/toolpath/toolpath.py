@@ -21,6 +21,10 @@ from shapely.ops import linemerge
 from shapely import affinity
 from shapely import speedups
 from shapely.prepared import prep
+from shapely.strtree import STRtree
+
+from .ordering import order_paths, path_travel
+from .simplify import simplify_paths
 
 from pprint import pprint
 
@@ -85,40 +89,62 @@ class ToolpathContext(object):
         Color used for rendering drill hits. Format is the same as for `color`.
     """
 
-    class DistanceMap(object):
-        def __init__(self, size):
-            self.size = size
-            self.table = []
-            for i in range(0,size-1):
-                ti = [0] * (size-i-1)
-                self.table.append(ti)
-            
-        def get_distance(self, a, b):
-            i1 = min(a,b)
-            i2 = max(a,b)-1
-            if a == b:
-                return 1e6
-            return self.table[i1][i2-i1]
-            
-        def set_distance(self, a, b, d):
-            i1 = min(a,b)
-            i2 = max(a,b)-1
-            self.table[i1][i2-i1] = d
+    class PathIndex(object):
+        """ Find the nearest unvisited path
+
+        Paths are kept in an STRtree, only the paths whose bounds are close
+        to the query are measured. Ties go to the lowest index.
+        """
+        def __init__(self, paths, radius=1.0):
+            self.paths = paths
+            self.radius = radius if radius > 0 else 1.0
+            self.unvisited = set(range(len(paths)))
+            # Empty paths are not in the tree, Shapely puts them at 0 from anything
+            self.empty = set(i for i in self.unvisited if paths[i].is_empty)
+            self._build()
+
+        def _build(self):
+            indexed = sorted(self.unvisited - self.empty)
+            self._tree = STRtree([self.paths[i] for i in indexed])
+            self._ids = dict((id(self.paths[i]), i) for i in indexed)
+            self._stale = 0
 
         def get_closest(self, a):
-            dmin = 1e5
-            idx = None
-            for i in range(0, self.size):
-                d = self.get_distance(a,i)
-                if d < dmin:
-                    dmin = d
-                    idx = i
-                    
-            return idx,dmin
-            
+            if not self.unvisited - set([a]):
+                return None, None
+            path = self.paths[a]
+            if path.is_empty:
+                return self._scan(a)
+            minx, miny, maxx, maxy = path.bounds
+            distances = dict((i, 0.0) for i in self.empty if i in self.unvisited)
+            r = 0.0
+            while True:
+                window = box(minx - r, miny - r, maxx + r, maxy + r)
+                for other in self._tree.query(window):
+                    i = self._ids[id(other)]
+                    if i != a and i in self.unvisited and i not in distances:
+                        distances[i] = path.distance(other)
+                if distances:
+                    d, idx = min((d, i) for i, d in distances.items())
+                    # Any path closer than d has its bounds within d
+                    if d <= r:
+                        return idx, d
+                    r = d
+                else:
+                    r = max(r * 2, self.radius)
+
+        def _scan(self, a):
+            path = self.paths[a]
+            return min((path.distance(self.paths[i]), i)
+                       for i in self.unvisited if i != a)[::-1]
+
         def clear(self, a):
-            for i in range(0, self.size):
-                self.set_distance(a,i, 1e6)
+            if a in self.unvisited:
+                self.unvisited.remove(a)
+                self._stale += 1
+                # Drop the visited paths when they fill half of the tree
+                if self._stale * 2 > len(self._ids):
+                    self._build()
 
     class Path(object):
         def __init__(self, lines):
@@ -135,7 +161,14 @@ class ToolpathContext(object):
 
     def __init__(self):
         self._tool_list = []
-        self.settings = {'connect' : False}
+        self.travel = None
+        self.removed = None
+        self.settings = {'connect' : False,
+                         'optimize' : True,
+                         'optimize-passes' : 4,
+                         'optimize-time' : None,
+                         'start' : (0.0, 0.0),
+                         'chord-error' : None}
         
     def add_tool(self, tool_d):
         self._tool_list.append(tool_d)
@@ -149,29 +182,14 @@ class ToolpathContext(object):
         raise NotImplementedError('"generate_paths" function must be implemented')
     
     def connect_paths(self, paths, shapes, tool_d):
-        tmp = paths[:]
         conn = []
         
         tool_r = tool_d / 2.0
         
-        dm = ToolpathContext.DistanceMap(len(paths))
-        
-        l = len(paths)
-        for i in range(0,l):
-            p1 = paths[i]
-            #marge.append( Polygon(p1) )
-            # a big number so that the search skipes this one
-            for j in range(i+1, l):
-                p2 = paths[j]
-                d = p1.distance(p2)
-                dm.set_distance(i,j,d)
+        dm = ToolpathContext.PathIndex(paths, radius=tool_d)
         
-        print(dm.table)
-        
-        
-        cnt = l
+        cnt = len(paths)
         idx0 = 0
-        marge = []
         while cnt > 1:
             idx1,d = dm.get_closest(idx0)
             dm.clear(idx0)
@@ -199,16 +217,9 @@ class ToolpathContext(object):
                         mp1 = l1.interpolate(l1.length/2)
                         mp2 = l2.interpolate(l2.length/2)
                         p3 = Polygon( LineString([mp1,mp2]).buffer(tool_r,cap_style=3) )
-                        marge.append(p3)
                         conn.append( p3.exterior )
                         break
             
-            marge.append( Polygon(paths[idx0]) )
-            marge.append( Polygon(paths[idx1]) )
-            p4 = cascaded_union(marge)
-            
-            marge = [p4]
-            
             #~ if cnt == 4:
                 #~ break
             
@@ -294,6 +305,31 @@ class ToolpathContext(object):
         return conn
 
     def optimize(self, paths):
+        """
+        Order paths so that the tool travels as little as possible between
+        them, improving the order for settings['optimize-passes'] rounds and
+        at most settings['optimize-time'] seconds if it is not None.
+        The travel before and after is kept in ``self.travel``.
+        """
+        start = self.settings['start']
+        before = path_travel(paths, start)
+        if self.settings['optimize']:
+            paths = order_paths(paths, start, self.settings['optimize-passes'],
+                                self.settings['optimize-time'])
+        after = path_travel(paths, start)
+        self.travel = (before, after)
+        print("Travel {0:.1f} -> {1:.1f}".format(before, after))
+        return paths
+
+    def simplify(self, paths, tool_d):
+        """
+        Simplify all paths at once, no removed vertex is farther from them
+        than settings['chord-error'] times the tool diameter.
+        The number of vertices removed is kept in ``self.removed``.
+        """
+        tolerance = self.settings['chord-error'] * tool_d
+        paths, self.removed = simplify_paths(paths, tolerance)
+        print("Simplified {0} vertices away".format(self.removed))
         return paths
 
     def generate(self, shapes):
@@ -315,5 +351,8 @@ class ToolpathContext(object):
         else:
             conn = paths
         
+        if self.settings['chord-error'] is not None:
+            conn = self.simplify(conn, tool_d)
+        
         return conn
         
@@ -0,0 +1,39 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2016 Daniel Kesler <kesler.daniel@gmail.com>
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Buffer shapes and union them.
+"""
+
+from shapely.ops import cascaded_union
+
+
+def buffer_union(shapes, distance):
+    """ Return the union of the shapes buffered by a distance
+
+    Parameters
+    ----------
+    shapes : list of shapely geometries
+        Shapes to buffer, empty ones are skipped.
+    distance : float
+        Buffer distance.
+
+    Returns
+    -------
+    union : shapely Polygon or MultiPolygon
+    """
+    return cascaded_union([shp.buffer(distance) for shp in shapes if not shp.is_empty])